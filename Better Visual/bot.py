@@ -6,7 +6,6 @@ import os
 import random
 import re
 import hashlib
-import time
 from config import Config
 from database import Database
 from api_client import APIClient
@@ -16,6 +15,12 @@ from rate_limiter import RateLimiter
 from enhanced_security import EnhancedSecurityManager
 from wick_protection import WickProtection
 from discord_policy_compliance import DiscordPolicyCompliance
+from content_filter import ContentFilter
+from time_window_store import TimeWindowStore
+from message_context import MessageContext
+from message_pipeline import MessagePipeline
+from session_router import SessionRouter
+from timer_scheduler import TimerScheduler
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -38,6 +43,7 @@ class AdvancedDiscordBot(commands.Bot):
         self.api_client = APIClient()
         self.personality = PersonalityManager()
         self.rate_limiter = RateLimiter()
+        self.scheduler = TimerScheduler(self.db.db_path, ready=self.wait_until_ready)
 
         # Security settings
         self.security = {
@@ -45,10 +51,13 @@ class AdvancedDiscordBot(commands.Bot):
             'max_conversation_history': 10,
             'rate_limit_window': 60,
             'max_requests_per_minute': 30,
-            'blocked_words': ['token', 'password', 'api_key', 'secret'],
+            'blocked_words': ['token', 'password', 'api_key', 'secret'],  # Matched as whole words
             'trusted_users': set(),  # Add user IDs here for trusted users
             'anti_spam_enabled': True
         }
+        self.content_filter = ContentFilter()
+        self.content_filter.set_patterns('blocked', self.security['blocked_words'], boundary='word')
+        self.security_manager = EnhancedSecurityManager()
 
         # Bot settings - configurable via !config
         self.settings = {
@@ -68,8 +77,19 @@ class AdvancedDiscordBot(commands.Bot):
         # Add commands
         self.bot_commands = BotCommands(self)
 
-        # Message tracking for anti-spam
-        self.message_history = {}
+        # Message tracking for anti-spam: at most 5 messages per user per 10 seconds
+        self.message_history = TimeWindowStore(window=10, capacity=5)
+
+        # Every message runs through these stages once; cogs add their own
+        self.pipeline = MessagePipeline()
+        self.pipeline.register('security', 'security', self._security_stage, skip_bots=False)
+        self.pipeline.register('commands', 'commands', self._commands_stage, skip_bots=False)
+        self.pipeline.register('natural_chat', 'chat', self._chat_stage, skip_bots=False)
+
+        # Replies to games and prompts are routed by (channel, user) rather than bot.wait_for
+        self.sessions = SessionRouter(self.command_prefix)
+        self.pipeline.register('sessions', 'games', self.sessions.dispatch)
+        self.add_listener(self.sessions.dispatch_reaction, 'on_reaction_add')
 
     def is_trusted_user(self, user_id: str) -> bool:
         """Check if user is trusted (bypasses some restrictions)"""
@@ -78,10 +98,9 @@ class AdvancedDiscordBot(commands.Bot):
     def check_message_security(self, message_content: str, user_id: str) -> tuple[bool, str]:
         """Check message for security issues"""
         # Check for blocked words
-        content_lower = message_content.lower()
-        for word in self.security['blocked_words']:
-            if word in content_lower:
-                return False, f"Message contains blocked word: {word}"
+        match = self.content_filter.find(message_content, ('blocked',))
+        if match:
+            return False, f"Message contains blocked word: {match.pattern}"
 
         # Check message length
         if len(message_content) > self.security['max_message_length']:
@@ -89,27 +108,14 @@ class AdvancedDiscordBot(commands.Bot):
 
         # Anti-spam check
         if self.security['anti_spam_enabled']:
-            current_time = time.time()
-            if user_id not in self.message_history:
-                self.message_history[user_id] = []
-
-            # Remove old messages (older than 10 seconds)
-            self.message_history[user_id] = [
-                msg_time for msg_time in self.message_history[user_id] 
-                if current_time - msg_time < 10
-            ]
-
-            # Check if too many messages in short time
-            if len(self.message_history[user_id]) >= 5:
+            if not self.message_history.allow(user_id):
                 return False, "Too many messages in short time"
 
-            self.message_history[user_id].append(current_time)
-
         return True, "OK"
 
     def replace_mentions_with_names(self, message_content, guild):
         """Replace Discord mention tags with display names"""
-        if not guild:
+        if not guild or not MessageContext.of(message_content).mention_ids:
             return message_content
 
         def repl(match):
@@ -120,8 +126,18 @@ class AdvancedDiscordBot(commands.Bot):
 
     def is_name_mentioned(self, message_content):
         """Check if bot's name is mentioned in the message"""
-        content_lower = message_content.lower()
-        return any(name in content_lower for name in self.bot_names)
+        return MessageContext.of(message_content).contains_any(self.bot_names)
+
+    async def setup_hook(self):
+        """Start background jobs once the event loop is running"""
+        self.security_manager.event_store.start()
+        self.scheduler.start()
+
+    async def close(self):
+        """Shut down the bot, write pending security events and stop timers"""
+        await super().close()
+        await self.security_manager.event_store.stop()
+        await self.scheduler.stop()
 
     async def on_ready(self):
         """Called when bot is ready"""
@@ -134,7 +150,10 @@ class AdvancedDiscordBot(commands.Bot):
         if message.author == self.user:
             return
 
-        # Security check
+        await self.pipeline.process(message)
+
+    async def _security_stage(self, message, context):
+        """Drop messages that fail the security check"""
         security_ok, security_msg = self.check_message_security(
             message.content, 
             str(message.author.id)
@@ -142,12 +161,14 @@ class AdvancedDiscordBot(commands.Bot):
 
         if not security_ok and not self.is_trusted_user(message.author.id):
             logger.warning(f"Security check failed for {message.author}: {security_msg}")
-            return
+            return True
 
-        # Process commands first
+    async def _commands_stage(self, message, context):
+        """Run prefix commands"""
         await self.process_commands(message)
 
-        # If it's not a command, respond naturally
+    async def _chat_stage(self, message, context):
+        """If it's not a command, respond naturally"""
         if not message.content.startswith('!'):
             await self.handle_natural_conversation(message)
 
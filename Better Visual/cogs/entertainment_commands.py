@@ -175,16 +175,18 @@ class EntertainmentCog(commands.Cog):
         embed.set_footer(text="Take it with a grain of salt! 🧂")
         await ctx.send(embed=embed)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    async def cog_load(self):
+        self.bot.pipeline.register('riddle_answers', 'games', self.riddle_answer_stage)
+
+    async def cog_unload(self):
+        self.bot.pipeline.unregister('riddle_answers')
+
+    async def riddle_answer_stage(self, message, context):
         """Check riddle answers"""
-        if message.author.bot:
-            return
-            
         pending_riddles = getattr(self.bot, 'pending_riddles', {})
         if message.channel.id in pending_riddles:
             answer = pending_riddles[message.channel.id]
-            if answer in message.content.lower():
+            if answer in context.lower:
                 embed = discord.Embed(
                     title="🎉 Correct Answer!",
                     description=f"Well done {message.author.mention}! The answer was indeed **{answer}**!",
@@ -192,6 +194,7 @@ class EntertainmentCog(commands.Cog):
                 )
                 await message.channel.send(embed=embed)
                 del pending_riddles[message.channel.id]
+                return True
 
 async def setup(bot):
     await bot.add_cog(EntertainmentCog(bot))
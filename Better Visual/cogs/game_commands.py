@@ -142,16 +142,21 @@ class GamesCog(commands.Cog):
         )
         await ctx.send(embed=embed)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    async def cog_load(self):
+        self.bot.pipeline.register('game_answers', 'games', self.game_answer_stage)
+
+    async def cog_unload(self):
+        self.bot.pipeline.unregister('game_answers')
+
+    async def game_answer_stage(self, message, context):
         """Handle game responses"""
-        if message.author.bot or message.channel.id not in self.active_games:
+        if message.channel.id not in self.active_games:
             return
             
         game = self.active_games[message.channel.id]
         
         if game['type'] == 'trivia':
-            user_answer = message.content.lower().strip()
+            user_answer = context.stripped_lower
             correct_answer = game['answer'].lower()
             
             # Check if it's a number (option selection)
@@ -168,6 +173,7 @@ class GamesCog(commands.Cog):
                     color=discord.Color.green()
                 )
                 await message.channel.send(embed=embed)
+                return True
                 
         elif game['type'] == 'guess':
             try:
@@ -188,6 +194,7 @@ class GamesCog(commands.Cog):
                 else:
                     await message.add_reaction('⬇️')
                     await message.channel.send(f"Lower! 📉 (Attempt {game['attempts']})")
+                return True
                     
             except ValueError:
                 pass  # Not a number, ignore
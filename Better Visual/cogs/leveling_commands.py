@@ -3,13 +3,16 @@ import discord
 from discord.ext import commands
 import random
 import math
-import time
 from datetime import datetime
+from time_window_store import TimeWindowStore
+from xp_accumulator import XPAccumulator
 
 class LevelingCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.xp_cooldowns = {}
+        self.xp_cooldowns = TimeWindowStore(window=60, capacity=1)
+        # XP is granted in memory and written in batches every few seconds
+        self.xp = XPAccumulator(bot.db)
         self.level_roles = {}  # guild_id -> {level: role_id}
         
     def calculate_level(self, xp):
@@ -22,40 +25,32 @@ class LevelingCog(commands.Cog):
     
     def get_user_data(self, user_id):
         """Get user XP and level data"""
-        user_data = self.bot.db.get_user(str(user_id))
-        xp = user_data.get('xp', 0) if user_data else 0
+        xp = self.xp.total(str(user_id))
         level = self.calculate_level(xp)
         return xp, level
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    async def cog_load(self):
+        self.xp.start()
+        self.bot.pipeline.register('leveling_xp', 'xp', self.xp_stage)
+
+    async def cog_unload(self):
+        self.bot.pipeline.unregister('leveling_xp')
+        await self.xp.stop()
+
+    async def xp_stage(self, message, context):
         """Give XP for messages"""
-        if message.author.bot:
-            return
-            
         user_id = str(message.author.id)
-        current_time = time.time()
         
         # XP cooldown (60 seconds)
-        if user_id in self.xp_cooldowns:
-            if current_time - self.xp_cooldowns[user_id] < 60:
-                return
-        
-        self.xp_cooldowns[user_id] = current_time
-        
-        # Get current XP and level
-        old_xp, old_level = self.get_user_data(message.author.id)
+        if not self.xp_cooldowns.allow(user_id):
+            return
         
-        # Add random XP (15-25 per message)
+        # Add random XP (15-25 per message); levels come from the cached total
         xp_gain = random.randint(15, 25)
-        new_xp = old_xp + xp_gain
+        old_xp, new_xp = self.xp.add(user_id, xp_gain)
+        old_level = self.calculate_level(old_xp)
         new_level = self.calculate_level(new_xp)
         
-        # Update database
-        user_data = self.bot.db.get_user(user_id) or {}
-        user_data['xp'] = new_xp
-        self.bot.db.update_user(user_id, user_data)
-        
         # Check for level up
         if new_level > old_level:
             await self.handle_level_up(message, new_level)
@@ -86,11 +81,7 @@ class LevelingCog(commands.Cog):
         
         # Coin rewards
         coin_reward = new_level * 50
-        user_data = self.bot.db.get_user(str(message.author.id))
-        if user_data:
-            current_coins = user_data.get('coins', 0)
-            user_data['coins'] = current_coins + coin_reward
-            self.bot.db.update_user(str(message.author.id), user_data)
+        if self.bot.db.increment_user_field(str(message.author.id), 'coins', coin_reward) is not None:
             rewards.append(f"💰 {coin_reward} coins")
         
         # Special level rewards
@@ -104,9 +95,7 @@ class LevelingCog(commands.Cog):
             rewards.append("👑 Special title unlocked!")
         elif new_level % 20 == 0:  # Every 20 levels
             rewards.append("🎊 Milestone bonus: 1000 coins!")
-            if user_data:
-                user_data['coins'] = user_data.get('coins', 0) + 1000
-                self.bot.db.update_user(str(message.author.id), user_data)
+            self.bot.db.increment_user_field(str(message.author.id), 'coins', 1000)
         
         if rewards:
             embed.add_field(
@@ -232,15 +221,10 @@ class LevelingCog(commands.Cog):
             return
         
         user_id = str(member.id)
-        old_xp, old_level = self.get_user_data(member.id)
-        new_xp = old_xp + amount
+        old_xp, new_xp = self.xp.add(user_id, amount)
+        old_level = self.calculate_level(old_xp)
         new_level = self.calculate_level(new_xp)
         
-        # Update database
-        user_data = self.bot.db.get_user(user_id) or {}
-        user_data['xp'] = new_xp
-        self.bot.db.update_user(user_id, user_data)
-        
         embed = discord.Embed(
             title="✅ XP Given",
             description=f"Gave **{amount:,} XP** to {member.mention}",
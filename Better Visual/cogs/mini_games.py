@@ -3,13 +3,17 @@ import discord
 from discord.ext import commands
 import random
 import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List
+from game_engine import ConnectFour, TicTacToe, best_move
 
 class MiniGamesCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.active_games = {}
         self.leaderboards = {}
+        self.engine_pool = None  # Worker processes for the bot's game moves, started on first use
 
     @commands.command(name='hangman')
     async def hangman(self, ctx):
@@ -51,30 +55,27 @@ class MiniGamesCog(commands.Cog):
         embed.add_field(name="Gallows", value=f"```{hangman_art}```", inline=False)
         
         await ctx.send(embed=embed)
+        self.start_sessions(ctx.channel.id)
 
     @commands.command(name='connect4')
     async def connect_four(self, ctx, opponent: discord.Member = None):
-        """Start a Connect 4 game"""
+        """Start a Connect 4 game; mention the bot to play against it"""
         if not opponent:
-            await ctx.send("❌ Mention someone to play against!\nExample: `!connect4 @friend`")
+            await ctx.send("❌ Mention someone to play against, or mention me to play against the bot!\nExample: `!connect4 @friend`")
             return
             
-        if opponent.bot:
-            await ctx.send("❌ You can't play against bots!")
+        if opponent.bot and opponent.id != self.bot.user.id:
+            await ctx.send("❌ You can't play against other bots!")
             return
             
         if ctx.channel.id in self.active_games:
             await ctx.send("🎮 There's already a game running in this channel!")
             return
             
-        # Initialize 6x7 board
-        board = [['⚪' for _ in range(7)] for _ in range(6)]
-        
         self.active_games[ctx.channel.id] = {
             'type': 'connect4',
-            'board': board,
+            'engine': ConnectFour(),
             'players': [ctx.author.id, opponent.id],
-            'current_player': 0,
             'symbols': ['🔴', '🟡']
         }
         
@@ -84,36 +85,33 @@ class MiniGamesCog(commands.Cog):
             color=discord.Color.red()
         )
         
-        board_display = self.format_connect4_board(board)
+        board_display = self.format_connect4_board(self.active_games[ctx.channel.id])
         embed.add_field(name="Board", value=board_display, inline=False)
         embed.add_field(name="Current Turn", value=f"{ctx.author.mention} 🔴", inline=False)
         embed.add_field(name="How to Play", value="Type a number 1-7 to drop your piece!", inline=False)
         
         await ctx.send(embed=embed)
+        self.start_sessions(ctx.channel.id)
 
     @commands.command(name='tictactoe')
     async def tic_tac_toe(self, ctx, opponent: discord.Member = None):
-        """Start a Tic Tac Toe game"""
+        """Start a Tic Tac Toe game; mention the bot to play against it"""
         if not opponent:
-            await ctx.send("❌ Mention someone to play against!\nExample: `!tictactoe @friend`")
+            await ctx.send("❌ Mention someone to play against, or mention me to play against the bot!\nExample: `!tictactoe @friend`")
             return
             
-        if opponent.bot:
-            await ctx.send("❌ You can't play against bots!")
+        if opponent.bot and opponent.id != self.bot.user.id:
+            await ctx.send("❌ You can't play against other bots!")
             return
             
         if ctx.channel.id in self.active_games:
             await ctx.send("🎮 There's already a game running in this channel!")
             return
             
-        # Initialize 3x3 board
-        board = [['⬜' for _ in range(3)] for _ in range(3)]
-        
         self.active_games[ctx.channel.id] = {
             'type': 'tictactoe',
-            'board': board,
+            'engine': TicTacToe(),
             'players': [ctx.author.id, opponent.id],
-            'current_player': 0,
             'symbols': ['❌', '⭕']
         }
         
@@ -123,12 +121,13 @@ class MiniGamesCog(commands.Cog):
             color=discord.Color.blue()
         )
         
-        board_display = self.format_tictactoe_board(board)
+        board_display = self.format_tictactoe_board(self.active_games[ctx.channel.id])
         embed.add_field(name="Board", value=board_display, inline=False)
         embed.add_field(name="Current Turn", value=f"{ctx.author.mention} ❌", inline=False)
         embed.add_field(name="How to Play", value="Type position 1-9 (like a numpad)", inline=False)
         
         await ctx.send(embed=embed)
+        self.start_sessions(ctx.channel.id)
 
     @commands.command(name='snake')
     async def snake_game(self, ctx):
@@ -187,18 +186,22 @@ class MiniGamesCog(commands.Cog):
         ]
         return stages[min(wrong_count, len(stages) - 1)]
 
-    def format_connect4_board(self, board):
+    def format_connect4_board(self, game):
         """Format Connect 4 board for display"""
+        engine, symbols = game['engine'], game['symbols']
         board_str = "1️⃣2️⃣3️⃣4️⃣5️⃣6️⃣7️⃣\n"
-        for row in board:
-            board_str += ''.join(row) + "\n"
+        for row in range(engine.HEIGHT):
+            cells = [engine.cell(row, col) for col in range(engine.WIDTH)]
+            board_str += ''.join('⚪' if cell is None else symbols[cell] for cell in cells) + "\n"
         return board_str
 
-    def format_tictactoe_board(self, board):
+    def format_tictactoe_board(self, game):
         """Format Tic Tac Toe board for display"""
+        engine, symbols = game['engine'], game['symbols']
         board_str = ""
-        for i, row in enumerate(board):
-            board_str += ''.join(row) + "\n"
+        for row in range(3):
+            cells = [engine.cell(row, col) for col in range(3)]
+            board_str += ''.join('⬜' if cell is None else symbols[cell] for cell in cells) + "\n"
         return board_str
 
     def format_snake_board(self, snake, food, size):
@@ -224,20 +227,41 @@ class MiniGamesCog(commands.Cog):
             if pos not in snake:
                 return pos
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Handle game moves"""
-        if message.author.bot or message.channel.id not in self.active_games:
+    def start_sessions(self, channel_id):
+        """Route the players' messages in the channel to game_move"""
+        game = self.active_games[channel_id]
+        for player_id in game.get('players', [game.get('player')]):
+            self.bot.sessions.open(channel_id, player_id, self.game_move)
+
+    def end_game(self, channel_id):
+        """Remove a finished game and stop routing its players' messages"""
+        game = self.active_games.pop(channel_id, None)
+        if game:
+            for player_id in game.get('players', [game.get('player')]):
+                self.bot.sessions.close(channel_id, player_id)
+
+    async def cog_unload(self):
+        for channel_id in list(self.active_games):
+            self.end_game(channel_id)
+        if self.engine_pool:
+            self.engine_pool.shutdown(wait=False, cancel_futures=True)
+
+    async def game_move(self, message, context):
+        """Handle game moves; a move is not passed on to commands or chat"""
+        game = self.active_games.get(message.channel.id)
+        if not game:
             return
             
-        game = self.active_games[message.channel.id]
-        
+        move = context.stripped_lower
         if game['type'] == 'hangman' and message.author.id == game['player']:
             await self.handle_hangman_guess(message, game)
+            return len(move) == 1 and move.isalpha()
         elif game['type'] == 'connect4':
             await self.handle_connect4_move(message, game)
+            return move.isdigit() and message.author.id in game['players']
         elif game['type'] == 'tictactoe':
             await self.handle_tictactoe_move(message, game)
+            return move.isdigit() and message.author.id in game['players']
 
     async def handle_hangman_guess(self, message, game):
         """Handle hangman letter guesses"""
@@ -264,7 +288,7 @@ class MiniGamesCog(commands.Cog):
                     color=discord.Color.green()
                 )
                 await message.channel.send(embed=embed)
-                del self.active_games[message.channel.id]
+                self.end_game(message.channel.id)
                 return
         else:
             # Wrong guess
@@ -280,7 +304,7 @@ class MiniGamesCog(commands.Cog):
                 hangman_art = self.get_hangman_art(len(game['wrong_guesses']))
                 embed.add_field(name="Final State", value=f"```{hangman_art}```", inline=False)
                 await message.channel.send(embed=embed)
-                del self.active_games[message.channel.id]
+                self.end_game(message.channel.id)
                 return
         
         # Update game display
@@ -310,74 +334,16 @@ class MiniGamesCog(commands.Cog):
         except ValueError:
             return
             
-        current_player_id = game['players'][game['current_player']]
-        if message.author.id != current_player_id:
+        engine = game['engine']
+        if message.author.id != game['players'][engine.turn]:
             return
             
         # Check if column is full
-        if game['board'][0][col] != '⚪':
+        if not engine.can_play(col):
             await message.channel.send("❌ That column is full!")
             return
             
-        # Drop piece
-        for row in range(5, -1, -1):
-            if game['board'][row][col] == '⚪':
-                game['board'][row][col] = game['symbols'][game['current_player']]
-                break
-                
-        # Check for win
-        if self.check_connect4_win(game['board'], row, col, game['symbols'][game['current_player']]):
-            winner = self.bot.get_user(current_player_id)
-            embed = discord.Embed(
-                title="🎉 Connect 4 Winner!",
-                description=f"{winner.mention} wins!",
-                color=discord.Color.gold()
-            )
-            board_display = self.format_connect4_board(game['board'])
-            embed.add_field(name="Final Board", value=board_display, inline=False)
-            await message.channel.send(embed=embed)
-            del self.active_games[message.channel.id]
-            return
-            
-        # Switch players
-        game['current_player'] = 1 - game['current_player']
-        
-        # Update display
-        current_user = self.bot.get_user(game['players'][game['current_player']])
-        embed = discord.Embed(
-            title="🔴 Connect 4 Game",
-            color=discord.Color.red()
-        )
-        
-        board_display = self.format_connect4_board(game['board'])
-        embed.add_field(name="Board", value=board_display, inline=False)
-        embed.add_field(name="Current Turn", value=f"{current_user.mention} {game['symbols'][game['current_player']]}", inline=False)
-        
-        await message.channel.send(embed=embed)
-
-    def check_connect4_win(self, board, row, col, symbol):
-        """Check if there's a Connect 4 win"""
-        directions = [(0, 1), (1, 0), (1, 1), (1, -1)]
-        
-        for dr, dc in directions:
-            count = 1
-            
-            # Check positive direction
-            r, c = row + dr, col + dc
-            while 0 <= r < 6 and 0 <= c < 7 and board[r][c] == symbol:
-                count += 1
-                r, c = r + dr, c + dc
-                
-            # Check negative direction
-            r, c = row - dr, col - dc
-            while 0 <= r < 6 and 0 <= c < 7 and board[r][c] == symbol:
-                count += 1
-                r, c = r - dr, c - dc
-                
-            if count >= 4:
-                return True
-                
-        return False
+        await self.play_turn(message.channel, game, col)
 
     async def handle_tictactoe_move(self, message, game):
         """Handle Tic Tac Toe moves"""
@@ -388,82 +354,83 @@ class MiniGamesCog(commands.Cog):
         except ValueError:
             return
             
-        current_player_id = game['players'][game['current_player']]
-        if message.author.id != current_player_id:
+        engine = game['engine']
+        if message.author.id != game['players'][engine.turn]:
             return
             
-        # Convert position to row, col
-        row, col = (pos - 1) // 3, (pos - 1) % 3
-        
-        if game['board'][row][col] != '⬜':
+        if not engine.can_play(pos - 1):
             await message.channel.send("❌ That position is already taken!")
             return
             
-        # Make move
-        game['board'][row][col] = game['symbols'][game['current_player']]
-        
-        # Check for win
-        if self.check_tictactoe_win(game['board'], game['symbols'][game['current_player']]):
-            winner = self.bot.get_user(current_player_id)
-            embed = discord.Embed(
-                title="🎉 Tic Tac Toe Winner!",
-                description=f"{winner.mention} wins!",
-                color=discord.Color.gold()
-            )
-            board_display = self.format_tictactoe_board(game['board'])
-            embed.add_field(name="Final Board", value=board_display, inline=False)
-            await message.channel.send(embed=embed)
-            del self.active_games[message.channel.id]
-            return
+        await self.play_turn(message.channel, game, pos - 1)
+
+    async def ai_move(self, game):
+        """Search the bot's move in a worker process so the event loop stays free"""
+        if self.engine_pool is None:
+            self.engine_pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+        time_budget = 1.0 if game['type'] == 'connect4' else 0.2
+        return await asyncio.get_running_loop().run_in_executor(
+            self.engine_pool, best_move, game['engine'], time_budget
+        )
+
+    async def play_turn(self, channel, game, move):
+        """Play a move and, when it is the bot's turn next, its reply; then show the board"""
+        engine = game['engine']
+        if game['type'] == 'connect4':
+            title, winner_title, color = "🔴 Connect 4 Game", "🎉 Connect 4 Winner!", discord.Color.red()
+            format_board, move_name = self.format_connect4_board, "column"
+        else:
+            title, winner_title, color = "❌ Tic Tac Toe", "🎉 Tic Tac Toe Winner!", discord.Color.blue()
+            format_board, move_name = self.format_tictactoe_board, "position"
             
-        # Check for tie
-        if all(cell != '⬜' for row in game['board'] for cell in row):
-            embed = discord.Embed(
-                title="🤝 Tie Game!",
-                description="It's a draw!",
-                color=discord.Color.yellow()
-            )
-            board_display = self.format_tictactoe_board(game['board'])
-            embed.add_field(name="Final Board", value=board_display, inline=False)
-            await message.channel.send(embed=embed)
-            del self.active_games[message.channel.id]
-            return
+        bot_move = None
+        while True:
+            player_id = game['players'][engine.turn]
+            engine.play(move)
             
-        # Switch players
-        game['current_player'] = 1 - game['current_player']
-        
+            if engine.last_won():
+                winner = self.bot.get_user(player_id)
+                embed = discord.Embed(
+                    title=winner_title,
+                    description=f"{winner.mention} wins!",
+                    color=discord.Color.gold()
+                )
+                embed.add_field(name="Final Board", value=format_board(game), inline=False)
+                await channel.send(embed=embed)
+                self.end_game(channel.id)
+                return
+                
+            if engine.is_full():
+                embed = discord.Embed(
+                    title="🤝 Tie Game!",
+                    description="It's a draw!",
+                    color=discord.Color.yellow()
+                )
+                embed.add_field(name="Final Board", value=format_board(game), inline=False)
+                await channel.send(embed=embed)
+                self.end_game(channel.id)
+                return
+                
+            if game['players'][engine.turn] != self.bot.user.id:
+                break
+                
+            move = bot_move = await self.ai_move(game)
+            if self.active_games.get(channel.id) is not game:
+                return  # Ended while the bot was thinking
+                
         # Update display
-        current_user = self.bot.get_user(game['players'][game['current_player']])
+        current_user = self.bot.get_user(game['players'][engine.turn])
         embed = discord.Embed(
-            title="❌ Tic Tac Toe",
-            color=discord.Color.blue()
+            title=title,
+            color=color
         )
         
-        board_display = self.format_tictactoe_board(game['board'])
-        embed.add_field(name="Board", value=board_display, inline=False)
-        embed.add_field(name="Current Turn", value=f"{current_user.mention} {game['symbols'][game['current_player']]}", inline=False)
+        if bot_move is not None:
+            embed.add_field(name="🤖 My Move", value=f"I played {move_name} {bot_move + 1}", inline=False)
+        embed.add_field(name="Board", value=format_board(game), inline=False)
+        embed.add_field(name="Current Turn", value=f"{current_user.mention} {game['symbols'][engine.turn]}", inline=False)
         
-        await message.channel.send(embed=embed)
-
-    def check_tictactoe_win(self, board, symbol):
-        """Check if there's a Tic Tac Toe win"""
-        # Check rows
-        for row in board:
-            if all(cell == symbol for cell in row):
-                return True
-                
-        # Check columns
-        for col in range(3):
-            if all(board[row][col] == symbol for row in range(3)):
-                return True
-                
-        # Check diagonals
-        if all(board[i][i] == symbol for i in range(3)):
-            return True
-        if all(board[i][2-i] == symbol for i in range(3)):
-            return True
-            
-        return False
+        await channel.send(embed=embed)
 
 async def setup(bot):
     await bot.add_cog(MiniGamesCog(bot))
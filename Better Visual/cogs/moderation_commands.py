@@ -105,10 +105,19 @@ class ModerationCog(commands.Cog):
         
         await member.add_roles(muted_role, reason=reason)
         
+        # Persisted, so the unmute still happens if the bot restarts meanwhile
+        previous = self.muted_users.get(member.id)
+        if previous:
+            await self.bot.scheduler.cancel(previous['job'])
+        job = await self.bot.scheduler.schedule('unmute', duration * 60, {
+            'guild_id': ctx.guild.id, 'user_id': member.id, 'role_id': muted_role.id
+        })
+        
         # Store mute info
         self.muted_users[member.id] = {
             'until': time.time() + (duration * 60),
-            'role': muted_role.id
+            'role': muted_role.id,
+            'job': job
         }
         
         embed = discord.Embed(
@@ -119,12 +128,26 @@ class ModerationCog(commands.Cog):
         embed.add_field(name="Reason", value=reason, inline=False)
         embed.add_field(name="Moderator", value=ctx.author.mention, inline=True)
         await ctx.send(embed=embed)
-        
-        # Auto unmute
-        await asyncio.sleep(duration * 60)
-        if member.id in self.muted_users:
-            await member.remove_roles(muted_role)
-            del self.muted_users[member.id]
+
+    async def cog_load(self):
+        self.bot.scheduler.register('unmute', self.unmute_job)
+
+    async def cog_unload(self):
+        self.bot.scheduler.unregister('unmute')
+
+    async def unmute_job(self, payload):
+        """Scheduled auto unmute"""
+        self.muted_users.pop(payload['user_id'], None)
+        # Right after a restart the caches may not hold the guild or member yet
+        guild = self.bot.get_guild(payload['guild_id']) or await self.bot.fetch_guild(payload['guild_id'])
+        try:
+            member = guild.get_member(payload['user_id']) or await guild.fetch_member(payload['user_id'])
+        except discord.NotFound:
+            return  # They left the server
+        role = guild.get_role(payload['role_id'])
+        # Someone may have unmuted them by hand
+        if role and role in member.roles:
+            await member.remove_roles(role, reason="Mute expired")
 
     @commands.command(name='warn')
     @commands.has_permissions(manage_messages=True)
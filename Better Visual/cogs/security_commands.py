@@ -4,7 +4,7 @@ from discord.ext import commands
 import asyncio
 import logging
 import time
-import json
+import tempfile
 from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
@@ -78,7 +78,7 @@ class SecurityView(discord.ui.View):
             name="Filter Settings",
             value=f"""
             **Profanity Level:** {security.profanity_level}/5
-            **URL Whitelist:** {len(security.allowed_domains)} domains
+            **URL Whitelist:** {len(security.link_inspector.allowed)} domains
             **Blocked Words:** {len(security.blocked_words)} words
             **File Types:** {len(security.allowed_file_types)} allowed
             **Max Message Length:** {security.max_message_length}
@@ -331,6 +331,27 @@ class SecurityLogsView(discord.ui.View):
     def __init__(self, bot):
         super().__init__(timeout=300)
         self.bot = bot
+        self.before_id = None  # Oldest event id shown so far, for paging back through history
+        
+    @discord.ui.button(label="Older Events", style=discord.ButtonStyle.secondary)
+    async def older_events(self, interaction: discord.Interaction, button: discord.ui.Button):
+        logs = await self.bot.security_manager.query_logs(limit=10, before_id=self.before_id,
+                                                          guild_id=interaction.guild_id)
+        
+        embed = discord.Embed(
+            title="📋 Security Log History",
+            description="Persisted security events, newest first",
+            color=discord.Color.green()
+        )
+        if logs:
+            self.before_id = logs[-1]['id']
+            log_text = ""
+            for log in logs:
+                log_text += f"• `#{log['id']}` <t:{int(log['timestamp'])}:R> **{log['type']}** - {log['description'][:50]}\n"
+            embed.add_field(name="Events", value=log_text, inline=False)
+        else:
+            embed.add_field(name="Events", value="No older security events", inline=False)
+        await interaction.response.edit_message(embed=embed, view=self)
         
     @discord.ui.button(label="Clear Logs", style=discord.ButtonStyle.danger)
     async def clear_logs(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -338,37 +359,42 @@ class SecurityLogsView(discord.ui.View):
         
         embed = discord.Embed(
             title="✅ Logs Cleared",
-            description="All security logs have been cleared",
+            description="The live security log has been cleared (saved history is kept)",
             color=discord.Color.green()
         )
         await interaction.response.edit_message(embed=embed, view=self)
         
     @discord.ui.button(label="Export Logs", style=discord.ButtonStyle.primary)
     async def export_logs(self, interaction: discord.Interaction, button: discord.ui.Button):
-        logs = self.bot.security_manager.get_all_logs()
-        
-        if logs:
-            log_data = json.dumps(logs, indent=2)
-            file = discord.File(
-                filename="security_logs.json",
-                fp=io.BytesIO(log_data.encode())
+        # Stream this server's history to a temp file page by page instead of building it in memory
+        await interaction.response.defer()
+        export = tempfile.TemporaryFile()
+        try:
+            exported = await self.bot.security_manager.event_store.export_ndjson(
+                export, guild_id=interaction.guild_id
             )
             
-            embed = discord.Embed(
-                title="📄 Security Logs Export",
-                description="Security logs have been exported",
-                color=discord.Color.blue()
-            )
-            
-            await interaction.response.edit_message(embed=embed, view=self)
-            await interaction.followup.send(file=file, ephemeral=True)
-        else:
-            embed = discord.Embed(
-                title="❌ No Logs",
-                description="No security logs to export",
-                color=discord.Color.red()
-            )
-            await interaction.response.edit_message(embed=embed, view=self)
+            if exported:
+                export.seek(0)
+                file = discord.File(export, filename="security_logs.jsonl")
+                
+                embed = discord.Embed(
+                    title="📄 Security Logs Export",
+                    description=f"{exported:,} security events have been exported",
+                    color=discord.Color.blue()
+                )
+                
+                await interaction.edit_original_response(embed=embed, view=self)
+                await interaction.followup.send(file=file, ephemeral=True)
+            else:
+                embed = discord.Embed(
+                    title="❌ No Logs",
+                    description="No security logs to export",
+                    color=discord.Color.red()
+                )
+                await interaction.edit_original_response(embed=embed, view=self)
+        finally:
+            export.close()
 
 class SecurityCommands(commands.Cog):
     def __init__(self, bot):
@@ -385,6 +411,7 @@ class SecurityCommands(commands.Cog):
         )
         
         security = self.bot.security_manager
+        event_stats = security.event_store.get_stats()
         
         embed.add_field(
             name="🛡️ Protection Status",
@@ -401,7 +428,7 @@ class SecurityCommands(commands.Cog):
             name="📊 Statistics",
             value=f"""
             **Blocked Users:** {len(security.blocked_users)}
-            **Security Events:** {len(security.security_logs)}
+            **Security Events:** {event_stats['persisted'] + event_stats['pending']:,}
             **Trusted Users:** {len(security.trusted_users)}
             **Warnings Issued:** {security.warnings_issued}
             """,
@@ -474,5 +501,69 @@ class SecurityCommands(commands.Cog):
         )
         await ctx.send(embed=embed)
 
+    @commands.command(name="allowdomain")
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def allow_domain(self, ctx, domain: str):
+        """Allow links to a domain (and its subdomains) in this server"""
+        if not self.bot.security_manager.link_inspector.allow_domain(domain, ctx.guild.id):
+            await ctx.send(f"❌ `{domain}` is invalid or already allowed here")
+            return
+
+        embed = discord.Embed(
+            title="✅ Domain Allowed",
+            description=f"Links to `{domain}` are now allowed in this server",
+            color=discord.Color.green()
+        )
+        await ctx.send(embed=embed)
+
+    @commands.command(name="blockdomain")
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def block_domain(self, ctx, domain: str):
+        """Block links to a domain (and its subdomains) in this server"""
+        if not self.bot.security_manager.link_inspector.block_domain(domain, ctx.guild.id):
+            await ctx.send(f"❌ `{domain}` is invalid or already blocked here")
+            return
+
+        embed = discord.Embed(
+            title="🚫 Domain Blocked",
+            description=f"Links to `{domain}` are now blocked in this server",
+            color=discord.Color.red()
+        )
+        await ctx.send(embed=embed)
+
+    @commands.command(name="unallowdomain")
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def unallow_domain(self, ctx, domain: str):
+        """Remove a domain from this server's allowlist"""
+        if not self.bot.security_manager.link_inspector.disallow_domain(domain, ctx.guild.id):
+            await ctx.send(f"❌ `{domain}` is not on this server's allowlist")
+            return
+
+        embed = discord.Embed(
+            title="✅ Domain Unallowed",
+            description=f"Links to `{domain}` are no longer allowed by this server's list",
+            color=discord.Color.orange()
+        )
+        await ctx.send(embed=embed)
+
+    @commands.command(name="unblockdomain")
+    @commands.guild_only()
+    @commands.has_permissions(administrator=True)
+    async def unblock_domain(self, ctx, domain: str):
+        """Remove a domain from this server's blocklist"""
+        if not self.bot.security_manager.link_inspector.unblock_domain(domain, ctx.guild.id):
+            await ctx.send(f"❌ `{domain}` is not on this server's blocklist")
+            return
+
+        embed = discord.Embed(
+            title="✅ Domain Unblocked",
+            description=f"Links to `{domain}` are no longer blocked in this server",
+            color=discord.Color.green()
+        )
+        await ctx.send(embed=embed)
+
 async def setup(bot):
     await bot.add_cog(SecurityCommands(bot))
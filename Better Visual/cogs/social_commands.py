@@ -215,11 +215,10 @@ class SocialCog(commands.Cog):
         await message.add_reaction("💍")
         await message.add_reaction("💔")
         
-        def check(reaction, user):
-            return user == member and str(reaction.emoji) in ["💍", "💔"] and reaction.message.id == message.id
-        
         try:
-            reaction, user = await self.bot.wait_for('reaction_add', timeout=60.0, check=check)
+            reaction, user = await self.bot.sessions.wait_for_reaction(
+                message.id, member.id, timeout=60.0, check=lambda reaction, user: str(reaction.emoji) in ["💍", "💔"]
+            )
             
             if str(reaction.emoji) == "💍":
                 result_embed = discord.Embed(
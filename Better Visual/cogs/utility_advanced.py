@@ -1,6 +1,6 @@
 
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 import asyncio
 import datetime
 import json
@@ -10,10 +10,8 @@ from typing import Dict, List
 class AdvancedUtilityCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.reminders = {}
         self.reaction_roles = {}
         self.auto_responses = {}
-        self.check_reminders.start()
 
     @commands.command(name='remind')
     async def remind(self, ctx, time_str: str = None, *, reminder_text: str = None):
@@ -39,14 +37,12 @@ class AdvancedUtilityCog(commands.Cog):
             
         remind_time = datetime.datetime.now() + datetime.timedelta(seconds=seconds)
         
-        reminder_id = f"{ctx.author.id}_{len(self.reminders)}"
-        self.reminders[reminder_id] = {
+        await self.bot.scheduler.schedule('reminder', seconds, {
             'user_id': ctx.author.id,
             'channel_id': ctx.channel.id,
             'reminder': reminder_text,
-            'time': remind_time,
-            'created': datetime.datetime.now()
-        }
+            'created': datetime.datetime.now().isoformat()
+        })
         
         embed = discord.Embed(
             title="⏰ Reminder Set!",
@@ -180,46 +176,33 @@ class AdvancedUtilityCog(commands.Cog):
         
         await ctx.send(embed=embed)
 
-    @tasks.loop(seconds=30)
-    async def check_reminders(self):
-        """Check for due reminders"""
-        current_time = datetime.datetime.now()
-        due_reminders = []
+    async def reminder_job(self, reminder):
+        """Deliver a scheduled reminder"""
+        user = self.bot.get_user(reminder['user_id']) or await self.bot.fetch_user(reminder['user_id'])
+        channel = self.bot.get_channel(reminder['channel_id']) or await self.bot.fetch_channel(reminder['channel_id'])
         
-        for reminder_id, reminder_data in self.reminders.items():
-            if current_time >= reminder_data['time']:
-                due_reminders.append(reminder_id)
-                
-        for reminder_id in due_reminders:
-            reminder = self.reminders[reminder_id]
-            
-            try:
-                user = self.bot.get_user(reminder['user_id'])
-                channel = self.bot.get_channel(reminder['channel_id'])
-                
-                if user and channel:
-                    embed = discord.Embed(
-                        title="⏰ Reminder!",
-                        description=reminder['reminder'],
-                        color=discord.Color.orange()
-                    )
-                    embed.set_footer(text=f"Set {reminder['created'].strftime('%Y-%m-%d %H:%M')}")
-                    await channel.send(f"{user.mention}", embed=embed)
-                    
-            except Exception as e:
-                print(f"Error sending reminder: {e}")
-                
-            del self.reminders[reminder_id]
+        created = datetime.datetime.fromisoformat(reminder['created'])
+        embed = discord.Embed(
+            title="⏰ Reminder!",
+            description=reminder['reminder'],
+            color=discord.Color.orange()
+        )
+        embed.set_footer(text=f"Set {created.strftime('%Y-%m-%d %H:%M')}")
+        await channel.send(f"{user.mention}", embed=embed)
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
+    async def cog_load(self):
+        self.bot.pipeline.register('auto_responses', 'auto_response', self.auto_response_stage, guild_only=True)
+        self.bot.scheduler.register('reminder', self.reminder_job)
+
+    async def cog_unload(self):
+        self.bot.pipeline.unregister('auto_responses')
+        self.bot.scheduler.unregister('reminder')
+
+    async def auto_response_stage(self, message, context):
         """Handle auto responses"""
-        if message.author.bot:
-            return
-            
-        guild_id = str(message.guild.id) if message.guild else None
+        guild_id = str(message.guild.id)
         if guild_id in self.auto_responses:
-            content = message.content.lower()
+            content = context.lower
             
             for trigger, response in self.auto_responses[guild_id].items():
                 if trigger in content:
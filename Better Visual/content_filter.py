@@ -0,0 +1,191 @@
+import logging
+from collections import deque
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Patterns with one boundary mode for all, or a {pattern: boundary} mapping
+PatternSpec = Union[Iterable[str], Dict[str, str]]
+
+class FilterMatch(NamedTuple):
+    """One pattern occurrence; start/end index the lowercased text"""
+    category: str
+    pattern: str
+    start: int
+    end: int
+
+class ContentFilter:
+    """Aho–Corasick matcher over every moderation word list at once.
+
+    Patterns are grouped into categories (e.g. 'blocked', 'profanity:3',
+    'nsfw') and matched case-insensitively in a single pass over the text,
+    however many lists or words there are. Each pattern has a boundary mode:
+
+    - 'substring': match anywhere ("token" matches "bot_token")
+    - 'prefix': must start a word ("sex" matches "sexual", not "sussex")
+    - 'word': must be a whole word or phrase ("ass" never matches "class")
+
+    Edits update the trie in place; the scan tables are recompiled once,
+    on the first scan after a change, not per message.
+    """
+
+    BOUNDARIES = ('substring', 'prefix', 'word')
+
+    def __init__(self):
+        # Trie kept up to date incrementally; the scan tables are derived from it
+        self._children: List[Dict[str, int]] = [{}]
+        self._outputs: List[Dict[Tuple[str, str], str]] = [{}]  # (category, pattern) -> boundary
+        self._patterns: Dict[str, Dict[str, str]] = {}  # category -> pattern -> boundary
+
+        self._delta: List[Dict[str, int]] = []
+        self._emits: List[Tuple[Tuple[str, str, str, int], ...]] = []
+        self._dirty = True
+        self.version = 0
+
+        # Several checks usually scan the same message back to back
+        self._last_text: Optional[str] = None
+        self._last_matches: List[FilterMatch] = []
+
+    def _node_for(self, pattern: str, create: bool) -> Optional[int]:
+        node = 0
+        for char in pattern:
+            child = self._children[node].get(char)
+            if child is None:
+                if not create:
+                    return None
+                child = len(self._children)
+                self._children.append({})
+                self._outputs.append({})
+                self._children[node][char] = child
+            node = child
+        return node
+
+    def _normalize(self, patterns: PatternSpec, boundary: str) -> Dict[str, str]:
+        """Map each pattern to its boundary mode; a dict overrides the default per pattern"""
+        pairs = patterns.items() if isinstance(patterns, dict) else ((p, boundary) for p in patterns)
+        normalized = {}
+        for pattern, mode in pairs:
+            if mode not in self.BOUNDARIES:
+                raise ValueError(f"Unknown boundary mode: {mode}")
+            pattern = pattern.lower().strip()
+            if pattern:
+                normalized[pattern] = mode
+        return normalized
+
+    def add_patterns(self, category: str, patterns: PatternSpec, boundary: str = 'prefix'):
+        """Add patterns to a category"""
+        existing = self._patterns.setdefault(category, {})
+        for pattern, mode in self._normalize(patterns, boundary).items():
+            if existing.get(pattern) == mode:
+                continue
+            existing[pattern] = mode
+            self._outputs[self._node_for(pattern, create=True)][(category, pattern)] = mode
+            self._dirty = True
+
+    def remove_patterns(self, category: str, patterns: Iterable[str]):
+        """Remove patterns from a category; trie nodes are left for reuse"""
+        existing = self._patterns.get(category, {})
+        for pattern in patterns:
+            pattern = pattern.lower().strip()
+            if existing.pop(pattern, None) is None:
+                continue
+            self._outputs[self._node_for(pattern, create=False)].pop((category, pattern), None)
+            self._dirty = True
+
+    def set_patterns(self, category: str, patterns: PatternSpec, boundary: str = 'prefix'):
+        """Make a category contain exactly these patterns, touching only what changed"""
+        wanted = self._normalize(patterns, boundary)
+        current = self._patterns.get(category, {})
+        self.remove_patterns(category, [p for p, mode in current.items() if wanted.get(p) != mode])
+        self.add_patterns(category, wanted)
+
+    def get_patterns(self, category: str) -> Set[str]:
+        """Patterns currently in a category"""
+        return set(self._patterns.get(category, {}))
+
+    def _compile(self):
+        """Derive the goto/failure function as a flat DFA, one dict lookup per character"""
+        size = len(self._children)
+        fail = [0] * size
+        delta: List[Dict[str, int]] = [{} for _ in range(size)]
+        emits: List[Tuple] = [()] * size
+
+        def own(node: int) -> Tuple:
+            return tuple((category, pattern, boundary, len(pattern))
+                         for (category, pattern), boundary in self._outputs[node].items())
+
+        delta[0] = dict(self._children[0])
+        emits[0] = own(0)
+        queue = deque(self._children[0].values())
+        while queue:
+            node = queue.popleft()
+            # Missing transitions fall back to the failure state's
+            delta[node] = {**delta[fail[node]], **self._children[node]}
+            emits[node] = own(node) + emits[fail[node]]
+            for char, child in self._children[node].items():
+                fail[child] = delta[fail[node]].get(char, 0)
+                queue.append(child)
+
+        self._delta = delta
+        self._emits = emits
+        self._dirty = False
+        self._last_text = None
+        self.version += 1
+
+    @staticmethod
+    def _is_word_char(char: str) -> bool:
+        return char.isalnum() or char == '_'
+
+    def scan(self, text: str) -> List[FilterMatch]:
+        """Every pattern occurrence in text, across all categories"""
+        if self._dirty:
+            self._compile()
+        if text == self._last_text:
+            return self._last_matches
+
+        lowered = text.lower()
+        delta = self._delta
+        emits = self._emits
+        is_word = self._is_word_char
+        matches = []
+
+        node = 0
+        for index, char in enumerate(lowered):
+            node = delta[node].get(char, 0)
+            if not emits[node]:
+                continue
+            end = index + 1
+            for category, pattern, boundary, length in emits[node]:
+                start = end - length
+                if boundary != 'substring':
+                    if start > 0 and is_word(lowered[start - 1]) and is_word(pattern[0]):
+                        continue
+                    if (boundary == 'word' and end < len(lowered)
+                            and is_word(lowered[end]) and is_word(pattern[-1])):
+                        continue
+                matches.append(FilterMatch(category, pattern, start, end))
+
+        self._last_text = text
+        self._last_matches = matches
+        return matches
+
+    def find(self, text: str, categories: Optional[Iterable[str]] = None) -> Optional[FilterMatch]:
+        """First match in text, optionally limited to some categories"""
+        wanted = set(categories) if categories is not None else None
+        for match in self.scan(text):
+            if wanted is None or match.category in wanted:
+                return match
+        return None
+
+    def matched_categories(self, text: str) -> Set[str]:
+        """Categories with at least one match in text"""
+        return {match.category for match in self.scan(text)}
+
+    def get_stats(self) -> Dict:
+        """Get content filter statistics"""
+        return {
+            'patterns': sum(len(patterns) for patterns in self._patterns.values()),
+            'categories': len(self._patterns),
+            'states': len(self._children),
+            'version': self.version
+        }
@@ -1,5 +1,4 @@
 import sqlite3
-import json
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
@@ -31,6 +30,13 @@ class Database:
                 )
             ''')
 
+            # Typed columns for the hot per-user counters, added to older databases in place
+            cursor.execute("PRAGMA table_info(users)")
+            existing = {row[1] for row in cursor.fetchall()}
+            for column in ('xp', 'trivia_wins', 'work_streak'):
+                if column not in existing:
+                    cursor.execute(f"ALTER TABLE users ADD COLUMN {column} INTEGER DEFAULT 0")
+
             # Conversations table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS conversations (
@@ -54,6 +60,14 @@ class Database:
                 )
             ''')
 
+            # Last journal segment each write-behind journal has applied
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS journal_checkpoints (
+                    name TEXT PRIMARY KEY,
+                    segment INTEGER NOT NULL
+                )
+            ''')
+
             conn.commit()
             conn.close()
             logger.info("Database initialized successfully")
@@ -61,27 +75,28 @@ class Database:
         except Exception as e:
             logger.error(f"Database initialization error: {e}")
 
+    USER_COLUMNS = ('user_id', 'coins', 'personality_mode', 'total_commands', 'last_daily', 'created_at',
+                    'xp', 'trivia_wins', 'work_streak')
+
+    # Columns update_user may set, and the numeric ones increment_user_field may add to
+    WRITABLE_COLUMNS = ('coins', 'personality_mode', 'total_commands', 'last_daily', 'xp', 'trivia_wins',
+                        'work_streak')
+    COUNTER_COLUMNS = ('coins', 'total_commands', 'xp', 'trivia_wins', 'work_streak')
+
     def get_user(self, user_id: str) -> Dict:
         """Get or create user data"""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
 
-            cursor.execute('''
-                SELECT * FROM users WHERE user_id = ?
+            cursor.execute(f'''
+                SELECT {', '.join(self.USER_COLUMNS)} FROM users WHERE user_id = ?
             ''', (user_id,))
 
             result = cursor.fetchone()
 
             if result:
-                return {
-                    'user_id': result[0],
-                    'coins': result[1],
-                    'personality_mode': result[2],
-                    'total_commands': result[3],
-                    'last_daily': result[4],
-                    'created_at': result[5]
-                }
+                return dict(zip(self.USER_COLUMNS, result))
             else:
                 # Create new user
                 cursor.execute('''
@@ -96,7 +111,10 @@ class Database:
                     'personality_mode': 'friendly',
                     'total_commands': 0,
                     'last_daily': None,
-                    'created_at': datetime.now().isoformat()
+                    'created_at': datetime.now().isoformat(),
+                    'xp': 0,
+                    'trivia_wins': 0,
+                    'work_streak': 0
                 }
 
         except Exception as e:
@@ -340,26 +358,95 @@ class Database:
         except Exception as e:
             logger.error(f"Error updating usage: {e}")
     def update_user(self, user_id: str, updates: dict):
-        """Update user data"""
+        """Update only the given user columns, creating the user if needed"""
         try:
-            # Get current data
-            current_data = self.get_user(user_id) or {}
+            columns = {key: value for key, value in updates.items() if key in self.WRITABLE_COLUMNS}
+            if not columns:
+                return True
 
-            # Merge updates
-            current_data.update(updates)
+            row = {'coins': 1000, 'personality_mode': 'friendly', **columns}
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
 
-            # Ensure coins field exists
-            if 'coins' not in current_data:
-                current_data['coins'] = 0
+            cursor.execute(f'''
+                INSERT INTO users (user_id, {', '.join(row)}) VALUES (?, {', '.join('?' * len(row))})
+                ON CONFLICT (user_id) DO UPDATE SET {', '.join(f"{key} = excluded.{key}" for key in columns)}
+            ''', (user_id, *row.values()))
 
-            # Save back to database
-            self.execute_query(
-                "INSERT OR REPLACE INTO users (user_id, data) VALUES (?, ?)",
-                (user_id, json.dumps(current_data))
-            )
+            conn.commit()
+            conn.close()
 
             logger.info(f"Updated user {user_id}")
             return True
         except Exception as e:
             logger.error(f"Error updating user {user_id}: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def increment_user_field(self, user_id: str, field: str, delta: int = 1) -> Optional[int]:
+        """Add to a counter column in one statement and return its new value"""
+        try:
+            if field not in self.COUNTER_COLUMNS:
+                raise ValueError(f"{field} is not a counter column")
+
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            # A new user starts from the column default (1000 coins, 0 otherwise) plus delta
+            start = 1000 if field == 'coins' else 0
+            cursor.execute(f'''
+                INSERT INTO users (user_id, {field}) VALUES (?, ? + ?)
+                ON CONFLICT (user_id) DO UPDATE SET {field} = COALESCE({field}, 0) + ?
+                RETURNING {field}
+            ''', (user_id, start, delta, delta))
+            value = cursor.fetchone()[0]
+
+            conn.commit()
+            conn.close()
+            return value
+        except Exception as e:
+            logger.error(f"Error incrementing {field} for {user_id}: {e}")
+            return None
+
+    def apply_counter_batch(self, field: str, deltas: Dict[str, int], journal: Optional[str] = None,
+                            segment: Optional[int] = None) -> bool:
+        """Add many users' deltas to a counter column in one transaction, with the journal checkpoint"""
+        try:
+            if field not in self.COUNTER_COLUMNS:
+                raise ValueError(f"{field} is not a counter column")
+
+            start = 1000 if field == 'coins' else 0
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.executemany(f'''
+                INSERT INTO users (user_id, {field}) VALUES (?, ? + ?)
+                ON CONFLICT (user_id) DO UPDATE SET {field} = COALESCE({field}, 0) + ?
+            ''', [(user_id, start, delta, delta) for user_id, delta in deltas.items()])
+
+            if journal is not None:
+                cursor.execute('''
+                    INSERT INTO journal_checkpoints (name, segment) VALUES (?, ?)
+                    ON CONFLICT (name) DO UPDATE SET segment = MAX(segment, excluded.segment)
+                ''', (journal, segment))
+
+            conn.commit()
+            conn.close()
+            return True
+        except Exception as e:
+            logger.error(f"Error applying {field} batch: {e}")
+            return False
+
+    def get_journal_checkpoint(self, journal: str) -> int:
+        """Last segment a journal has applied (0 if none)"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.execute("SELECT segment FROM journal_checkpoints WHERE name = ?", (journal,))
+            row = cursor.fetchone()
+
+            conn.close()
+            return row[0] if row else 0
+        except Exception as e:
+            logger.error(f"Error reading journal checkpoint: {e}")
+            return 0
@@ -3,6 +3,8 @@ import discord
 import logging
 import re
 from typing import Dict, List, Tuple, Optional
+from content_filter import ContentFilter
+from message_context import MessageContext
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +34,14 @@ class DiscordPolicyCompliance:
             'privacy_violation': ['personal_info', 'private_data', 'leak']
         }
         
+        # Terms that suggest harassment; short ones only match as whole words
+        self.content_filter = ContentFilter()
+        self.content_filter.set_patterns('harassment', {
+            'kill yourself': 'prefix', 'kys': 'word', 'suicide': 'prefix', 'harm yourself': 'prefix',
+            'doxx': 'prefix', 'dox': 'word', 'personal info': 'prefix', 'address leak': 'prefix',
+            'harassment': 'prefix', 'stalk': 'prefix', 'follow you': 'word', 'find you': 'word'
+        })
+        
         # Content guidelines
         self.content_guidelines = {
             'no_hate_speech': True,
@@ -54,7 +64,7 @@ class DiscordPolicyCompliance:
     def check_message_compliance(self, message: discord.Message) -> Tuple[bool, List[str]]:
         """Check if message complies with Discord policies"""
         violations = []
-        content = message.content.lower()
+        content = MessageContext.of(message).lower
         
         # Check for token-related content
         if self._contains_tokens(content):
@@ -96,32 +106,24 @@ class DiscordPolicyCompliance:
     
     def _contains_harassment(self, content: str) -> bool:
         """Check for harassment content"""
-        harassment_terms = [
-            'kill yourself', 'kys', 'suicide', 'harm yourself',
-            'doxx', 'dox', 'personal info', 'address leak',
-            'harassment', 'stalk', 'follow you', 'find you'
-        ]
-        
-        return any(term in content for term in harassment_terms)
+        return self.content_filter.find(content, ('harassment',)) is not None
     
     def _is_spam_pattern(self, message: discord.Message) -> bool:
         """Check for spam patterns"""
-        content = message.content
+        context = MessageContext.of(message)
+        content = context.content
         
         # Check for excessive repetition
-        words = content.split()
-        if len(words) > 5:
-            unique_words = set(words)
-            if len(unique_words) / len(words) < 0.3:  # Less than 30% unique words
+        if len(context.words) > 5:
+            if context.unique_word_ratio < 0.3:  # Less than 30% unique words
                 return True
         
         # Check for excessive caps
-        if len(content) > 10 and content.isupper():
+        if len(content) > 10 and context.is_all_caps:
             return True
         
         # Check for excessive special characters
-        special_chars = sum(1 for char in content if not char.isalnum() and not char.isspace())
-        if special_chars > len(content) * 0.5:  # More than 50% special chars
+        if context.char_counts.special > len(content) * 0.5:  # More than 50% special chars
             return True
         
         return False
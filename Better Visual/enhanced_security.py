@@ -1,20 +1,39 @@
 
 import discord
-import hashlib
 import time
 import logging
 import json
-import re
 import asyncio
 import io
 from typing import Dict, List, Optional, Set
 from datetime import datetime, timedelta
+from content_filter import ContentFilter
+from message_context import MessageContext
+from time_window_store import TimeWindowStore
+from near_duplicate import NearDuplicateDetector
+from link_inspector import LinkInspector
+from security_event_store import SecurityEventStore
 
 logger = logging.getLogger(__name__)
 
 class EnhancedSecurityManager:
     """Enterprise-grade security system for Discord bots"""
     
+    # Profanity lists by level; short or ambiguous words only match as whole words
+    PROFANITY_LEVELS = {
+        1: {'fuck': 'prefix', 'shit': 'prefix', 'damn': 'prefix'},  # Very lenient
+        2: {'bitch': 'prefix', 'ass': 'word', 'crap': 'prefix'},  # Lenient
+        3: {'retard': 'prefix', 'fag': 'prefix', 'gay': 'word'},  # Moderate
+        4: {'nigger': 'prefix', 'cunt': 'prefix', 'whore': 'prefix'}, # Strict
+        5: {'kys': 'word', 'kill yourself': 'prefix', 'suicide': 'prefix'} # Very strict
+    }
+    
+    NSFW_KEYWORDS = {
+        'porn': 'prefix', 'xxx': 'prefix', 'sex': 'prefix', 'nude': 'prefix', 'naked': 'prefix',
+        'pussy': 'prefix', 'dick': 'word', 'cock': 'word', 'nsfw': 'prefix', 'hentai': 'prefix',
+        'rule34': 'prefix', 'onlyfans': 'prefix', 'sexual': 'prefix'
+    }
+    
     def __init__(self):
         # Core security settings
         self.blocked_users: Set[str] = set()
@@ -50,9 +69,10 @@ class EnhancedSecurityManager:
         self.min_account_age = 7      # days
         self.auto_ban_new_accounts = False
         
-        # Security logs
-        self.security_logs: List[Dict] = []
+        # Security logs: the newest max_log_entries stay in memory, all are persisted in batches
         self.max_log_entries = 1000
+        self.event_store = SecurityEventStore(capacity=self.max_log_entries)
+        self.security_logs = self.event_store.recent
         self.warnings_issued = 0
         
         # Blocked content
@@ -65,29 +85,44 @@ class EnhancedSecurityManager:
             'discord.com', 'discord.gg', 'discordapp.com', 'youtube.com', 'youtu.be',
             'twitch.tv', 'twitter.com', 'github.com', 'reddit.com', 'imgur.com'
         }
+        # Allowlist plus blocked domains, matched by domain suffix; the file is re-read when edited
+        # and per-server lists are kept in the database
+        self.link_inspector = LinkInspector(self.allowed_domains, blocklist_path='blocked_domains.txt',
+                                            db_path='bot_data.db')
+        
+        # All word lists compiled into one matcher, scanned once per message
+        self.content_filter = ContentFilter()
+        for level, words in self.PROFANITY_LEVELS.items():
+            self.content_filter.set_patterns(f'profanity:{level}', words)
+        self.content_filter.set_patterns('nsfw', self.NSFW_KEYWORDS)
+        self.content_filter.set_patterns('blocked', self.blocked_words, boundary='substring')
         
         # Tracking
-        self.user_activity: Dict[str, Dict] = {}
+        # Per-user message times, and hashes of the last 10 messages from the past 5 minutes
+        self.user_activity = TimeWindowStore(window=60, capacity=self.message_rate_limit)
+        self.message_hashes = TimeWindowStore(window=300, capacity=10, track_values=True)
         self.suspicious_activity: Dict[str, List] = {}
-        self.recent_joins: List[Dict] = []
+        # Joins per guild over the last minute; only the newest join_rate_limit + 1 are kept
+        self.recent_joins = TimeWindowStore(window=60, capacity=self.join_rate_limit + 1, max_keys=10000)
+        # The same text posted from several accounts at once, per guild
+        self.near_duplicates = NearDuplicateDetector()
         
     def log_security_event(self, event_type: str, description: str, user_id: str = None, 
-                          severity: str = "medium", additional_data: Dict = None):
+                          severity: str = "medium", additional_data: Dict = None, guild_id: str = None):
         """Log security events"""
+        additional_data = additional_data or {}
         event = {
             'timestamp': time.time(),
             'type': event_type,
             'description': description,
             'user_id': user_id,
+            'guild_id': str(guild_id) if guild_id is not None else additional_data.get('guild_id'),
             'severity': severity,
-            'additional_data': additional_data or {}
+            'additional_data': additional_data
         }
         
-        self.security_logs.append(event)
-        
-        # Keep only recent logs
-        if len(self.security_logs) > self.max_log_entries:
-            self.security_logs = self.security_logs[-self.max_log_entries:]
+        # Ring buffer for the live view; written to the database in the background
+        self.event_store.append(event)
         
         logger.warning(f"Security Event [{severity.upper()}]: {event_type} - {description}")
         
@@ -115,7 +150,7 @@ class EnhancedSecurityManager:
             return False, "Inappropriate content", "profanity"
         
         # Link protection
-        if self.link_protection and not self._check_links(content):
+        if self.link_protection and not self._check_links(content, message.guild.id if message.guild else None):
             self.log_security_event("SUSPICIOUS_LINK", f"Suspicious link from {message.author}", user_id, "high")
             return False, "Suspicious link detected", "suspicious_link"
         
@@ -141,90 +176,47 @@ class EnhancedSecurityManager:
     
     def _check_spam(self, message: discord.Message) -> bool:
         """Check for spam patterns"""
-        user_id = str(message.author.id)
-        current_time = time.time()
-        
-        if user_id not in self.user_activity:
-            self.user_activity[user_id] = {'messages': [], 'commands': [], 'reactions': []}
-        
-        # Remove old messages (older than 1 minute)
-        self.user_activity[user_id]['messages'] = [
-            msg_time for msg_time in self.user_activity[user_id]['messages']
-            if current_time - msg_time < 60
-        ]
-        
-        # Check message rate
-        if len(self.user_activity[user_id]['messages']) >= self.message_rate_limit:
-            return False
-        
-        self.user_activity[user_id]['messages'].append(current_time)
-        return True
+        return self.user_activity.allow(str(message.author.id), self.message_rate_limit)
     
     def _check_profanity(self, content: str) -> bool:
         """Check for inappropriate content based on profanity level"""
-        content_lower = content.lower()
-        
-        # Basic profanity lists by level
-        profanity_lists = {
-            1: ['fuck', 'shit', 'damn'],  # Very lenient
-            2: ['bitch', 'ass', 'crap'],  # Lenient
-            3: ['retard', 'fag', 'gay'],  # Moderate
-            4: ['nigger', 'cunt', 'whore'], # Strict
-            5: ['kys', 'kill yourself', 'suicide'] # Very strict
-        }
-        
-        for level in range(1, self.profanity_level + 1):
-            for word in profanity_lists.get(level, []):
-                if word in content_lower:
-                    return False
-        
-        return True
+        levels = [f'profanity:{level}' for level in range(1, self.profanity_level + 1)]
+        return self.content_filter.find(content, levels) is None
     
-    def _check_links(self, content: str) -> bool:
+    def _check_links(self, content: str, guild_id: Optional[int] = None) -> bool:
         """Check for suspicious links"""
-        # Extract URLs
-        url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-        urls = re.findall(url_pattern, content)
-        
-        for url in urls:
-            domain = re.search(r'https?://([^/]+)', url)
-            if domain:
-                domain = domain.group(1).lower()
-                # Check if domain is in whitelist
-                if not any(allowed in domain for allowed in self.allowed_domains):
-                    return False
-        
-        return True
+        urls = MessageContext.of(content).urls
+        if not urls:
+            return True
+        
+        verdict = self.link_inspector.inspect(urls, guild_id)
+        if not verdict.allowed:
+            logger.info(f"Link rejected ({verdict.reason}): {verdict.host}")
+        return verdict.allowed
     
     def _check_nsfw_content(self, content: str) -> bool:
-        """Check for NSFW content"""
-        nsfw_keywords = [
-            'porn', 'xxx', 'sex', 'nude', 'naked', 'pussy', 'dick', 'cock',
-            'nsfw', 'hentai', 'rule34', 'onlyfans', 'sexual'
-        ]
-        
-        content_lower = content.lower()
-        return not any(keyword in content_lower for keyword in nsfw_keywords)
+        """Check for NSFW content; True when some is found"""
+        return self.content_filter.find(content, ('nsfw',)) is not None
     
     def _check_duplicate_message(self, message: discord.Message) -> bool:
         """Check for duplicate message spam"""
         user_id = str(message.author.id)
-        content_hash = hashlib.md5(message.content.encode()).hexdigest()
-        
-        if user_id not in self.user_activity:
-            self.user_activity[user_id] = {'message_hashes': []}
-        
-        recent_hashes = self.user_activity[user_id].get('message_hashes', [])
+        content_hash = MessageContext.of(message).content_hash
         
         # Check if same message sent recently
-        if content_hash in recent_hashes[-5:]:  # Check last 5 messages
+        if content_hash in self.message_hashes.recent_values(user_id, 5):  # Check last 5 messages
             return True
         
-        recent_hashes.append(content_hash)
-        if len(recent_hashes) > 10:
-            recent_hashes = recent_hashes[-10:]
+        self.message_hashes.hit(user_id, content_hash)
         
-        self.user_activity[user_id]['message_hashes'] = recent_hashes
+        # Near-identical text from several accounts in the same guild
+        if message.guild:
+            result = self.near_duplicates.observe(message.guild.id, user_id, MessageContext.of(message).tokens)
+            if result.flagged:
+                self.log_security_event("SPAM_WAVE", f"Near-duplicate message from {result.accounts + 1} accounts",
+                                       user_id, "high", {'fingerprint': f"{result.fingerprint:016x}"},
+                                       guild_id=message.guild.id)
+                return True
         return False
     
     def check_raid_protection(self, member: discord.Member) -> tuple[bool, str]:
@@ -232,32 +224,21 @@ class EnhancedSecurityManager:
         if not self.raid_protection:
             return True, "Raid protection disabled"
         
-        current_time = time.time()
-        
-        # Track recent joins
-        self.recent_joins.append({
-            'user_id': str(member.id),
-            'timestamp': current_time,
-            'account_age': (datetime.now() - member.created_at).days
-        })
-        
-        # Remove old joins (older than 1 minute)
-        self.recent_joins = [
-            join for join in self.recent_joins
-            if current_time - join['timestamp'] < 60
-        ]
+        # Track recent joins (the window holds at most join_rate_limit + 1)
+        self.recent_joins.capacity = max(self.recent_joins.capacity, self.join_rate_limit + 1)
+        recent_joins = self.recent_joins.hit(member.guild.id)
         
         # Check join rate
-        if len(self.recent_joins) > self.join_rate_limit:
-            self.log_security_event("RAID_DETECTED", f"High join rate detected: {len(self.recent_joins)} joins", 
-                                   severity="critical")
+        if recent_joins > self.join_rate_limit:
+            self.log_security_event("RAID_DETECTED", f"High join rate detected: {recent_joins} joins", 
+                                   severity="critical", guild_id=member.guild.id)
             return False, "Raid detected - high join rate"
         
         # Check account age
         account_age = (datetime.now() - member.created_at).days
         if account_age < self.min_account_age:
             self.log_security_event("SUSPICIOUS_ACCOUNT", f"New account joined: {member} (age: {account_age} days)", 
-                                   str(member.id), "medium")
+                                   str(member.id), "medium", guild_id=member.guild.id)
             
             if self.auto_ban_new_accounts:
                 return False, f"Account too new ({account_age} days)"
@@ -308,15 +289,19 @@ class EnhancedSecurityManager:
     
     def get_recent_logs(self, limit: int = 50) -> List[Dict]:
         """Get recent security logs"""
-        return self.security_logs[-limit:] if self.security_logs else []
+        return self.event_store.get_recent(limit)
     
     def get_all_logs(self) -> List[Dict]:
-        """Get all security logs"""
-        return self.security_logs
+        """Get the security logs still held in memory"""
+        return list(self.security_logs)
+    
+    async def query_logs(self, limit: int = 50, before_id: int = None, **filters) -> List[Dict]:
+        """Page through persisted security logs, newest first (filters: guild_id, user_id, event_type, since, until)"""
+        return await self.event_store.query(limit=limit, before_id=before_id, **filters)
     
     def clear_logs(self):
-        """Clear all security logs"""
-        self.security_logs.clear()
+        """Clear the live security log; persisted history is kept"""
+        self.event_store.clear_recent()
         self.log_security_event("LOGS_CLEARED", "Security logs cleared", severity="low")
     
     def export_security_data(self) -> Dict:
@@ -325,7 +310,7 @@ class EnhancedSecurityManager:
             'blocked_users': list(self.blocked_users),
             'trusted_users': list(self.trusted_users),
             'warned_users': self.warned_users,
-            'security_logs': self.security_logs,
+            'security_logs': list(self.security_logs),
             'settings': {
                 'anti_spam_enabled': self.anti_spam_enabled,
                 'bad_words_filter': self.bad_words_filter,
@@ -347,7 +332,8 @@ class EnhancedSecurityManager:
         if 'warned_users' in data:
             self.warned_users = data['warned_users']
         if 'security_logs' in data:
-            self.security_logs = data['security_logs']
+            for event in data['security_logs'][-self.max_log_entries:]:
+                self.security_logs.append(event)
         if 'settings' in data:
             settings = data['settings']
             for key, value in settings.items():
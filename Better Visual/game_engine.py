@@ -0,0 +1,264 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+WIN_SCORE = 1_000_000
+
+def _popcount(bits: int) -> int:
+    return bin(bits).count('1')
+
+class ConnectFour:
+    """Connect Four on two bitboards, one per player.
+
+    Each column takes HEIGHT + 1 bits (the extra bit stays empty so lines
+    cannot wrap into the next column) and the bit for (row, col) is
+    col * STRIDE + row, row 0 at the bottom. Dropping a piece sets the
+    column's next free bit; four in a row is found with three shift-and
+    tests per direction, whatever the position.
+    """
+
+    WIDTH = 7
+    HEIGHT = 6
+    CELLS = WIDTH * HEIGHT
+    STRIDE = HEIGHT + 1
+    BOTTOM = int(('0' * HEIGHT + '1') * WIDTH, 2)  # Lowest bit of every column
+    FULL = BOTTOM * ((1 << HEIGHT) - 1)
+    ORDER = (3, 2, 4, 1, 5, 0, 6)  # Center columns first; better moves are searched earlier
+    SHIFTS = (1, STRIDE, STRIDE - 1, STRIDE + 1)  # Vertical, horizontal and the two diagonals
+
+    def __init__(self):
+        self.boards = [0, 0]
+        self.heights = [col * self.STRIDE for col in range(self.WIDTH)]
+        self.moves = 0
+        self.history: List[int] = []
+
+    @property
+    def turn(self) -> int:
+        """Index (0 or 1) of the player to move"""
+        return self.moves & 1
+
+    def can_play(self, col: int) -> bool:
+        return 0 <= col < self.WIDTH and self.heights[col] < col * self.STRIDE + self.HEIGHT
+
+    def legal_moves(self) -> List[int]:
+        return [col for col in self.ORDER if self.can_play(col)]
+
+    def play(self, col: int) -> int:
+        """Drop the mover's piece in a column; returns the row it landed on (0 = bottom)"""
+        bit = self.heights[col]
+        self.boards[self.turn] |= 1 << bit
+        self.heights[col] += 1
+        self.moves += 1
+        self.history.append(col)
+        return bit - col * self.STRIDE
+
+    def undo(self):
+        col = self.history.pop()
+        self.moves -= 1
+        self.heights[col] -= 1
+        self.boards[self.turn] ^= 1 << self.heights[col]
+
+    @classmethod
+    def has_line(cls, board: int) -> bool:
+        for shift in cls.SHIFTS:
+            pairs = board & (board >> shift)
+            if pairs & (pairs >> (2 * shift)):
+                return True
+        return False
+
+    def last_won(self) -> bool:
+        """Whether the player who just moved has four in a row"""
+        return self.has_line(self.boards[self.turn ^ 1])
+
+    def is_full(self) -> bool:
+        return self.moves == self.CELLS
+
+    def key(self) -> Tuple[int, int]:
+        return self.boards[0], self.boards[1]
+
+    def cell(self, row: int, col: int) -> Optional[int]:
+        """Player (0 or 1) on a cell, row 0 being the top as displayed, or None"""
+        bit = 1 << (col * self.STRIDE + self.HEIGHT - 1 - row)
+        if self.boards[0] & bit:
+            return 0
+        if self.boards[1] & bit:
+            return 1
+        return None
+
+    @classmethod
+    def _winning_cells(cls, board: int, empty: int) -> int:
+        """Empty cells that would complete four in a row for board"""
+        cells = (board << 1) & (board << 2) & (board << 3)
+        for shift in cls.SHIFTS[1:]:
+            pair = (board << shift) & (board << 2 * shift)
+            cells |= pair & (board << 3 * shift)
+            cells |= pair & (board >> shift)
+            pair = (board >> shift) & (board >> 2 * shift)
+            cells |= pair & (board << shift)
+            cells |= pair & (board >> 3 * shift)
+        return cells & empty
+
+    def evaluate(self) -> int:
+        """Heuristic score for the player to move: open threats, then center control"""
+        me, them = self.boards[self.turn], self.boards[self.turn ^ 1]
+        empty = self.FULL & ~(me | them)
+        center = ((1 << self.HEIGHT) - 1) << (3 * self.STRIDE)
+        return (100 * (_popcount(self._winning_cells(me, empty)) - _popcount(self._winning_cells(them, empty)))
+                + 3 * (_popcount(me & center) - _popcount(them & center)))
+
+class TicTacToe:
+    """Tic-tac-toe on the same bitboard scheme, with rows of 3 cells plus an empty guard bit.
+
+    The bit for (row, col) is row * 4 + col, so three in a row is a
+    shift-and test per direction just like Connect Four.
+    """
+
+    CELLS = 9
+    STRIDE = 4
+    SHIFTS = (1, STRIDE, STRIDE + 1, STRIDE - 1)  # Horizontal, vertical and the two diagonals
+    ORDER = (4, 0, 2, 6, 8, 1, 3, 5, 7)  # Positions 0-8 (row * 3 + col), center and corners first
+
+    def __init__(self):
+        self.boards = [0, 0]
+        self.moves = 0
+        self.history: List[int] = []
+
+    @property
+    def turn(self) -> int:
+        return self.moves & 1
+
+    def _bit(self, position: int) -> int:
+        return 1 << ((position // 3) * self.STRIDE + position % 3)
+
+    def can_play(self, position: int) -> bool:
+        return 0 <= position < 9 and not (self.boards[0] | self.boards[1]) & self._bit(position)
+
+    def legal_moves(self) -> List[int]:
+        return [position for position in self.ORDER if self.can_play(position)]
+
+    def play(self, position: int):
+        self.boards[self.turn] |= self._bit(position)
+        self.moves += 1
+        self.history.append(position)
+
+    def undo(self):
+        position = self.history.pop()
+        self.moves -= 1
+        self.boards[self.turn] ^= self._bit(position)
+
+    @classmethod
+    def has_line(cls, board: int) -> bool:
+        for shift in cls.SHIFTS:
+            if board & (board >> shift) & (board >> 2 * shift):
+                return True
+        return False
+
+    def last_won(self) -> bool:
+        return self.has_line(self.boards[self.turn ^ 1])
+
+    def is_full(self) -> bool:
+        return self.moves == self.CELLS
+
+    def key(self) -> Tuple[int, int]:
+        return self.boards[0], self.boards[1]
+
+    def cell(self, row: int, col: int) -> Optional[int]:
+        bit = self._bit(row * 3 + col)
+        if self.boards[0] & bit:
+            return 0
+        if self.boards[1] & bit:
+            return 1
+        return None
+
+    def evaluate(self) -> int:
+        return 0  # The whole tree is searched, so this is never reached in practice
+
+class _OutOfTime(Exception):
+    pass
+
+# Transposition table flags: the stored value is exact, a lower bound or an upper bound
+_EXACT, _LOWER, _UPPER = 0, 1, 2
+
+class _Search:
+    """Negamax with alpha-beta pruning and a transposition table"""
+
+    def __init__(self, game, deadline: float):
+        self.game = game
+        self.deadline = deadline
+        self.table: Dict[Tuple[int, int], Tuple[int, int, int, Optional[int]]] = {}
+        self.nodes = 0
+
+    def negamax(self, depth: int, alpha: int, beta: int) -> Tuple[int, Optional[int]]:
+        self.nodes += 1
+        if not self.nodes & 1023 and time.perf_counter() > self.deadline:
+            raise _OutOfTime()
+
+        game = self.game
+        if game.last_won():
+            return -(WIN_SCORE + depth), None  # Losing later (less depth left) scores better
+        if game.is_full():
+            return 0, None
+        if depth == 0:
+            return game.evaluate(), None
+
+        key = game.key()
+        entry = self.table.get(key)
+        hint = None
+        alpha_before = alpha
+        if entry:
+            stored_depth, value, flag, hint = entry
+            if stored_depth >= depth:
+                if flag == _EXACT:
+                    return value, hint
+                if flag == _LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value, hint
+
+        moves = game.legal_moves()
+        if hint in moves:
+            moves.remove(hint)
+            moves.insert(0, hint)
+
+        best_value, best_move = -WIN_SCORE * 2, moves[0]
+        for move in moves:
+            game.play(move)
+            try:
+                value = -self.negamax(depth - 1, -beta, -alpha)[0]
+            finally:
+                game.undo()
+            if value > best_value:
+                best_value, best_move = value, move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                break
+
+        flag = _UPPER if best_value <= alpha_before else _LOWER if best_value >= beta else _EXACT
+        self.table[key] = (depth, best_value, flag, best_move)
+        return best_value, best_move
+
+def best_move(game, time_budget: float = 1.0, max_depth: int = 42) -> int:
+    """Pick a move by iterative deepening until time_budget seconds are spent or the game is solved.
+
+    Each finished depth seeds the next one's move ordering through the
+    transposition table; if the budget runs out mid-depth, the best move
+    of the last finished depth is played. Module-level and free of
+    anything but plain ints, so it can run in a worker process.
+    """
+    moves = game.legal_moves()
+    if not moves:
+        raise ValueError("no legal moves")
+    search = _Search(game, time.perf_counter() + time_budget)
+    choice = moves[0]
+    for depth in range(1, min(max_depth, game.CELLS - game.moves) + 1):
+        try:
+            value, move = search.negamax(depth, -WIN_SCORE * 2, WIN_SCORE * 2)
+        except _OutOfTime:
+            # The aborted search has undone its moves on the way out
+            break
+        if move is not None:
+            choice = move
+        if abs(value) >= WIN_SCORE:
+            break  # Forced win or loss found; deeper search cannot change it
+    return choice
@@ -0,0 +1,308 @@
+import logging
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Letters, digits and inner hyphens per label, once IDNA-encoded
+_HOSTNAME = re.compile(r"(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)*[a-z0-9](?:[a-z0-9-]*[a-z0-9])?")
+
+def normalize_host(host: str) -> Optional[str]:
+    """Lowercase ASCII (IDNA) form of a URL host, without port or trailing dot; None if invalid"""
+    host = host.strip().rstrip('.').lower()
+    if not host:
+        return None
+    try:
+        # Punycode internationalized labels so lookalike Unicode hosts compare by their real name
+        host = host.encode('idna').decode('ascii')
+    except UnicodeError:
+        return None
+    return host if _HOSTNAME.fullmatch(host) else None
+
+class LinkVerdict(NamedTuple):
+    """Result of inspecting the links in one message"""
+    allowed: bool
+    host: Optional[str]  # The offending host, when not allowed
+    reason: str
+
+class DomainTrie:
+    """Set of domains stored as a trie of reversed labels.
+
+    A host matches an entry when the entry is the host itself or one of
+    its parent domains, checked label by label from the TLD, so lookups
+    cost O(labels) however many entries there are. Unlike a substring
+    test, "discord.com" matches "cdn.discord.com" but not
+    "discord.com.evil.io" or "notdiscord.com".
+    """
+
+    _END = ''  # Key marking that the path so far is a listed domain; labels are never empty
+
+    def __init__(self, domains: Iterable[str] = ()):
+        self._root: Dict = {}
+        self._size = 0
+        for domain in domains:
+            self.add(domain)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @staticmethod
+    def _labels(domain: str) -> Optional[List[str]]:
+        host = normalize_host(domain.strip().lstrip('*').lstrip('.'))
+        return host.split('.')[::-1] if host else None
+
+    def add(self, domain: str) -> bool:
+        """Add a domain (and with it all its subdomains)"""
+        labels = self._labels(domain)
+        if not labels:
+            return False
+        node = self._root
+        for label in labels:
+            node = node.setdefault(label, {})
+        if self._END in node:
+            return False
+        node[self._END] = True
+        self._size += 1
+        return True
+
+    def remove(self, domain: str) -> bool:
+        """Remove a domain; its listed subdomains stay listed"""
+        labels = self._labels(domain)
+        if not labels:
+            return False
+        path = [self._root]
+        for label in labels:
+            node = path[-1].get(label)
+            if node is None:
+                return False
+            path.append(node)
+        if path[-1].pop(self._END, None) is None:
+            return False
+        self._size -= 1
+        # Prune branches left empty
+        for parent, label in zip(reversed(path[:-1]), reversed(labels)):
+            if parent[label]:
+                break
+            del parent[label]
+        return True
+
+    def match(self, host: str) -> Optional[str]:
+        """The most specific listed domain covering an already-normalized host"""
+        node = self._root
+        matched = None
+        depth = 0
+        labels = host.split('.')[::-1]
+        for label in labels:
+            node = node.get(label)
+            if node is None:
+                break
+            depth += 1
+            if self._END in node:
+                matched = depth
+        return '.'.join(reversed(labels[:matched])) if matched else None
+
+    def domains(self) -> Set[str]:
+        """Every listed domain"""
+        found = set()
+        stack = [(self._root, [])]
+        while stack:
+            node, labels = stack.pop()
+            for label, child in node.items():
+                if label == self._END:
+                    found.add('.'.join(reversed(labels)))
+                else:
+                    stack.append((child, labels + [label]))
+        return found
+
+class LinkInspector:
+    """Checks message links against global and per-guild domain lists.
+
+    Hosts are taken from each URL with urlsplit (dropping credentials and
+    port) and normalized once. A blocked domain always wins; otherwise the
+    host must be covered by the global or the guild's allowlist. The global
+    blocklist can come from a file (one domain per line, # comments), which
+    is re-read when its modification time changes, checked at most every
+    reload_interval seconds. With a db_path, guild lists are kept in a
+    `guild_domains` table, loaded once here and written on each change.
+    """
+
+    def __init__(self, allowed: Iterable[str] = (), blocklist_path: Optional[str] = None,
+                 reload_interval: float = 30, db_path: Optional[str] = None):
+        self.allowed = DomainTrie(allowed)
+        self.blocked = DomainTrie()
+        self.guild_allowed: Dict[str, DomainTrie] = {}
+        self.guild_blocked: Dict[str, DomainTrie] = {}
+        self.db_path = db_path
+
+        self.blocklist_path = blocklist_path
+        self.reload_interval = reload_interval
+        self._file_blocked = DomainTrie()
+        self._blocklist_mtime: Optional[float] = None
+        self._next_reload_check = 0.0
+
+        self.inspected = 0
+        self.rejected = 0
+        self.reloads = 0
+
+        if db_path:
+            self._load_guild_lists()
+
+    @staticmethod
+    def extract_hosts(urls: Iterable[str]) -> List[Optional[str]]:
+        """Normalized host of each URL; None for ones that cannot be parsed"""
+        hosts = []
+        for url in urls:
+            try:
+                host = urlsplit(url).hostname
+            except ValueError:
+                host = None
+            hosts.append(normalize_host(host) if host else None)
+        return hosts
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=5.0)
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS guild_domains (
+                guild_id TEXT NOT NULL,
+                list TEXT NOT NULL,
+                domain TEXT NOT NULL,
+                PRIMARY KEY (guild_id, list, domain)
+            )
+        ''')
+        return conn
+
+    def _load_guild_lists(self):
+        try:
+            with closing(self._connect()) as conn:
+                rows = conn.execute("SELECT guild_id, list, domain FROM guild_domains").fetchall()
+            for guild_id, kind, domain in rows:
+                lists = self.guild_allowed if kind == 'allow' else self.guild_blocked
+                self._guild_list(lists, guild_id).add(domain)
+            logger.info(f"Loaded {len(rows)} guild domain entries")
+        except Exception as e:
+            logger.error(f"Error loading guild domain lists: {e}")
+
+    def _persist(self, guild_id, kind: str, domain: str, present: bool):
+        """Mirror one guild list change to the database"""
+        if not self.db_path:
+            return
+        # Stored normalized, as the trie holds it
+        row = (str(guild_id), kind, '.'.join(reversed(DomainTrie._labels(domain))))
+        try:
+            with closing(self._connect()) as conn, conn:
+                if present:
+                    conn.execute("INSERT OR IGNORE INTO guild_domains (guild_id, list, domain) VALUES (?, ?, ?)", row)
+                else:
+                    conn.execute("DELETE FROM guild_domains WHERE guild_id = ? AND list = ? AND domain = ?", row)
+        except Exception as e:
+            logger.error(f"Error saving guild domain list: {e}")
+
+    def _guild_list(self, lists: Dict[str, DomainTrie], guild_id) -> DomainTrie:
+        return lists.setdefault(str(guild_id), DomainTrie())
+
+    def allow_domain(self, domain: str, guild_id=None) -> bool:
+        """Add a domain to the global or a guild's allowlist"""
+        if guild_id is None:
+            return self.allowed.add(domain)
+        added = self._guild_list(self.guild_allowed, guild_id).add(domain)
+        if added:
+            self._persist(guild_id, 'allow', domain, True)
+        return added
+
+    def disallow_domain(self, domain: str, guild_id=None) -> bool:
+        """Remove a domain from the global or a guild's allowlist"""
+        if guild_id is None:
+            return self.allowed.remove(domain)
+        target = self.guild_allowed.get(str(guild_id))
+        removed = bool(target and target.remove(domain))
+        if removed:
+            self._persist(guild_id, 'allow', domain, False)
+        return removed
+
+    def block_domain(self, domain: str, guild_id=None) -> bool:
+        """Add a domain to the global or a guild's blocklist"""
+        if guild_id is None:
+            return self.blocked.add(domain)
+        added = self._guild_list(self.guild_blocked, guild_id).add(domain)
+        if added:
+            self._persist(guild_id, 'block', domain, True)
+        return added
+
+    def unblock_domain(self, domain: str, guild_id=None) -> bool:
+        """Remove a domain from the global or a guild's blocklist"""
+        if guild_id is None:
+            return self.blocked.remove(domain)
+        target = self.guild_blocked.get(str(guild_id))
+        removed = bool(target and target.remove(domain))
+        if removed:
+            self._persist(guild_id, 'block', domain, False)
+        return removed
+
+    def reload_blocklist(self, force: bool = False) -> bool:
+        """Re-read the blocklist file if it changed; returns whether it was loaded"""
+        if not self.blocklist_path:
+            return False
+        try:
+            mtime = os.path.getmtime(self.blocklist_path)
+        except OSError:
+            # A missing file means an empty list
+            if self._blocklist_mtime is not None:
+                self._file_blocked = DomainTrie()
+                self._blocklist_mtime = None
+            return False
+        if not force and mtime == self._blocklist_mtime:
+            return False
+
+        try:
+            with open(self.blocklist_path, encoding='utf-8') as f:
+                entries = [line.split('#', 1)[0].strip() for line in f]
+            self._file_blocked = DomainTrie(entry for entry in entries if entry)
+            self._blocklist_mtime = mtime
+            self.reloads += 1
+            logger.info(f"Loaded {len(self._file_blocked)} blocked domains from {self.blocklist_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Error loading domain blocklist: {e}")
+            return False
+
+    def inspect(self, urls: Iterable[str], guild_id=None) -> LinkVerdict:
+        """Check every URL in a message; the first disallowed host decides"""
+        now = time.monotonic()
+        if self.blocklist_path and now >= self._next_reload_check:
+            self._next_reload_check = now + self.reload_interval
+            self.reload_blocklist()
+
+        guild_key = str(guild_id) if guild_id is not None else None
+        guild_allowed = self.guild_allowed.get(guild_key)
+        guild_blocked = self.guild_blocked.get(guild_key)
+
+        for host in self.extract_hosts(urls):
+            self.inspected += 1
+            if host is None:
+                self.rejected += 1
+                return LinkVerdict(False, None, "Unparseable link")
+            for blocklist in (self.blocked, self._file_blocked, guild_blocked):
+                if blocklist is not None and blocklist.match(host):
+                    self.rejected += 1
+                    return LinkVerdict(False, host, "Blocked domain")
+            if not (self.allowed.match(host) or (guild_allowed is not None and guild_allowed.match(host))):
+                self.rejected += 1
+                return LinkVerdict(False, host, "Domain not in allowlist")
+
+        return LinkVerdict(True, None, "OK")
+
+    def get_stats(self) -> Dict:
+        """Get link inspector statistics"""
+        return {
+            'allowed_domains': len(self.allowed),
+            'blocked_domains': len(self.blocked) + len(self._file_blocked),
+            'guild_lists': len(self.guild_allowed) + len(self.guild_blocked),
+            'inspected': self.inspected,
+            'rejected': self.rejected,
+            'blocklist_reloads': self.reloads
+        }
@@ -0,0 +1,167 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Hashable, Iterable, NamedTuple, Optional, Tuple
+
+class NearDuplicateResult(NamedTuple):
+    """Outcome of observing one message"""
+    fingerprint: int  # Hash of the MinHash signature, for correlating log entries
+    accounts: int  # Distinct other accounts that recently sent near-identical text
+    score: float   # Time-decayed weight of those accounts
+    flagged: bool
+
+class Sighting:
+    __slots__ = ('timestamp', 'scope', 'author', 'signature')
+
+    def __init__(self, timestamp: float, scope: Hashable, author: Hashable, signature: Tuple[int, ...]):
+        self.timestamp = timestamp
+        self.scope = scope
+        self.author = author
+        self.signature = signature
+
+def minhash(text: str, num_hashes: int = 32, shingle_size: int = 5, max_chars: int = 512) -> Tuple[int, ...]:
+    """One-permutation MinHash signature of text's character shingles.
+
+    Each shingle is hashed once; the hash picks one of num_hashes bins and
+    each bin keeps its minimum, so the cost is linear in the text rather
+    than num_hashes passes over it. Empty bins (short text) borrow the next
+    non-empty bin's value, offset by the distance, so two signatures agree
+    in about the fraction of slots given by the texts' Jaccard similarity.
+    """
+    text = text[:max_chars]
+    if len(text) <= shingle_size:
+        shingles = {text}
+    else:
+        shingles = {text[i:i + shingle_size] for i in range(len(text) - shingle_size + 1)}
+
+    empty = 1 << 64
+    mins = [empty] * num_hashes
+    for shingle in shingles:
+        value = hash(shingle) & 0xFFFFFFFFFFFFFFFF
+        slot = value % num_hashes
+        value //= num_hashes
+        if value < mins[slot]:
+            mins[slot] = value
+
+    signature = list(mins)
+    for slot in range(num_hashes):
+        distance = 1
+        while signature[slot] == empty:
+            borrowed = mins[(slot + distance) % num_hashes]
+            if borrowed != empty:
+                signature[slot] = borrowed + distance * empty
+            distance += 1
+    return tuple(signature)
+
+class NearDuplicateDetector:
+    """Guild-wide detector for the same message posted from many accounts.
+
+    Each message is reduced to a MinHash signature of its normalized text
+    and indexed under 8 LSH bands of 4 slots, so texts with high Jaccard
+    similarity are found with 8 bucket lookups instead of a scan; candidates
+    are confirmed by comparing signatures. Sightings expire after `window`
+    seconds from one time-ordered queue, and each matching account counts
+    with weight 0.5 ** (age / half_life), so a burst of slightly varied
+    copies from several accounts is flagged while the same text trickling
+    in over minutes is not.
+    """
+
+    BANDS = 8
+    ROWS = 4
+
+    def __init__(self, window: float = 120, half_life: float = 30, min_accounts: float = 3.0,
+                 min_similarity: float = 0.6, min_length: int = 12, max_bucket: int = 64,
+                 max_sightings: int = 50000):
+        self.window = window
+        self.half_life = half_life
+        self.min_accounts = min_accounts
+        self.min_similarity = min_similarity
+        self.min_length = min_length
+        self.max_bucket = max_bucket
+        self.max_sightings = max_sightings
+
+        self._buckets: Dict[Tuple, Deque[Sighting]] = {}
+        self._timeline: Deque[Tuple[Sighting, Tuple[Tuple, ...]]] = deque()
+
+        self.observed = 0
+        self.flagged = 0
+
+    def _band_keys(self, scope: Hashable, signature: Tuple[int, ...]) -> Tuple[Tuple, ...]:
+        rows = self.ROWS
+        return tuple((scope, band, hash(signature[band * rows:(band + 1) * rows]))
+                     for band in range(self.BANDS))
+
+    def _expire(self, now: float):
+        """Drop sightings older than the window; each is removed exactly once"""
+        cutoff = now - self.window
+        timeline = self._timeline
+        while timeline and (timeline[0][0].timestamp <= cutoff or len(timeline) > self.max_sightings):
+            sighting, keys = timeline.popleft()
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if not bucket:
+                    continue
+                # Buckets are time-ordered, and a full bucket may already have dropped it
+                if bucket[0] is sighting:
+                    bucket.popleft()
+                if not bucket:
+                    del self._buckets[key]
+
+    def observe(self, scope: Hashable, author: Hashable, tokens: Iterable[str],
+                now: Optional[float] = None) -> NearDuplicateResult:
+        """Index one message (as normalized word tokens) and score its recent near-duplicates"""
+        now = time.time() if now is None else now
+        self._expire(now)
+        self.observed += 1
+
+        text = ' '.join(tokens)
+        if len(text) < self.min_length:
+            # Short replies ("ok", "lol") are legitimately repeated by everyone
+            return NearDuplicateResult(0, 0, 0.0, False)
+
+        signature = minhash(text, self.BANDS * self.ROWS)
+        keys = self._band_keys(scope, signature)
+        needed = self.min_similarity * len(signature)
+
+        # Newest weight per other account among near-identical sightings
+        weights: Dict[Hashable, float] = {}
+        seen = set()
+        for key in keys:
+            for sighting in self._buckets.get(key, ()):
+                if id(sighting) in seen or sighting.author == author:
+                    continue
+                seen.add(id(sighting))
+                if sum(a == b for a, b in zip(sighting.signature, signature)) < needed:
+                    continue
+                weight = 0.5 ** ((now - sighting.timestamp) / self.half_life)
+                if weight > weights.get(sighting.author, 0.0):
+                    weights[sighting.author] = weight
+
+        sighting = Sighting(now, scope, author, signature)
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = deque(maxlen=self.max_bucket)
+            bucket.append(sighting)
+        self._timeline.append((sighting, keys))
+
+        # The sender counts too once anyone else has matched
+        score = sum(weights.values()) + 1.0 if weights else 0.0
+        flagged = score >= self.min_accounts
+        if flagged:
+            self.flagged += 1
+        return NearDuplicateResult(hash(signature) & 0xFFFFFFFFFFFFFFFF, len(weights), score, flagged)
+
+    def forget_scope(self, scope: Hashable):
+        """Drop every sighting for a guild, e.g. after a raid has been handled"""
+        for key in [key for key in self._buckets if key[0] == scope]:
+            del self._buckets[key]
+        self._timeline = deque(entry for entry in self._timeline if entry[0].scope != scope)
+
+    def get_stats(self) -> Dict:
+        """Get near-duplicate detector statistics"""
+        return {
+            'sightings': len(self._timeline),
+            'buckets': len(self._buckets),
+            'observed': self.observed,
+            'flagged': self.flagged
+        }
@@ -0,0 +1,235 @@
+import asyncio
+import json
+import logging
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class SecurityEventStore:
+    """Append-only security event log: an in-memory ring plus batched SQLite persistence.
+
+    Logging an event only appends to two bounded deques, so a raid that
+    produces thousands of events per second never touches the disk from
+    the event loop. A background task writes pending events in batches on a
+    dedicated thread; queries page by event id over indexed columns and
+    exports stream page by page instead of loading the whole history.
+    """
+
+    COLUMNS = ('id', 'timestamp', 'guild_id', 'user_id', 'type', 'severity', 'description', 'additional_data')
+
+    def __init__(self, db_path: str = "bot_data.db", capacity: int = 1000, flush_interval: float = 2.0,
+                 batch_size: int = 500, max_pending: int = 50000):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+
+        self.recent: Deque[Dict] = deque(maxlen=capacity)  # Live view, newest last
+        self._pending: Deque[Dict] = deque(maxlen=max_pending)
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="security-events")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.persisted = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    def append(self, event: Dict):
+        """Record an event; never blocks"""
+        self.recent.append(event)
+        if len(self._pending) == self._pending.maxlen:
+            # The writer is far behind; shed the oldest unwritten event rather than grow
+            self.dropped += 1
+        self._pending.append(event)
+
+    def get_recent(self, limit: int = 50) -> List[Dict]:
+        """Newest events from the live ring, oldest first"""
+        if limit <= 0:
+            return []
+        return list(self.recent)[-limit:]
+
+    def clear_recent(self):
+        """Empty the live view; persisted history is kept"""
+        self.recent.clear()
+
+    # Everything below touching self._conn runs on the store's single thread
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS security_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp REAL NOT NULL,
+                    guild_id TEXT,
+                    user_id TEXT,
+                    type TEXT NOT NULL,
+                    severity TEXT,
+                    description TEXT,
+                    additional_data TEXT
+                );
+                -- Entries within each index are ordered by id, so id-keyed pages need no sort
+                CREATE INDEX IF NOT EXISTS idx_security_events_time ON security_events (timestamp);
+                CREATE INDEX IF NOT EXISTS idx_security_events_guild ON security_events (guild_id);
+                CREATE INDEX IF NOT EXISTS idx_security_events_user ON security_events (user_id);
+                CREATE INDEX IF NOT EXISTS idx_security_events_type ON security_events (type);
+            ''')
+            self._conn = conn
+        return self._conn
+
+    def _write(self, events: List[Dict]) -> int:
+        conn = self._connect()
+        rows = [
+            (event['timestamp'], event.get('guild_id'), event.get('user_id'), event['type'],
+             event.get('severity'), event.get('description'),
+             json.dumps(event.get('additional_data') or {}, default=str))
+            for event in events
+        ]
+        conn.execute("BEGIN")
+        try:
+            conn.executemany('''
+                INSERT INTO security_events
+                    (timestamp, guild_id, user_id, type, severity, description, additional_data)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def _query(self, guild_id: Optional[str], user_id: Optional[str], event_type: Optional[str],
+               since: Optional[float], until: Optional[float], before_id: Optional[int],
+               after_id: Optional[int], limit: int) -> List[Dict]:
+        conditions, params = [], []
+        for column, value in (('guild_id', guild_id), ('user_id', user_id), ('type', event_type)):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                params.append(str(value))
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        if before_id is not None:
+            conditions.append("id < ?")
+            params.append(before_id)
+        if after_id is not None:
+            conditions.append("id > ?")
+            params.append(after_id)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        # Pages go newest first, except when walking forward from after_id (exports)
+        order = "ASC" if after_id is not None else "DESC"
+        cursor = self._connect().execute(
+            f"SELECT {', '.join(self.COLUMNS)} FROM security_events {where} ORDER BY id {order} LIMIT ?",
+            (*params, limit)
+        )
+        events = []
+        for row in cursor.fetchall():
+            event = dict(zip(self.COLUMNS, row))
+            event['additional_data'] = json.loads(event['additional_data'] or '{}')
+            events.append(event)
+        return events
+
+    def _count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM security_events").fetchone()[0]
+
+    async def _run_in_thread(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def flush(self) -> int:
+        """Write pending events in batches; returns how many were written"""
+        written = 0
+        while self._pending:
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            try:
+                written += await self._run_in_thread(self._write, batch)
+            except Exception as e:
+                # Put the batch back so the next flush retries it
+                self._pending.extendleft(reversed(batch))
+                logger.error(f"Error writing security events: {e}")
+                break
+        if written:
+            self.persisted += written
+            self.flushes += 1
+        return written
+
+    def start(self):
+        """Start the background flush task on the running loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task, write what is pending and close the connection"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        await self._run_in_thread(self._close)
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run(self):
+        try:
+            self.persisted = await self._run_in_thread(self._count)
+        except Exception as e:
+            logger.error(f"Error counting security events: {e}")
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def query(self, guild_id: Optional[str] = None, user_id: Optional[str] = None,
+                    event_type: Optional[str] = None, since: Optional[float] = None,
+                    until: Optional[float] = None, before_id: Optional[int] = None,
+                    limit: int = 50) -> List[Dict]:
+        """One page of persisted events, newest first; pass the last id as before_id for the next page"""
+        try:
+            await self.flush()
+            return await self._run_in_thread(self._query, guild_id, user_id, event_type,
+                                             since, until, before_id, None, limit)
+        except Exception as e:
+            logger.error(f"Error querying security events: {e}")
+            return []
+
+    async def stream(self, page_size: int = 500, **filters) -> AsyncIterator[Dict]:
+        """Every persisted event matching the filters, oldest first, fetched a page at a time"""
+        await self.flush()
+        after_id = 0
+        while True:
+            page = await self._run_in_thread(
+                self._query, filters.get('guild_id'), filters.get('user_id'), filters.get('event_type'),
+                filters.get('since'), filters.get('until'), None, after_id, page_size
+            )
+            for event in page:
+                yield event
+            if len(page) < page_size:
+                return
+            after_id = page[-1]['id']
+
+    async def export_ndjson(self, fp, **filters) -> int:
+        """Stream matching events into a binary file object as JSON lines; returns the count"""
+        exported = 0
+        async for event in self.stream(**filters):
+            fp.write(json.dumps(event, default=str).encode() + b"\n")
+            exported += 1
+        return exported
+
+    def get_stats(self) -> Dict:
+        """Get security event store statistics"""
+        return {
+            'live': len(self.recent),
+            'pending': len(self._pending),
+            'persisted': self.persisted,
+            'dropped': self.dropped,
+            'flushes': self.flushes
+        }
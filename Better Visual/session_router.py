@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from message_context import MessageContext
+
+logger = logging.getLogger(__name__)
+
+# A standing session gets every message its player sends in its channel; returning True consumes it
+SessionHandler = Callable[[object, MessageContext], Awaitable[Optional[bool]]]
+
+class _Waiter:
+    __slots__ = ('future', 'check', 'timer')
+
+    def __init__(self, future: asyncio.Future, check: Optional[Callable]):
+        self.future = future
+        self.check = check
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+class SessionRouter:
+    """Routes replies to interactive commands by (channel, user) instead of bot.wait_for.
+
+    discord.py runs every pending wait_for predicate against every
+    incoming event, so each message costs O(active games). Here a waiting
+    command is filed under (channel_id, user_id) for messages, or
+    (message_id, user_id) for reactions, and an event reaches its waiter
+    with one dict lookup. Multi-turn games can instead keep a standing
+    session that receives each of the player's messages in that channel.
+    Timeouts are plain call_later handles on the event loop's shared timer
+    heap, so a waiting game costs no task and no polling. A message a
+    session accepts is consumed and never reaches commands or chat;
+    messages starting with command_prefix always go on to the commands.
+    """
+
+    def __init__(self, command_prefix: str = '!'):
+        self.command_prefix = command_prefix
+        self._messages: Dict[Tuple[int, int], _Waiter] = {}
+        self._reactions: Dict[Tuple[int, int], _Waiter] = {}
+        self._sessions: Dict[Tuple[int, int], SessionHandler] = {}
+
+        self.delivered = 0
+        self.timeouts = 0
+
+    def busy(self, channel_id: int, user_id: int) -> bool:
+        """Whether a user already has a reply or session pending in a channel"""
+        key = (channel_id, user_id)
+        return key in self._messages or key in self._sessions
+
+    async def _wait(self, table: Dict[Tuple[int, int], _Waiter], key: Tuple[int, int],
+                    timeout: Optional[float], check: Optional[Callable]):
+        if key in table:
+            raise RuntimeError(f"Already waiting on {key}")
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(loop.create_future(), check)
+        if timeout is not None:
+            waiter.timer = loop.call_later(timeout, self._expire, table, key, waiter)
+        table[key] = waiter
+        try:
+            return await waiter.future
+        finally:
+            if waiter.timer:
+                waiter.timer.cancel()
+            if table.get(key) is waiter:
+                del table[key]
+
+    def _expire(self, table: Dict[Tuple[int, int], _Waiter], key: Tuple[int, int], waiter: _Waiter):
+        if table.get(key) is waiter:
+            del table[key]
+        if not waiter.future.done():
+            waiter.future.set_exception(asyncio.TimeoutError())
+            self.timeouts += 1
+
+    def _deliver(self, table: Dict[Tuple[int, int], _Waiter], key: Tuple[int, int], *event) -> bool:
+        waiter = table.get(key)
+        if waiter is None or waiter.future.done():
+            return False
+        try:
+            if waiter.check is not None and not waiter.check(*event):
+                return False
+        except Exception as e:
+            del table[key]
+            waiter.future.set_exception(e)
+            return False
+        del table[key]
+        waiter.future.set_result(event[0] if len(event) == 1 else event)
+        self.delivered += 1
+        return True
+
+    async def wait_for_message(self, channel_id: int, user_id: int, timeout: Optional[float] = None,
+                               check: Optional[Callable] = None):
+        """The user's next message in the channel that passes check; raises asyncio.TimeoutError.
+
+        Check busy() first: a second wait on the same channel and user raises RuntimeError.
+        """
+        return await self._wait(self._messages, (channel_id, user_id), timeout, check)
+
+    async def wait_for_reaction(self, message_id: int, user_id: int, timeout: Optional[float] = None,
+                                check: Optional[Callable] = None):
+        """(reaction, user) for the user's next reaction on the message; raises asyncio.TimeoutError"""
+        return await self._wait(self._reactions, (message_id, user_id), timeout, check)
+
+    def open(self, channel_id: int, user_id: int, handler: SessionHandler):
+        """Send the user's messages in the channel to handler until close()"""
+        self._sessions[(channel_id, user_id)] = handler
+
+    def close(self, channel_id: int, user_id: int):
+        """End a standing session"""
+        self._sessions.pop((channel_id, user_id), None)
+
+    async def dispatch(self, message, context: MessageContext) -> bool:
+        """Pipeline stage: hand the message to the session waiting for it, if any"""
+        if self.command_prefix and message.content.startswith(self.command_prefix):
+            return False  # Players can still run commands mid-game
+        key = (message.channel.id, message.author.id)
+        if self._deliver(self._messages, key, message):
+            return True
+        handler = self._sessions.get(key)
+        if handler is not None:
+            return bool(await handler(message, context))
+        return False
+
+    async def dispatch_reaction(self, reaction, user):
+        """on_reaction_add listener"""
+        self._deliver(self._reactions, (reaction.message.id, user.id), reaction, user)
+
+    def get_stats(self) -> Dict:
+        """Get session router statistics"""
+        return {
+            'waiting_messages': len(self._messages),
+            'waiting_reactions': len(self._reactions),
+            'sessions': len(self._sessions),
+            'delivered': self.delivered,
+            'timeouts': self.timeouts
+        }
@@ -0,0 +1,155 @@
+import sys
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Hashable, List, Optional
+
+class WindowRecord:
+    """Recent event times (and optional values) for one key, in fixed-size ring buffers"""
+
+    __slots__ = ('events', 'values', 'last_seen')
+
+    def __init__(self, capacity: int, track_values: bool):
+        self.events: deque = deque(maxlen=capacity)
+        self.values: Optional[deque] = deque(maxlen=capacity) if track_values else None
+        self.last_seen = 0.0
+
+class TimeWindowStore:
+    """Bounded per-key sliding-window tracker for anti-spam and cooldown state.
+
+    Each key keeps at most `capacity` recent event times, so checking
+    "fewer than N events in the last W seconds" never rebuilds a list.
+    Keys are kept in recency order: ones idle for longer than idle_ttl are
+    dropped from the cold end as new events arrive, and once max_keys is
+    reached the least recently seen key is evicted, so memory stays bounded
+    however many users the bot has seen.
+    """
+
+    def __init__(self, window: float, capacity: int, max_keys: int = 50000,
+                 idle_ttl: Optional[float] = None, track_values: bool = False):
+        self.window = window
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self.idle_ttl = idle_ttl if idle_ttl is not None else window
+        self.track_values = track_values
+        self._records: "OrderedDict[Hashable, WindowRecord]" = OrderedDict()
+
+        self.idle_evictions = 0
+        self.capacity_evictions = 0
+        self.peak_keys = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._records
+
+    def _expire(self, record: WindowRecord, now: float):
+        cutoff = now - self.window
+        events = record.events
+        while events and events[0] <= cutoff:
+            events.popleft()
+            if record.values is not None:
+                record.values.popleft()
+
+    def _sweep(self, now: float):
+        """Drop idle keys from the cold end; amortized O(1) per event"""
+        cutoff = now - self.idle_ttl
+        records = self._records
+        while records:
+            key, record = next(iter(records.items()))
+            if record.last_seen > cutoff:
+                break
+            del records[key]
+            self.idle_evictions += 1
+
+    def _record_for(self, key: Hashable, now: float) -> WindowRecord:
+        record = self._records.get(key)
+        if record is None:
+            if len(self._records) >= self.max_keys:
+                self._records.popitem(last=False)
+                self.capacity_evictions += 1
+            record = WindowRecord(self.capacity, self.track_values)
+            self._records[key] = record
+            self.peak_keys = max(self.peak_keys, len(self._records))
+        else:
+            self._records.move_to_end(key)
+            if record.events.maxlen < self.capacity:
+                # The limit was raised since this key was created
+                record.events = deque(record.events, maxlen=self.capacity)
+                if record.values is not None:
+                    record.values = deque(record.values, maxlen=self.capacity)
+        return record
+
+    def hit(self, key: Hashable, value: Any = None, now: Optional[float] = None) -> int:
+        """Record an event for key; returns how many events are now in the window"""
+        now = time.time() if now is None else now
+        self._sweep(now)
+        record = self._record_for(key, now)
+        self._expire(record, now)
+        record.events.append(now)
+        if record.values is not None:
+            record.values.append(value)
+        record.last_seen = now
+        return len(record.events)
+
+    def allow(self, key: Hashable, limit: Optional[int] = None, now: Optional[float] = None) -> bool:
+        """Record an event only if key has fewer than limit events in the window"""
+        now = time.time() if now is None else now
+        limit = limit or self.capacity
+        if limit > self.capacity:
+            self.capacity = limit
+        if self.count(key, now) >= limit:
+            return False
+        self.hit(key, now=now)
+        return True
+
+    def count(self, key: Hashable, now: Optional[float] = None) -> int:
+        """Events for key inside the window"""
+        record = self._records.get(key)
+        if record is None:
+            return 0
+        self._expire(record, time.time() if now is None else now)
+        return len(record.events)
+
+    def last(self, key: Hashable) -> Optional[float]:
+        """Time of the most recent event for key, if it is still tracked"""
+        record = self._records.get(key)
+        return record.events[-1] if record and record.events else None
+
+    def recent_values(self, key: Hashable, limit: Optional[int] = None,
+                      now: Optional[float] = None) -> List[Any]:
+        """Values recorded with the key's events in the window, oldest first"""
+        record = self._records.get(key)
+        if record is None or record.values is None:
+            return []
+        self._expire(record, time.time() if now is None else now)
+        values = list(record.values)
+        return values[-limit:] if limit else values
+
+    def discard(self, key: Hashable):
+        """Forget a key"""
+        self._records.pop(key, None)
+
+    def clear(self):
+        """Forget every key"""
+        self._records.clear()
+
+    def get_stats(self) -> Dict:
+        """Key counts, evictions and an estimate of the memory held"""
+        total_events = sum(len(record.events) for record in self._records.values())
+        empty = WindowRecord(self.capacity, self.track_values)
+        per_key = sys.getsizeof(empty) + sys.getsizeof(empty.events)
+        if empty.values is not None:
+            per_key += sys.getsizeof(empty.values)
+        # Each stored time is a float object; tracked values are counted as references only
+        approx_bytes = (len(self._records) * per_key + total_events * sys.getsizeof(0.0)
+                        + sys.getsizeof(self._records))
+        return {
+            'keys': len(self._records),
+            'peak_keys': self.peak_keys,
+            'max_keys': self.max_keys,
+            'events': total_events,
+            'approx_bytes': approx_bytes,
+            'idle_evictions': self.idle_evictions,
+            'capacity_evictions': self.capacity_evictions
+        }
@@ -0,0 +1,252 @@
+import asyncio
+import heapq
+import json
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[[Dict], Awaitable[None]]
+
+class TimerScheduler:
+    """Persistent timers (reminders, unmutes, ...) served by one sleeping task.
+
+    Every job is a row in an indexed `scheduled_jobs` table, so timers
+    survive restarts. Only jobs due within `horizon` seconds are held in
+    an in-memory min-heap, loaded in (due, id) order a batch at a time;
+    the rest stay on disk until the window reaches them. A single task
+    sleeps until the earliest due time (or until an earlier job is
+    scheduled), fires what is due and goes back to sleep, so there is no
+    polling and each timer costs O(log n). Jobs that came due while the
+    bot was down fire once `ready` (e.g. bot.wait_until_ready) has
+    returned, so handlers see filled caches; a row is only deleted once its
+    handler has finished, so a crash mid-handler fires it again.
+    """
+
+    def __init__(self, db_path: str = "bot_data.db", horizon: float = 3600, batch_size: int = 1000,
+                 ready: Optional[Callable[[], Awaitable[None]]] = None):
+        self.db_path = db_path
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.ready = ready
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._heap: List[Tuple[float, int, str, Dict]] = []
+        self._queued: Set[int] = set()  # Ids in the heap
+        self._canceled: Set[int] = set()  # Queued ids to skip when popped
+        self._parked: Dict[str, List[Tuple[int, Dict]]] = {}  # Due jobs whose handler is not registered yet
+        # Every job ordered at or before this (due, id) key is in the heap, fired or canceled
+        self._cursor: Tuple[float, int] = (float('-inf'), 0)
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="timer-scheduler")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._wake_at: Optional[float] = None
+        self._stopping = False
+        self._window_lock = asyncio.Lock()  # Keeps inserts and window loads from interleaving
+        self._running: Set[asyncio.Task] = set()
+
+        self.scheduled = 0
+        self.fired = 0
+        self.failed = 0
+        self.loads = 0
+
+    # Everything below touching self._conn runs on the scheduler's single thread
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    due REAL NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    created REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_scheduled_jobs_due ON scheduled_jobs (due, id);
+            ''')
+            self._conn = conn
+        return self._conn
+
+    def _insert(self, due: float, kind: str, payload: str) -> int:
+        cursor = self._connect().execute(
+            "INSERT INTO scheduled_jobs (due, kind, payload, created) VALUES (?, ?, ?, ?)",
+            (due, kind, payload, time.time())
+        )
+        return cursor.lastrowid
+
+    def _delete(self, job_id: int) -> bool:
+        return self._connect().execute("DELETE FROM scheduled_jobs WHERE id = ?", (job_id,)).rowcount > 0
+
+    def _load(self, cursor: Tuple[float, int], until: float) -> List[Tuple[float, int, str, str]]:
+        return self._connect().execute('''
+            SELECT due, id, kind, payload FROM scheduled_jobs
+            WHERE (due, id) > (?, ?) AND due < ?
+            ORDER BY due, id LIMIT ?
+        ''', (*cursor, until, self.batch_size)).fetchall()
+
+    def _next_due(self, cursor: Tuple[float, int]) -> Optional[float]:
+        row = self._connect().execute('''
+            SELECT due FROM scheduled_jobs WHERE (due, id) > (?, ?) ORDER BY due, id LIMIT 1
+        ''', cursor).fetchone()
+        return row[0] if row else None
+
+    def _pending_count(self) -> int:
+        return self._connect().execute("SELECT COUNT(*) FROM scheduled_jobs").fetchone()[0]
+
+    def _close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def _run_in_thread(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    def register(self, kind: str, handler: JobHandler):
+        """Set the coroutine that runs jobs of a kind; jobs that were waiting for it fire now"""
+        self._handlers[kind] = handler
+        parked = self._parked.pop(kind, [])
+        for job_id, payload in parked:
+            self._fire(job_id, kind, payload)
+
+    def unregister(self, kind: str):
+        """Stop running jobs of a kind; they stay persisted and fire once registered again"""
+        self._handlers.pop(kind, None)
+
+    async def schedule(self, kind: str, delay: float, payload: Optional[Dict] = None) -> int:
+        """Persist a job to run delay seconds from now; returns its id"""
+        due = time.time() + max(delay, 0)
+        payload = payload or {}
+        async with self._window_lock:
+            job_id = await self._run_in_thread(self._insert, due, kind, json.dumps(payload))
+            # Jobs past the loaded window are picked up when the window reaches them
+            if (due, job_id) <= self._cursor:
+                self._push(due, job_id, kind, payload)
+        self.scheduled += 1
+
+        if self._wake is not None and (self._wake_at is None or due < self._wake_at):
+            self._wake.set()
+        return job_id
+
+    async def cancel(self, job_id: int) -> bool:
+        """Cancel a pending job"""
+        deleted = await self._run_in_thread(self._delete, job_id)
+        if job_id in self._queued:
+            self._canceled.add(job_id)
+        for kind, parked in self._parked.items():
+            self._parked[kind] = [job for job in parked if job[0] != job_id]
+        return deleted
+
+    def _push(self, due: float, job_id: int, kind: str, payload: Dict):
+        if job_id not in self._queued:
+            self._queued.add(job_id)
+            heapq.heappush(self._heap, (due, job_id, kind, payload))
+
+    def _fire(self, job_id: int, kind: str, payload: Dict):
+        handler = self._handlers.get(kind)
+        if handler is None:
+            # The cog that handles it has not loaded (yet); it fires on register()
+            self._parked.setdefault(kind, []).append((job_id, payload))
+            return
+        task = asyncio.get_running_loop().create_task(self._execute(job_id, kind, handler, payload))
+        self._running.add(task)
+        task.add_done_callback(self._running.discard)
+
+    async def _execute(self, job_id: int, kind: str, handler: JobHandler, payload: Dict):
+        try:
+            await handler(payload)
+            self.fired += 1
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Error running scheduled {kind} job {job_id}: {e}")
+        # Failed jobs are dropped too; retrying a broken handler forever helps no one
+        try:
+            await self._run_in_thread(self._delete, job_id)
+        except Exception as e:
+            logger.error(f"Error deleting scheduled job {job_id}: {e}")
+
+    async def _refill(self) -> Optional[float]:
+        """Load the next batch into the heap; returns when to wake if nothing is loaded"""
+        async with self._window_lock:
+            until = time.time() + self.horizon
+            rows = await self._run_in_thread(self._load, self._cursor, until)
+            self.loads += 1
+            for due, job_id, kind, payload in rows:
+                self._push(due, job_id, kind, json.loads(payload))
+            if len(rows) == self.batch_size:
+                self._cursor = (rows[-1][0], rows[-1][1])
+            else:
+                # Jobs scheduled before `until` from now on go straight into the heap
+                self._cursor = max(self._cursor, (until, 0))
+            if self._heap:
+                return None
+            return await self._run_in_thread(self._next_due, self._cursor)
+
+    async def _run(self):
+        if self.ready is not None:
+            await self.ready()
+        while not self._stopping:
+            self._wake.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, job_id, kind, payload = heapq.heappop(self._heap)
+                self._queued.discard(job_id)
+                if job_id in self._canceled:
+                    self._canceled.discard(job_id)
+                    continue
+                self._fire(job_id, kind, payload)
+
+            wake_at = self._heap[0][0] if self._heap else None
+            if not self._heap:
+                try:
+                    wake_at = await self._refill()
+                except Exception as e:
+                    logger.error(f"Error loading scheduled jobs: {e}")
+                    wake_at = time.time() + 5
+                if self._heap:
+                    continue
+
+            self._wake_at = wake_at
+            timeout = None if wake_at is None else max(wake_at - time.time(), 0)
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wake_at = None
+
+    def start(self):
+        """Start the sleeper task on the running loop; overdue jobs fire once ready"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the sleeper task and close the connection; pending jobs stay persisted"""
+        if self._task:
+            # wait_for can swallow a cancel that lands as the wake event fires; the flag covers it
+            self._stopping = True
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+        await self._run_in_thread(self._close)
+
+    async def get_stats(self) -> Dict:
+        """Get scheduler statistics"""
+        return {
+            'pending': await self._run_in_thread(self._pending_count),
+            'in_memory': len(self._heap),
+            'scheduled': self.scheduled,
+            'fired': self.fired,
+            'failed': self.failed,
+            'loads': self.loads
+        }
@@ -0,0 +1,197 @@
+import asyncio
+import glob
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class XPAccumulator:
+    """Write-behind XP counter with a segmented journal.
+
+    Each grant updates an in-memory total (loaded from the users table the
+    first time a user is seen), adds to a pending delta and appends one
+    line to the current journal segment, so level-ups are computed
+    without touching the database. Every flush_interval seconds the
+    pending deltas are written as one batched upsert, together with the
+    number of the journal segment they cover; segments at or below that
+    checkpoint are then deleted. After a crash, start() replays the
+    segments the database has not checkpointed, so no XP is lost and none
+    is applied twice.
+    """
+
+    JOURNAL_NAME = 'xp'
+
+    def __init__(self, db, journal_path: str = "xp_journal", flush_interval: float = 5.0,
+                 max_cached: int = 100000):
+        self.db = db
+        self.journal_path = journal_path
+        self.flush_interval = flush_interval
+        self.max_cached = max_cached
+
+        self._totals: "OrderedDict[str, int]" = OrderedDict()  # Committed + pending XP
+        self._pending: Dict[str, int] = {}
+        self._inflight: Dict[str, int] = {}  # Deltas of the batch being written
+        self._segment = 0
+        self._journal = None
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+
+        self.grants = 0
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.recovered = 0
+        self.last_flush_ms = 0.0
+
+    def _segment_path(self, segment: int) -> str:
+        return f"{self.journal_path}.{segment}.log"
+
+    def _segments(self) -> Dict[int, str]:
+        segments = {}
+        for path in glob.glob(f"{glob.escape(self.journal_path)}.*.log"):
+            number = path[len(self.journal_path) + 1:-len(".log")]
+            if number.isdigit():
+                segments[int(number)] = path
+        return segments
+
+    def _open_segment(self, segment: int):
+        self._segment = segment
+        # Line-buffered, so every grant reaches the OS before the next one is made
+        self._journal = open(self._segment_path(segment), 'a', buffering=1, encoding='utf-8')
+
+    def _recover(self):
+        """Apply journal segments the database has not checkpointed, then start a new segment"""
+        checkpoint = self.db.get_journal_checkpoint(self.JOURNAL_NAME)
+        segments = self._segments()
+        deltas: Dict[str, int] = {}
+        for segment, path in sorted(segments.items()):
+            if segment <= checkpoint:
+                continue
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    # A torn last line from a crash mid-write is skipped
+                    user_id, _, amount = line.strip().partition('\t')
+                    if user_id and amount.lstrip('-').isdigit():
+                        deltas[user_id] = deltas.get(user_id, 0) + int(amount)
+
+        latest = max([checkpoint, *segments])
+        if deltas:
+            if not self.db.apply_counter_batch('xp', deltas, self.JOURNAL_NAME, latest):
+                raise RuntimeError("could not replay the XP journal")
+            self.recovered += sum(deltas.values())
+            logger.info(f"Replayed {self.recovered} XP for {len(deltas)} users from the journal")
+        for path in segments.values():
+            os.remove(path)
+        self._open_segment(latest + 1)
+
+    def total(self, user_id: str) -> int:
+        """A user's XP including grants not yet written"""
+        total = self._totals.get(user_id)
+        if total is None:
+            user_data = self.db.get_user(user_id)
+            total = ((user_data.get('xp') or 0) + self._pending.get(user_id, 0)
+                     + self._inflight.get(user_id, 0))
+            self._totals[user_id] = total
+            self._evict()
+        else:
+            self._totals.move_to_end(user_id)
+        return total
+
+    def _evict(self):
+        excess = len(self._totals) - self.max_cached
+        if excess <= 0:
+            return
+        # Only users with nothing unwritten can be dropped; their total is on disk
+        victims = []
+        for user_id in self._totals:
+            if user_id not in self._pending and user_id not in self._inflight:
+                victims.append(user_id)
+                if len(victims) >= excess:
+                    break
+        for user_id in victims:
+            del self._totals[user_id]
+
+    def add(self, user_id: str, amount: int) -> Tuple[int, int]:
+        """Grant XP; returns (old_total, new_total)"""
+        if self._journal is None:
+            self._recover()
+        old = self.total(user_id)
+        self._journal.write(f"{user_id}\t{amount}\n")
+        self._pending[user_id] = self._pending.get(user_id, 0) + amount
+        self._totals[user_id] = old + amount
+        self.grants += 1
+        return old, old + amount
+
+    async def flush(self) -> int:
+        """Write pending XP in one batch; returns how many users were written"""
+        async with self._flush_lock:
+            if not self._pending or self._journal is None:
+                return 0
+
+            # Grants made from here on go to a new segment, outside this checkpoint
+            deltas, self._pending = self._pending, {}
+            self._inflight = deltas
+            segment = self._segment
+            self._journal.close()
+            self._open_segment(segment + 1)
+
+            started = time.perf_counter()
+            try:
+                applied = await asyncio.get_running_loop().run_in_executor(
+                    None, self.db.apply_counter_batch, 'xp', deltas, self.JOURNAL_NAME, segment
+                )
+            finally:
+                self._inflight = {}
+            if not applied:
+                # Retry with the next batch; the journal still holds these grants
+                for user_id, amount in deltas.items():
+                    self._pending[user_id] = self._pending.get(user_id, 0) + amount
+                return 0
+
+            self.last_flush_ms = (time.perf_counter() - started) * 1000
+            self.flushes += 1
+            self.rows_flushed += len(deltas)
+            for number, path in self._segments().items():
+                if number <= segment:
+                    os.remove(path)
+            return len(deltas)
+
+    def start(self):
+        """Replay the journal and start the periodic flush on the running loop"""
+        if self._journal is None:
+            self._recover()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop flushing, write what is pending and close the journal"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Error flushing XP: {e}")
+
+    def get_stats(self) -> Dict:
+        """Get XP accumulator statistics"""
+        return {
+            'cached_users': len(self._totals),
+            'pending_users': len(self._pending),
+            'pending_xp': sum(self._pending.values()),
+            'grants': self.grants,
+            'flushes': self.flushes,
+            'rows_flushed': self.rows_flushed,
+            'last_flush_ms': self.last_flush_ms,
+            'recovered_xp': self.recovered
+        }
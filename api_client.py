@@ -1,41 +1,134 @@
-import openai
+import aiohttp
+import asyncio
+import json
 import os
 import logging
-from typing import Optional, Dict, List
-import requests
+from typing import AsyncIterator, Optional, Dict, List
 
 logger = logging.getLogger(__name__)
 
 class APIClient:
     """Handle external API calls using Groq Llama-3"""
-    def __init__(self):
+
+    GROQ_BASE_URL = "https://api.groq.com/openai/v1/"
+    GIPHY_SEARCH_URL = "https://api.giphy.com/v1/gifs/search"
+
+    def __init__(self, max_concurrency: int = 16, request_timeout: float = 30.0):
         self.groq_api_key = os.getenv('GROQ_API_KEY')
         if not self.groq_api_key:
             logger.error("GROQ_API_KEY environment variable not set!")
-        openai.api_key = self.groq_api_key
-        openai.base_url = "https://api.groq.com/openai/v1/"
+        self.model = "llama3-70b-8192"
+        self.request_timeout = request_timeout
+
+        # Bounds in-flight LLM calls so a burst can't exhaust the API quota or sockets
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._max_connections = max_concurrency * 2
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared keep-alive session, creating it on first use"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self._max_connections,
+                keepalive_timeout=60,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.request_timeout, connect=5)
+            )
+        return self._session
 
-    def chat_with_groq(self, messages: List[Dict], personality_prompt: str = "") -> Optional[str]:
+    async def close(self):
+        """Close the shared HTTP session"""
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    def _build_chat_payload(self, messages: List[Dict], personality_prompt: str, max_tokens: int,
+                            temperature: float, stream: bool = False) -> Dict:
+        chat_messages = []
+        if personality_prompt:
+            chat_messages.append({"role": "system", "content": personality_prompt})
+        chat_messages.extend(messages)
+
+        return {
+            "model": self.model,
+            "messages": chat_messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": stream
+        }
+
+    async def chat_with_groq(self, messages: List[Dict], personality_prompt: str = "",
+                             max_tokens: int = 1024, temperature: float = 0.7,
+                             timeout: Optional[float] = None) -> Optional[str]:
         try:
             if not self.groq_api_key:
                 return "Sorry, I'm not configured to chat right now."
-                
-            chat_messages = []
-            if personality_prompt:
-                chat_messages.append({"role": "system", "content": personality_prompt})
-            chat_messages.extend(messages)
-            
-            response = openai.chat.completions.create(
-                model="llama3-70b-8192",
-                messages=chat_messages,
-                max_tokens=1024,
-                temperature=0.7,
-            )
-            return response.choices[0].message.content.strip()
+
+            payload = self._build_chat_payload(messages, personality_prompt, max_tokens, temperature)
+            headers = {"Authorization": f"Bearer {self.groq_api_key}"}
+            request_timeout = aiohttp.ClientTimeout(total=timeout or self.request_timeout, connect=5)
+
+            async with self._semaphore:
+                async with self._get_session().post(
+                    f"{self.GROQ_BASE_URL}chat/completions",
+                    json=payload,
+                    headers=headers,
+                    timeout=request_timeout
+                ) as response:
+                    response.raise_for_status()
+                    data = await response.json()
+
+            return data['choices'][0]['message']['content'].strip()
+        except asyncio.TimeoutError:
+            logger.error("Groq API request timed out")
+            return None
         except Exception as e:
             logger.error(f"Error calling Groq API: {e}")
             return None
 
+    async def stream_chat_with_groq(self, messages: List[Dict], personality_prompt: str = "",
+                                    max_tokens: int = 1024, temperature: float = 0.7,
+                                    timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """Yield completion text deltas as the server streams them (SSE)"""
+        if not self.groq_api_key:
+            yield "Sorry, I'm not configured to chat right now."
+            return
+
+        payload = self._build_chat_payload(messages, personality_prompt, max_tokens, temperature, stream=True)
+        headers = {"Authorization": f"Bearer {self.groq_api_key}", "Accept": "text/event-stream"}
+        # Total time can be long for big completions; bound the gap between chunks instead
+        request_timeout = aiohttp.ClientTimeout(total=None, connect=5, sock_read=timeout or self.request_timeout)
+
+        async with self._semaphore:
+            async with self._get_session().post(
+                f"{self.GROQ_BASE_URL}chat/completions",
+                json=payload,
+                headers=headers,
+                timeout=request_timeout
+            ) as response:
+                response.raise_for_status()
+                async for raw_line in response.content:
+                    line = raw_line.decode('utf-8').strip()
+                    if not line.startswith('data:'):
+                        continue  # Blank separators, comments and keep-alives
+
+                    data = line[5:].strip()
+                    if data == '[DONE]':
+                        break
+
+                    try:
+                        chunk = json.loads(data)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Skipping malformed stream chunk: {data[:80]}")
+                        continue
+
+                    choices = chunk.get('choices') or [{}]
+                    delta = choices[0].get('delta', {}).get('content')
+                    if delta:
+                        yield delta
+
     async def search_gif(self, query: str, limit: int = 1) -> Optional[str]:
         """Search for a GIF using the GIPHY API and return the URL of the first result."""
         giphy_api_key = os.getenv('GIPHY_API_KEY')
@@ -43,7 +136,6 @@ class APIClient:
             logger.error("GIPHY_API_KEY environment variable not set!")
             return None
         try:
-            url = f"https://api.giphy.com/v1/gifs/search"
             params = {
                 'api_key': giphy_api_key,
                 'q': query,
@@ -51,9 +143,9 @@ class APIClient:
                 'rating': 'pg',
                 'lang': 'en'
             }
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            async with self._get_session().get(self.GIPHY_SEARCH_URL, params=params) as response:
+                response.raise_for_status()
+                data = await response.json()
             if data['data']:
                 return data['data'][0]['images']['original']['url']
             else:
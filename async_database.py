@@ -0,0 +1,63 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+from database import Database
+
+logger = logging.getLogger(__name__)
+
+class AsyncDatabase:
+    """Awaitable facade over Database that keeps disk I/O off the event loop.
+
+    Every public Database method is available as a coroutine with the same
+    name and arguments. Writes are serialized on a single writer thread
+    (SQLite allows one writer at a time anyway); pure reads run on a small
+    reader pool, which WAL mode lets proceed alongside the writer.
+    """
+
+    # Methods that never write and can run concurrently with the writer
+    READ_METHODS = {
+        'get_conversation_history', 'can_claim_daily', 'get_transaction_history',
+        'get_usage_data', 'get_top_users', 'get_personality_mode', 'get_cached_response',
+        'get_conversation_context', 'get_archived_conversations', 'get_storage_stats',
+        'get_top_users_by_coins', 'get_top_users_by_work', 'get_user_rank', 'sync_guild_members',
+        'get_user_data', 'get_compaction_candidates'
+    }
+
+    def __init__(self, db: Database, reader_threads: int = 3):
+        self.db = db
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='db-writer')
+        self._readers = ThreadPoolExecutor(max_workers=reader_threads, thread_name_prefix='db-reader')
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.db, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        method = self._wrap(name, attr)
+        # Cache the wrapper so later lookups skip __getattr__
+        setattr(self, name, method)
+        return method
+
+    def _wrap(self, name: str, func: Callable) -> Callable:
+        """Turn a blocking Database method into a coroutine function"""
+        executor = self._readers if name in self.READ_METHODS else self._writer
+
+        @functools.wraps(func)
+        async def method(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+        return method
+
+    async def close(self):
+        """Drain pending work, stop the worker threads and close connections"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._shutdown)
+
+    def _shutdown(self):
+        self._readers.shutdown(wait=True)
+        self._writer.shutdown(wait=True)
+        self.db.close()
+        logger.info("Async database shut down")
@@ -6,13 +6,25 @@ import os
 import random
 import re
 import hashlib
-import time
 from config import Config
 from database import Database
+from async_database import AsyncDatabase
+from loop_monitor import EventLoopMonitor
 from api_client import APIClient
 from commands import BotCommands
 from personality import PersonalityManager
 from rate_limiter import RateLimiter
+from streaming_reply import StreamingReply
+from response_cache import ResponseCache
+from content_filter import ContentFilter
+from time_window_store import TimeWindowStore
+from message_context import MessageContext
+from message_pipeline import MessagePipeline
+from session_router import SessionRouter
+from context_builder import ContextBuilder
+from conversation_compactor import ConversationCompactor
+from name_resolver import UserNameResolver
+from timer_scheduler import TimerScheduler
 from datetime import datetime
 
 # Set up logging
@@ -36,9 +48,20 @@ class AdvancedDiscordBot(commands.Bot):
         # Initialize components
         self.config = Config()
         self.db = Database()
+        self.async_db = AsyncDatabase(self.db)
+        self.loop_monitor = EventLoopMonitor()
         self.api_client = APIClient()
-        self.personality = PersonalityManager()
-        self.rate_limiter = RateLimiter(self.db)
+        self.response_cache = ResponseCache(async_db=self.async_db)
+        self.context_builder = ContextBuilder(
+            self.api_client, budget_tokens=self.config.get('context_token_budget', 1500)
+        )
+        self.personality = PersonalityManager(self.response_cache, self.context_builder)
+        self.rate_limiter = RateLimiter()
+        self.streaming_reply = StreamingReply()
+        self.compactor = ConversationCompactor(self.async_db, self.config,
+                                               response_cache_ttl=self.response_cache.ttl)
+        self.name_resolver = UserNameResolver(self)
+        self.scheduler = TimerScheduler(self.db.db_path, ready=self.wait_until_ready)
         
         # Bot settings - configurable via !config
         self.settings = self.config.get_bot_settings()
@@ -46,6 +69,8 @@ class AdvancedDiscordBot(commands.Bot):
         # Security settings
         self.security = self.config.get_security_settings()
         self.security['trusted_users'] = set()  # Add user IDs here for trusted users
+        self.content_filter = ContentFilter()
+        self.content_filter.set_patterns('blocked', self.security['blocked_words'], boundary='word')
         
         # Bot names that will trigger responses
         self.bot_names = [
@@ -55,8 +80,19 @@ class AdvancedDiscordBot(commands.Bot):
         # Add commands
         self.bot_commands = BotCommands(self)
         
-        # Message tracking for anti-spam
-        self.message_history = {}
+        # Message tracking for anti-spam: at most 5 messages per user per 10 seconds
+        self.message_history = TimeWindowStore(window=10, capacity=5)
+        
+        # Every message runs through these stages once; cogs add their own
+        self.pipeline = MessagePipeline()
+        self.pipeline.register('security', 'security', self._security_stage, skip_bots=False)
+        self.pipeline.register('commands', 'commands', self._commands_stage, skip_bots=False)
+        self.pipeline.register('natural_chat', 'chat', self._chat_stage, skip_bots=False)
+        
+        # Replies to games and prompts are routed by (channel, user) rather than bot.wait_for
+        self.sessions = SessionRouter(self.command_prefix)
+        self.pipeline.register('sessions', 'games', self.sessions.dispatch)
+        self.add_listener(self.sessions.dispatch_reaction, 'on_reaction_add')
         
     def is_trusted_user(self, user_id: str) -> bool:
         """Check if user is trusted (bypasses some restrictions)"""
@@ -65,10 +101,9 @@ class AdvancedDiscordBot(commands.Bot):
     def check_message_security(self, message_content: str, user_id: str) -> tuple[bool, str]:
         """Check message for security issues"""
         # Check for blocked words
-        content_lower = message_content.lower()
-        for word in self.security['blocked_words']:
-            if word in content_lower:
-                return False, f"Message contains blocked word: {word}"
+        match = self.content_filter.find(message_content, ('blocked',))
+        if match:
+            return False, f"Message contains blocked word: {match.pattern}"
         
         # Check message length
         if len(message_content) > self.security['max_message_length']:
@@ -76,27 +111,14 @@ class AdvancedDiscordBot(commands.Bot):
             
         # Anti-spam check
         if self.security['anti_spam_enabled']:
-            current_time = time.time()
-            if user_id not in self.message_history:
-                self.message_history[user_id] = []
-            
-            # Remove old messages (older than 10 seconds)
-            self.message_history[user_id] = [
-                msg_time for msg_time in self.message_history[user_id] 
-                if current_time - msg_time < 10
-            ]
-            
-            # Check if too many messages in short time
-            if len(self.message_history[user_id]) >= 5:
+            if not self.message_history.allow(user_id):
                 return False, "Too many messages in short time"
-            
-            self.message_history[user_id].append(current_time)
         
         return True, "OK"
     
     def replace_mentions_with_names(self, message_content, guild):
         """Replace Discord mention tags with display names"""
-        if not guild:
+        if not guild or not MessageContext.of(message_content).mention_ids:
             return message_content
             
         def repl(match):
@@ -107,8 +129,14 @@ class AdvancedDiscordBot(commands.Bot):
     
     def is_name_mentioned(self, message_content):
         """Check if bot's name is mentioned in the message"""
-        content_lower = message_content.lower()
-        return any(name in content_lower for name in self.bot_names)
+        return MessageContext.of(message_content).contains_any(self.bot_names)
+        
+    async def setup_hook(self):
+        """Start background monitors once the event loop is running"""
+        self.loop_monitor.start()
+        self.compactor.start()
+        self.rate_limiter.start()
+        self.scheduler.start()
         
     async def on_ready(self):
         """Called when bot is ready"""
@@ -121,7 +149,10 @@ class AdvancedDiscordBot(commands.Bot):
         if message.author == self.user:
             return
             
-        # Security check
+        await self.pipeline.process(message)
+        
+    async def _security_stage(self, message, context):
+        """Drop messages that fail the security check"""
         security_ok, security_msg = self.check_message_security(
             message.content, 
             str(message.author.id)
@@ -129,12 +160,14 @@ class AdvancedDiscordBot(commands.Bot):
         
         if not security_ok and not self.is_trusted_user(message.author.id):
             logger.warning(f"Security check failed for {message.author}: {security_msg}")
-            return
-            
-        # Process commands first
+            return True
+        
+    async def _commands_stage(self, message, context):
+        """Run prefix commands"""
         await self.process_commands(message)
         
-        # If it's not a command, respond naturally
+    async def _chat_stage(self, message, context):
+        """If it's not a command, respond naturally"""
         if not message.content.startswith('!'):
             await self.handle_natural_conversation(message)
     
@@ -159,18 +192,21 @@ class AdvancedDiscordBot(commands.Bot):
                 return
                 
             # Check rate limits
-            if not self.rate_limiter.check_limit(user_id, 'conversation'):
+            guild_id = str(message.guild.id) if message.guild else None
+            if not self.rate_limiter.check_limit(user_id, 'conversation', guild_id):
                 await message.add_reaction('⏰')
                 return
                 
-            # Get user data
-            user_data = self.db.get_user(user_id)
+            # Get user data, personality mode and recent history in one query
+            context = await self.async_db.get_conversation_context(
+                user_id, self.config.get('max_conversation_history', 10)
+            )
             
             # Clean message content - replace mentions with names
             clean_content = self.replace_mentions_with_names(message.content, message.guild)
             
             # --- Personality mode selection logic ---
-            user_personality_mode = self.db.get_personality_mode(user_id)
+            user_personality_mode = context['personality_mode']
             if user_personality_mode and user_personality_mode != 'friendly':
                 personality_mode = user_personality_mode
             else:
@@ -178,23 +214,39 @@ class AdvancedDiscordBot(commands.Bot):
             # --------------------------------------
             
             # Generate natural response using personality with custom prompt support
+            conversation_history = context['history']
+            
             async with message.channel.typing():
-                response = self.personality.generate_response(
-                    clean_content, 
-                    message.author.display_name,
-                    personality_mode,
-                    self.db.get_conversation_history(user_id),
-                    self.api_client,
-                    user_id,
-                    str(message.guild.id) if message.guild else None
-                )
+                if self.settings.get('streaming_enabled', True):
+                    # Post the first words right away and edit in the rest
+                    response, sent_message = await self.streaming_reply.send(
+                        message.reply,
+                        self.personality.stream_response(
+                            clean_content,
+                            message.author.display_name,
+                            personality_mode,
+                            conversation_history,
+                            self.api_client,
+                            user_id,
+                            guild_id
+                        )
+                    )
+                else:
+                    response = await self.personality.generate_response(
+                        clean_content, 
+                        message.author.display_name,
+                        personality_mode,
+                        conversation_history,
+                        self.api_client,
+                        user_id,
+                        guild_id
+                    )
+                    # Send response as normal text
+                    sent_message = await message.reply(response) if response else None
                 
                 if response:
-                    # Save conversation
-                    self.db.add_conversation(user_id, clean_content, response)
-                    
-                    # Send response as normal text
-                    sent_message = await message.reply(response)
+                    # Save conversation and usage in one write
+                    await self.async_db.record_exchange(user_id, clean_content, response)
                     
                     # Add random reactions if enabled
                     if self.settings['reactions_enabled']:
@@ -205,6 +257,16 @@ class AdvancedDiscordBot(commands.Bot):
             logger.error(f"Error in natural conversation: {e}")
             await message.add_reaction('❌')
 
+    async def close(self):
+        """Shut down the bot and release database connections"""
+        await super().close()
+        self.loop_monitor.stop()
+        self.compactor.stop()
+        await self.rate_limiter.stop()
+        await self.scheduler.stop()
+        await self.api_client.close()
+        await self.async_db.close()
+
     def update_settings(self, new_settings: dict):
         """Update bot settings and sync with configuration"""
         self.settings.update(new_settings)
@@ -215,6 +277,8 @@ class AdvancedDiscordBot(commands.Bot):
         """Update security settings and sync with configuration"""
         self.security.update(new_settings)
         self.config.update_security_settings(new_settings)
+        if 'blocked_words' in new_settings:
+            self.content_filter.set_patterns('blocked', self.security['blocked_words'], boundary='word')
         logger.info(f"Security settings updated: {list(new_settings.keys())}")
     
     def reload_config(self):
@@ -223,6 +287,7 @@ class AdvancedDiscordBot(commands.Bot):
         self.settings = self.config.get_bot_settings()
         self.security = self.config.get_security_settings()
         self.security['trusted_users'] = set()  # Preserve trusted users
+        self.content_filter.set_patterns('blocked', self.security['blocked_words'], boundary='word')
         logger.info("Configuration reloaded")
 
 async def setup_bot():
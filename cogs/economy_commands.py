@@ -31,13 +31,13 @@ class EconomyCog(commands.Cog):
         user_id = str(ctx.author.id)
         
         # Check if user is banned
-        user_data = self.bot.db.get_user(user_id)
+        user_data = await self.bot.async_db.get_user(user_id)
         if user_data.get('is_banned', 0):
             await ctx.send("❌ You are banned from using economy commands.")
             return
         
         # Atomic cooldown check with database
-        can_work, reason, time_left = self.bot.db.check_command_cooldown(user_id, 'work', 3600)  # 1 hour
+        can_work, reason, time_left = await self.bot.async_db.check_command_cooldown(user_id, 'work', 3600)  # 1 hour
         
         if not can_work:
             if time_left > 0:
@@ -83,7 +83,7 @@ class EconomyCog(commands.Cog):
         total_payment = max(10, base_payment + streak_bonus - fatigue_penalty)  # Min 10 coins
         
         # Update with atomic transaction
-        success, new_balance = self.bot.db.atomic_work_update(user_id, total_payment, work_streak + 1)
+        success, new_balance = await self.bot.async_db.atomic_work_update(user_id, total_payment, work_streak + 1)
         
         if not success:
             await ctx.send("❌ Work failed due to a database error. Please try again.")
@@ -155,7 +155,7 @@ class EconomyCog(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
-        user_data = self.bot.db.get_user(user_id)
+        user_data = await self.bot.async_db.get_user(user_id)
         
         if amount <= 0:
             await ctx.send("❌ Amount must be positive!")
@@ -170,7 +170,7 @@ class EconomyCog(commands.Cog):
         
         if win:
             winnings = int(amount * 1.8)  # 80% profit
-            self.bot.db.add_coins(user_id, winnings - amount)
+            await self.bot.async_db.add_coins(user_id, winnings - amount)
             
             embed = discord.Embed(
                 title="🎉 You Won!",
@@ -184,7 +184,7 @@ class EconomyCog(commands.Cog):
                 inline=True
             )
         else:
-            self.bot.db.spend_coins(user_id, amount)
+            await self.bot.async_db.spend_coins(user_id, amount)
             
             embed = discord.Embed(
                 title="💸 You Lost!",
@@ -192,7 +192,7 @@ class EconomyCog(commands.Cog):
                 color=discord.Color.red()
             )
             
-        new_balance = self.bot.db.get_user(user_id)['coins']
+        new_balance = (await self.bot.async_db.get_user(user_id))['coins']
         embed.add_field(
             name="🏦 New Balance",
             value=f"{new_balance} coins",
@@ -209,7 +209,7 @@ class EconomyCog(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
-        user_data = self.bot.db.get_user(user_id)
+        user_data = await self.bot.async_db.get_user(user_id)
         
         if amount <= 0:
             await ctx.send("❌ Amount must be positive!")
@@ -227,18 +227,18 @@ class EconomyCog(commands.Cog):
             # Triple match
             multiplier = 10 if slots[0] == '💰' else 5
             winnings = amount * multiplier
-            self.bot.db.add_coins(user_id, winnings - amount)
+            await self.bot.async_db.add_coins(user_id, winnings - amount)
             result_text = f"🎰 JACKPOT! Triple {slots[0]}! You won {winnings} coins!"
             color = discord.Color.gold()
         elif slots[0] == slots[1] or slots[1] == slots[2] or slots[0] == slots[2]:
             # Double match
             winnings = amount * 2
-            self.bot.db.add_coins(user_id, winnings - amount)
+            await self.bot.async_db.add_coins(user_id, winnings - amount)
             result_text = f"🎰 Double match! You won {winnings} coins!"
             color = discord.Color.green()
         else:
             # No match
-            self.bot.db.spend_coins(user_id, amount)
+            await self.bot.async_db.spend_coins(user_id, amount)
             result_text = f"🎰 No match. You lost {amount} coins."
             color = discord.Color.red()
             
@@ -248,7 +248,7 @@ class EconomyCog(commands.Cog):
             color=color
         )
         
-        new_balance = self.bot.db.get_user(user_id)['coins']
+        new_balance = (await self.bot.async_db.get_user(user_id))['coins']
         embed.add_field(
             name="💰 Balance",
             value=f"{new_balance} coins",
@@ -265,7 +265,7 @@ class EconomyCog(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
-        user_data = self.bot.db.get_user(user_id)
+        user_data = await self.bot.async_db.get_user(user_id)
         
         if amount <= 0:
             await ctx.send("❌ Amount must be positive!")
@@ -317,11 +317,11 @@ class EconomyCog(commands.Cog):
         if player_total == 21:
             # Player blackjack
             winnings = int(amount * 2.5)
-            self.bot.db.add_coins(user_id, winnings - amount)
+            await self.bot.async_db.add_coins(user_id, winnings - amount)
             embed.add_field(name="Result", value=f"🎉 BLACKJACK! You won {winnings} coins!", inline=False)
         elif player_total > 21:
             # Player bust
-            self.bot.db.spend_coins(user_id, amount)
+            await self.bot.async_db.spend_coins(user_id, amount)
             embed.add_field(name="Result", value=f"💥 BUST! You lost {amount} coins.", inline=False)
         else:
             # Dealer plays
@@ -338,22 +338,22 @@ class EconomyCog(commands.Cog):
             if dealer_total > 21:
                 # Dealer bust
                 winnings = amount * 2
-                self.bot.db.add_coins(user_id, winnings - amount)
+                await self.bot.async_db.add_coins(user_id, winnings - amount)
                 embed.add_field(name="Result", value=f"🎉 Dealer bust! You won {winnings} coins!", inline=False)
             elif player_total > dealer_total:
                 # Player wins
                 winnings = amount * 2
-                self.bot.db.add_coins(user_id, winnings - amount)
+                await self.bot.async_db.add_coins(user_id, winnings - amount)
                 embed.add_field(name="Result", value=f"🎉 You win! You won {winnings} coins!", inline=False)
             elif player_total == dealer_total:
                 # Tie
                 embed.add_field(name="Result", value=f"🤝 Push! Your {amount} coins are returned.", inline=False)
             else:
                 # Dealer wins
-                self.bot.db.spend_coins(user_id, amount)
+                await self.bot.async_db.spend_coins(user_id, amount)
                 embed.add_field(name="Result", value=f"😞 Dealer wins. You lost {amount} coins.", inline=False)
         
-        new_balance = self.bot.db.get_user(user_id)['coins']
+        new_balance = (await self.bot.async_db.get_user(user_id))['coins']
         embed.add_field(name="💰 Balance", value=f"{new_balance} coins", inline=True)
         
         await ctx.send(embed=embed)
@@ -409,7 +409,7 @@ class EconomyCog(commands.Cog):
             return
             
         user_id = str(ctx.author.id)
-        user_data = self.bot.db.get_user(user_id)
+        user_data = await self.bot.async_db.get_user(user_id)
         
         shop_items = {
             'status': {'cost': 500, 'name': 'Custom Status'},
@@ -431,7 +431,7 @@ class EconomyCog(commands.Cog):
             return
             
         # Process purchase
-        self.bot.db.spend_coins(user_id, cost)
+        await self.bot.async_db.spend_coins(user_id, cost)
         
         # Apply item effects
         current_time = datetime.now()
@@ -440,7 +440,7 @@ class EconomyCog(commands.Cog):
         if item.lower() == 'status':
             if not args:
                 await ctx.send("❌ Please provide a status message: `!buy status <message>`")
-                self.bot.db.add_coins(user_id, cost)  # Refund
+                await self.bot.async_db.add_coins(user_id, cost)  # Refund
                 return
             user_perks['custom_status'] = {
                 'message': args,
@@ -450,7 +450,7 @@ class EconomyCog(commands.Cog):
         elif item.lower() == 'color':
             if not args or not args.startswith('#'):
                 await ctx.send("❌ Please provide a hex color: `!buy color #FF0000`")
-                self.bot.db.add_coins(user_id, cost)  # Refund
+                await self.bot.async_db.add_coins(user_id, cost)  # Refund
                 return
             user_perks['profile_color'] = {
                 'color': args,
@@ -472,7 +472,7 @@ class EconomyCog(commands.Cog):
                 'expires': (current_time + timedelta(hours=1)).isoformat()
             }
         
-        self.bot.db.update_user_data(user_id, {'active_perks': user_perks})
+        await self.bot.async_db.update_user_data(user_id, {'active_perks': user_perks})
         
         embed = discord.Embed(
             title="✅ Purchase Successful!",
@@ -480,14 +480,14 @@ class EconomyCog(commands.Cog):
             color=discord.Color.green()
         )
         
-        new_balance = self.bot.db.get_user(user_id)['coins']
+        new_balance = (await self.bot.async_db.get_user(user_id))['coins']
         embed.add_field(name="💰 Remaining Balance", value=f"{new_balance} coins", inline=True)
         
         await ctx.send(embed=embed)
         
     @commands.command(name='leaderboard', aliases=['lb'])
-    async def leaderboard(self, ctx, category: str = 'coins'):
-        """Show various leaderboards"""
+    async def leaderboard(self, ctx, category: str = 'coins', scope: str = 'global'):
+        """Show various leaderboards (add `server` to rank this server only)"""
         valid_categories = ['coins', 'level', 'work', 'gambling']
         
         if category.lower() not in valid_categories:
@@ -500,19 +500,30 @@ class EconomyCog(commands.Cog):
             await ctx.send(embed=embed)
             return
             
+        guild_id = None
+        if scope.lower() == 'server' and ctx.guild:
+            guild_id = ctx.guild.id
+            # Re-sync only when the cached member list changed size. Compare with the cache,
+            # not member_count: without a full member cache the two never agree
+            if self.bot.async_db.leaderboards.guild_size(guild_id) != len(ctx.guild.members):
+                await self.bot.async_db.sync_guild_members(guild_id, [m.id for m in ctx.guild.members])
+
         # Get top users based on category
         if category.lower() == 'coins':
-            top_users = self.bot.db.get_top_users_by_coins(10)
+            top_users = await self.bot.async_db.get_top_users_by_coins(10, guild_id=guild_id)
+            rank_category = 'coins'
             title = "💰 Richest Users"
             value_key = 'coins'
             value_suffix = ' coins'
         elif category.lower() == 'work':
-            top_users = self.bot.db.get_top_users_by_work(10)
+            top_users = await self.bot.async_db.get_top_users_by_work(10, guild_id=guild_id)
+            rank_category = 'work'
             title = "💼 Most Hardworking"
             value_key = 'total_work_sessions'
             value_suffix = ' work sessions'
         else:
-            top_users = self.bot.db.get_top_users_by_coins(10)  # Default fallback
+            top_users = await self.bot.async_db.get_top_users_by_coins(10, guild_id=guild_id)  # Default fallback
+            rank_category = 'coins'
             title = "📊 Leaderboard"
             value_key = 'coins'
             value_suffix = ' coins'
@@ -523,22 +534,22 @@ class EconomyCog(commands.Cog):
             
         embed = discord.Embed(title=title, color=discord.Color.gold())
         
-        for i, user_data in enumerate(top_users[:10], 1):
-            try:
-                user = await self.bot.fetch_user(int(user_data['user_id']))
-                name = user.display_name
-            except:
-                name = f"User {user_data['user_id']}"
-                
+        names = await self.bot.name_resolver.resolve([u['user_id'] for u in top_users[:10]], ctx.guild)
+        for user_data in top_users[:10]:
+            i = user_data['rank']
             medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
-            value = user_data.get(value_key, 0)
+            value = user_data.get(value_key) or 0
             
             embed.add_field(
-                name=f"{medal} {name}",
+                name=f"{medal} {names[user_data['user_id']]}",
                 value=f"{value:,}{value_suffix}",
                 inline=True
             )
             
+        position = await self.bot.async_db.get_user_rank(str(ctx.author.id), rank_category, guild_id)
+        if position:
+            embed.set_footer(text=f"Your rank: #{position['rank']:,} of {position['out_of']:,}")
+            
         await ctx.send(embed=embed)
 
 async def setup(bot):
@@ -565,7 +576,7 @@ class EconomyCommands(commands.Cog):
     async def balance_command(self, ctx, member: discord.Member = None):
         """Check your or someone's balance"""
         target = member or ctx.author
-        user_data = self.bot.db.get_user(str(target.id))
+        user_data = await self.bot.async_db.get_user(str(target.id))
         
         embed = discord.Embed(
             title=f"💰 {target.display_name}'s Balance",
@@ -582,13 +593,13 @@ class EconomyCommands(commands.Cog):
         user_id = str(ctx.author.id)
         
         # Check if user is banned
-        user_data = self.bot.db.get_user(user_id)
+        user_data = await self.bot.async_db.get_user(user_id)
         if user_data.get('is_banned', 0):
             await ctx.send("❌ You are banned from using economy commands.")
             return
         
         # Use atomic daily claim system
-        success, message, new_balance = self.bot.db.claim_daily(user_id)
+        success, message, new_balance = await self.bot.async_db.claim_daily(user_id)
         
         if not success:
             await ctx.send(f"❌ {message}")
@@ -649,7 +660,7 @@ class EconomyCommands(commands.Cog):
         job = random.choice(jobs)
         earnings = random.randint(50, 200)
         
-        self.bot.db.update_user_coins(user_id, earnings)
+        await self.bot.async_db.update_user_coins(user_id, earnings)
         self.work_cooldown[user_id] = datetime.now() + timedelta(hours=1)
         
         embed = discord.Embed(
@@ -683,7 +694,7 @@ class EconomyCommands(commands.Cog):
         
         if success:
             earnings = random.randint(200, 800)
-            self.bot.db.update_user_coins(user_id, earnings)
+            await self.bot.async_db.update_user_coins(user_id, earnings)
             
             embed = discord.Embed(
                 title="🎭 Crime Successful",
@@ -692,7 +703,7 @@ class EconomyCommands(commands.Cog):
             )
         else:
             fine = random.randint(100, 400)
-            self.bot.db.update_user_coins(user_id, -fine)
+            await self.bot.async_db.update_user_coins(user_id, -fine)
             
             embed = discord.Embed(
                 title="🚔 Crime Failed",
@@ -733,7 +744,7 @@ class EconomyCommands(commands.Cog):
     async def buy_command(self, ctx, *, item_name: str):
         """Buy an item from the shop"""
         user_id = str(ctx.author.id)
-        user_data = self.bot.db.get_user(user_id)
+        user_data = await self.bot.async_db.get_user(user_id)
         
         items = {
             "premium role": {"price": 10000, "description": "Special role"},
@@ -753,12 +764,12 @@ class EconomyCommands(commands.Cog):
             return
         
         # Purchase item
-        self.bot.db.update_user_coins(user_id, -item['price'])
+        await self.bot.async_db.update_user_coins(user_id, -item['price'])
         
         # Add to inventory
-        inventory = self.bot.db.get_user_data(user_id, 'inventory', [])
+        inventory = await self.bot.async_db.get_user_data(user_id, 'inventory', [])
         inventory.append(item_name.lower())
-        self.bot.db.set_user_data(user_id, 'inventory', inventory)
+        await self.bot.async_db.set_user_data(user_id, 'inventory', inventory)
         
         embed = discord.Embed(
             title="✅ Purchase Successful",
@@ -771,7 +782,7 @@ class EconomyCommands(commands.Cog):
     async def inventory_command(self, ctx):
         """View your inventory"""
         user_id = str(ctx.author.id)
-        inventory = self.bot.db.get_user_data(user_id, 'inventory', [])
+        inventory = await self.bot.async_db.get_user_data(user_id, 'inventory', [])
         
         if not inventory:
             await ctx.send("📦 Your inventory is empty! Visit the `!shop` to buy items.")
@@ -795,13 +806,13 @@ class EconomyCommands(commands.Cog):
             return
         
         # Check if user is banned
-        user_data = self.bot.db.get_user(user_id)
+        user_data = await self.bot.async_db.get_user(user_id)
         if user_data.get('is_banned', 0):
             await ctx.send("❌ You are banned from using economy commands.")
             return
         
         # Check gambling cooldown (prevent spam)
-        can_gamble, reason, time_left = self.bot.db.check_command_cooldown(user_id, 'gamble', 10)  # 10 second cooldown
+        can_gamble, reason, time_left = await self.bot.async_db.check_command_cooldown(user_id, 'gamble', 10)  # 10 second cooldown
         if not can_gamble and time_left > 0:
             await ctx.send(f"⏰ Slow down! Wait {time_left} seconds before gambling again.")
             return
@@ -841,11 +852,11 @@ class EconomyCommands(commands.Cog):
             await confirm_msg.add_reaction("✅")
             await confirm_msg.add_reaction("❌")
             
-            def check(reaction, user):
-                return user == ctx.author and str(reaction.emoji) in ["✅", "❌"] and reaction.message.id == confirm_msg.id
-            
             try:
-                reaction, _ = await self.bot.wait_for('reaction_add', timeout=30.0, check=check)
+                reaction, _ = await self.bot.sessions.wait_for_reaction(
+                    confirm_msg.id, ctx.author.id, timeout=30.0,
+                    check=lambda reaction, user: str(reaction.emoji) in ["✅", "❌"]
+                )
                 if str(reaction.emoji) == "❌":
                     await ctx.send("❌ Gambling cancelled.")
                     return
@@ -857,7 +868,7 @@ class EconomyCommands(commands.Cog):
         win_chance = 0.44  # Slightly reduced from 0.45
         
         # Atomic gambling transaction
-        success, result_message, new_balance = self.bot.db.atomic_gamble(user_id, bet_amount, win_chance)
+        success, result_message, new_balance = await self.bot.async_db.atomic_gamble(user_id, bet_amount, win_chance)
         
         if not success:
             await ctx.send(f"❌ {result_message}")
@@ -887,7 +898,7 @@ class EconomyCommands(commands.Cog):
         embed.add_field(name="🏦 New Balance", value=f"{new_balance:,} coins", inline=True)
         
         # Add gambling addiction warning for frequent high bets
-        total_gambled_today = self.bot.db.get_user_data(user_id, 'total_gambled_today', 0)
+        total_gambled_today = await self.bot.async_db.get_user_data(user_id, 'total_gambled_today', 0)
         if total_gambled_today > current_coins * 2:
             embed.add_field(name="⚠️ Gambling Warning", 
                            value="Consider taking a break! Gambling can be addictive.", inline=False)
@@ -899,7 +910,7 @@ class EconomyCommands(commands.Cog):
         """View the richest users"""
         try:
             # Get top 10 users by coins
-            top_users = self.bot.db.get_top_users_by_coins(10)
+            top_users = await self.bot.async_db.get_top_users_by_coins(10)
             
             if not top_users:
                 await ctx.send("📊 No users found in the leaderboard!")
@@ -911,19 +922,15 @@ class EconomyCommands(commands.Cog):
                 color=0xFFD700
             )
             
-            for i, (user_id, coins) in enumerate(top_users, 1):
-                try:
-                    user = self.bot.get_user(int(user_id))
-                    username = user.display_name if user else f"User {user_id}"
-                    
-                    medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
-                    embed.add_field(
-                        name=f"{medal} {username}",
-                        value=f"{coins:,} coins",
-                        inline=False
-                    )
-                except:
-                    continue
+            names = await self.bot.name_resolver.resolve([u['user_id'] for u in top_users], ctx.guild)
+            for user_data in top_users:
+                i = user_data['rank']
+                medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
+                embed.add_field(
+                    name=f"{medal} {names[user_data['user_id']]}",
+                    value=f"{user_data['coins']:,} coins",
+                    inline=False
+                )
             
             await ctx.send(embed=embed)
             
@@ -392,19 +392,18 @@ class FunCog(commands.Cog):
         await message.add_reaction("💔")
         
         try:
-            def check(reaction, reactor):
-                return reactor == user and str(reaction.emoji) in ["💍", "💔"] and reaction.message.id == message.id
-                
-            reaction, reactor = await self.bot.wait_for('reaction_add', check=check, timeout=60)
+            reaction, reactor = await self.bot.sessions.wait_for_reaction(
+                message.id, user.id, timeout=60, check=lambda reaction, reactor: str(reaction.emoji) in ["💍", "💔"]
+            )
             
             if str(reaction.emoji) == "💍":
                 # Marriage accepted
-                user_data = self.bot.db.get_user(str(ctx.author.id))
-                partner_data = self.bot.db.get_user(str(user.id))
+                user_data = await self.bot.async_db.get_user(str(ctx.author.id))
+                partner_data = await self.bot.async_db.get_user(str(user.id))
                 
                 # Update marriage status
-                self.bot.db.update_user_data(str(ctx.author.id), {'married_to': str(user.id)})
-                self.bot.db.update_user_data(str(user.id), {'married_to': str(ctx.author.id)})
+                await self.bot.async_db.update_user_data(str(ctx.author.id), {'married_to': str(user.id)})
+                await self.bot.async_db.update_user_data(str(user.id), {'married_to': str(ctx.author.id)})
                 
                 embed = discord.Embed(
                     title="💕 Congratulations!",
@@ -413,8 +412,8 @@ class FunCog(commands.Cog):
                 )
                 
                 # Give marriage bonus coins
-                self.bot.db.add_coins(str(ctx.author.id), 500)
-                self.bot.db.add_coins(str(user.id), 500)
+                await self.bot.async_db.add_coins(str(ctx.author.id), 500)
+                await self.bot.async_db.add_coins(str(user.id), 500)
                 embed.add_field(name="💰 Wedding Gift", value="500 coins each!", inline=True)
                 
             else:
@@ -438,7 +437,7 @@ class FunCog(commands.Cog):
     async def divorce(self, ctx):
         """End your marriage"""
         user_id = str(ctx.author.id)
-        user_data = self.bot.db.get_user(user_id)
+        user_data = await self.bot.async_db.get_user(user_id)
         
         if 'married_to' not in user_data or not user_data['married_to']:
             await ctx.send("❌ You're not married!")
@@ -456,14 +455,14 @@ class FunCog(commands.Cog):
             )
             
             # Remove marriage status
-            self.bot.db.update_user_data(user_id, {'married_to': None})
-            self.bot.db.update_user_data(partner_id, {'married_to': None})
+            await self.bot.async_db.update_user_data(user_id, {'married_to': None})
+            await self.bot.async_db.update_user_data(partner_id, {'married_to': None})
             
             await ctx.send(embed=embed)
             
         except:
             # Partner not found, just remove marriage status
-            self.bot.db.update_user_data(user_id, {'married_to': None})
+            await self.bot.async_db.update_user_data(user_id, {'married_to': None})
             await ctx.send("💔 Your marriage has been ended.")
 
     @commands.command(name='profile')
@@ -472,7 +471,7 @@ class FunCog(commands.Cog):
         if user is None:
             user = ctx.author
             
-        user_data = self.bot.db.get_user(str(user.id))
+        user_data = await self.bot.async_db.get_user(str(user.id))
         
         embed = discord.Embed(
             title=f"👤 {user.display_name}'s Profile",
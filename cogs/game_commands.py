@@ -26,7 +26,7 @@ class GamesCog(commands.Cog):
         """Play trivia for coins"""
         user_id = str(ctx.author.id)
         
-        if user_id in self.active_games:
+        if user_id in self.active_games or self.bot.sessions.busy(ctx.channel.id, ctx.author.id):
             await ctx.send("❌ You already have an active game!")
             return
             
@@ -51,10 +51,7 @@ class GamesCog(commands.Cog):
         await ctx.send(embed=embed)
         
         try:
-            def check(m):
-                return m.author == ctx.author and m.channel == ctx.channel
-                
-            response = await self.bot.wait_for('message', check=check, timeout=30)
+            response = await self.bot.sessions.wait_for_message(ctx.channel.id, ctx.author.id, timeout=30)
             
             # Check answer
             user_answer = response.content.lower().strip()
@@ -71,7 +68,7 @@ class GamesCog(commands.Cog):
                         
             if is_correct:
                 reward = random.randint(50, 150)
-                self.bot.db.add_coins(user_id, reward)
+                await self.bot.async_db.add_coins(user_id, reward)
                 
                 embed = discord.Embed(
                     title="🎉 Correct!",
@@ -80,7 +77,7 @@ class GamesCog(commands.Cog):
                 )
                 
                 # Achievement check
-                self.check_trivia_achievement(user_id)
+                await self.check_trivia_achievement(user_id)
             else:
                 embed = discord.Embed(
                     title="❌ Incorrect!",
@@ -100,7 +97,7 @@ class GamesCog(commands.Cog):
         """Play Wordle game"""
         user_id = str(ctx.author.id)
         
-        if user_id in self.active_games:
+        if user_id in self.active_games or self.bot.sessions.busy(ctx.channel.id, ctx.author.id):
             await ctx.send("❌ You already have an active game!")
             return
             
@@ -129,10 +126,9 @@ class GamesCog(commands.Cog):
         
         while len(game_data['guesses']) < game_data['max_guesses']:
             try:
-                def check(m):
-                    return m.author == ctx.author and m.channel == ctx.channel and len(m.content) == 5
-                    
-                response = await self.bot.wait_for('message', check=check, timeout=60)
+                response = await self.bot.sessions.wait_for_message(
+                    ctx.channel.id, ctx.author.id, timeout=60, check=lambda m: len(m.content) == 5
+                )
                 guess = response.content.upper()
                 
                 if not guess.isalpha():
@@ -173,7 +169,7 @@ class GamesCog(commands.Cog):
                 
                 if guess == target_word:
                     reward = (7 - len(game_data['guesses'])) * 25  # More reward for fewer guesses
-                    self.bot.db.add_coins(user_id, reward)
+                    await self.bot.async_db.add_coins(user_id, reward)
                     
                     embed.add_field(
                         name="🎉 You Won!",
@@ -239,7 +235,7 @@ class GamesCog(commands.Cog):
              (user_choice == 'paper' and bot_choice == 'rock') or \
              (user_choice == 'scissors' and bot_choice == 'paper'):
             reward = random.randint(20, 50)
-            self.bot.db.add_coins(user_id, reward)
+            await self.bot.async_db.add_coins(user_id, reward)
             embed.add_field(name="Result", value=f"🎉 You win! +{reward} coins", inline=False)
             embed.color = discord.Color.green()
         else:
@@ -268,7 +264,7 @@ class GamesCog(commands.Cog):
         
         if number == bot_number:
             reward = random.randint(100, 200)
-            self.bot.db.add_coins(user_id, reward)
+            await self.bot.async_db.add_coins(user_id, reward)
             embed.add_field(name="Result", value=f"🎉 Correct! You won {reward} coins!", inline=False)
             embed.color = discord.Color.green()
         else:
@@ -282,7 +278,7 @@ class GamesCog(commands.Cog):
         """Solve math problems for coins"""
         user_id = str(ctx.author.id)
         
-        if user_id in self.active_games:
+        if user_id in self.active_games or self.bot.sessions.busy(ctx.channel.id, ctx.author.id):
             await ctx.send("❌ You already have an active game!")
             return
             
@@ -322,10 +318,7 @@ class GamesCog(commands.Cog):
         await ctx.send(embed=embed)
         
         try:
-            def check(m):
-                return m.author == ctx.author and m.channel == ctx.channel
-                
-            response = await self.bot.wait_for('message', check=check, timeout=15)
+            response = await self.bot.sessions.wait_for_message(ctx.channel.id, ctx.author.id, timeout=15)
             
             try:
                 user_answer = int(response.content)
@@ -337,7 +330,7 @@ class GamesCog(commands.Cog):
                     speed_bonus = max(0, int((15 - time_taken) * 5))
                     total_reward = base_reward + speed_bonus
                     
-                    self.bot.db.add_coins(user_id, total_reward)
+                    await self.bot.async_db.add_coins(user_id, total_reward)
                     
                     embed = discord.Embed(
                         title="🎉 Correct!",
@@ -379,7 +372,7 @@ class GamesCog(commands.Cog):
         """Word association game"""
         user_id = str(ctx.author.id)
         
-        if user_id in self.active_games:
+        if user_id in self.active_games or self.bot.sessions.busy(ctx.channel.id, ctx.author.id):
             await ctx.send("❌ You already have an active game!")
             return
             
@@ -414,10 +407,7 @@ class GamesCog(commands.Cog):
         
         while datetime.now() < end_time:
             try:
-                def check(m):
-                    return m.author == ctx.author and m.channel == ctx.channel
-                    
-                response = await self.bot.wait_for('message', check=check, timeout=10)
+                response = await self.bot.sessions.wait_for_message(ctx.channel.id, ctx.author.id, timeout=10)
                 word = response.content.lower().strip()
                 
                 if word in target_words and word not in game_data['found_words']:
@@ -436,7 +426,7 @@ class GamesCog(commands.Cog):
         reward = score * 25
         
         if reward > 0:
-            self.bot.db.add_coins(user_id, reward)
+            await self.bot.async_db.add_coins(user_id, reward)
             
         embed = discord.Embed(
             title="📝 Word Game Complete!",
@@ -453,16 +443,13 @@ class GamesCog(commands.Cog):
         del self.active_games[user_id]
         await ctx.send(embed=embed)
         
-    def check_trivia_achievement(self, user_id):
+    async def check_trivia_achievement(self, user_id):
         """Check and award trivia achievements"""
-        user_data = self.bot.db.get_user(user_id)
-        trivia_wins = user_data.get('trivia_wins', 0) + 1
-        
-        self.bot.db.update_user_data(user_id, {'trivia_wins': trivia_wins})
+        trivia_wins = await self.bot.async_db.increment_user_field(user_id, 'trivia_wins')
         
         # Award achievements
         if trivia_wins == 10:
-            self.bot.db.add_coins(user_id, 500)
+            await self.bot.async_db.add_coins(user_id, 500)
             # Could send achievement notification here
             
     @commands.command(name='games')
@@ -568,7 +555,7 @@ class GameCommands(commands.Cog):
             reward = 5
         
         # Give reward
-        self.bot.db.update_user_coins(str(ctx.author.id), reward)
+        await self.bot.async_db.update_user_coins(str(ctx.author.id), reward)
         
         embed = discord.Embed(
             title="🎮 Rock Paper Scissors",
@@ -601,7 +588,7 @@ class GameCommands(commands.Cog):
             result = f"❌ Wrong! The number was {secret_number}"
             color = 0xFF0000
         
-        self.bot.db.update_user_coins(str(ctx.author.id), reward)
+        await self.bot.async_db.update_user_coins(str(ctx.author.id), reward)
         
         embed = discord.Embed(
             title="🎲 Number Guessing Game",
@@ -615,6 +602,10 @@ class GameCommands(commands.Cog):
     @commands.command(name='trivia')
     async def trivia_command(self, ctx):
         """Answer trivia questions"""
+        if self.bot.sessions.busy(ctx.channel.id, ctx.author.id):
+            await ctx.send("❌ You already have an active game!")
+            return
+
         questions = [
             {"question": "What is the capital of France?", "answer": "paris", "options": ["London", "Berlin", "Paris", "Madrid"]},
             {"question": "How many planets are in our solar system?", "answer": "8", "options": ["7", "8", "9", "10"]},
@@ -638,11 +629,8 @@ class GameCommands(commands.Cog):
         
         await ctx.send(embed=embed)
         
-        def check(m):
-            return m.author == ctx.author and m.channel == ctx.channel
-        
         try:
-            user_answer = await self.bot.wait_for('message', check=check, timeout=30)
+            user_answer = await self.bot.sessions.wait_for_message(ctx.channel.id, ctx.author.id, timeout=30)
             
             if user_answer.content.lower() == question_data["answer"]:
                 reward = 50
@@ -653,7 +641,7 @@ class GameCommands(commands.Cog):
                 result = f"❌ Wrong! The answer was: {question_data['answer']}"
                 color = 0xFF0000
             
-            self.bot.db.update_user_coins(str(ctx.author.id), reward)
+            await self.bot.async_db.update_user_coins(str(ctx.author.id), reward)
             
             embed = discord.Embed(
                 title="🧠 Trivia Result",
@@ -679,7 +667,7 @@ class GameCommands(commands.Cog):
             return
         
         user_id = str(ctx.author.id)
-        user_data = self.bot.db.get_user(user_id)
+        user_data = await self.bot.async_db.get_user(user_id)
         
         if user_data.get('coins', 0) < bet:
             await ctx.send(f"💰 You don't have enough coins! You have {user_data.get('coins', 0):,}")
@@ -701,7 +689,7 @@ class GameCommands(commands.Cog):
                 multiplier = 5
             
             winnings = bet * multiplier
-            self.bot.db.update_user_coins(user_id, winnings - bet)
+            await self.bot.async_db.update_user_coins(user_id, winnings - bet)
             
             embed = discord.Embed(
                 title="🎰 JACKPOT!",
@@ -711,7 +699,7 @@ class GameCommands(commands.Cog):
         elif result[0] == result[1] or result[1] == result[2] or result[0] == result[2]:
             # Two match
             winnings = bet * 2
-            self.bot.db.update_user_coins(user_id, winnings - bet)
+            await self.bot.async_db.update_user_coins(user_id, winnings - bet)
             
             embed = discord.Embed(
                 title="🎰 Small Win!",
@@ -720,7 +708,7 @@ class GameCommands(commands.Cog):
             )
         else:
             # No match
-            self.bot.db.update_user_coins(user_id, -bet)
+            await self.bot.async_db.update_user_coins(user_id, -bet)
             
             embed = discord.Embed(
                 title="🎰 No Luck!",
@@ -742,7 +730,7 @@ class GameCommands(commands.Cog):
             return
         
         user_id = str(ctx.author.id)
-        user_data = self.bot.db.get_user(user_id)
+        user_data = await self.bot.async_db.get_user(user_id)
         
         if user_data.get('coins', 0) < bet:
             await ctx.send(f"💰 You don't have enough coins! You have {user_data.get('coins', 0):,}")
@@ -752,7 +740,7 @@ class GameCommands(commands.Cog):
         
         if choice.lower() == result:
             winnings = bet * 2
-            self.bot.db.update_user_coins(user_id, winnings - bet)
+            await self.bot.async_db.update_user_coins(user_id, winnings - bet)
             
             embed = discord.Embed(
                 title="🪙 Coin Flip - You Win!",
@@ -760,7 +748,7 @@ class GameCommands(commands.Cog):
                 color=0x00FF00
             )
         else:
-            self.bot.db.update_user_coins(user_id, -bet)
+            await self.bot.async_db.update_user_coins(user_id, -bet)
             
             embed = discord.Embed(
                 title="🪙 Coin Flip - You Lost!",
@@ -2,7 +2,6 @@ import discord
 from discord.ext import commands
 import datetime
 import re
-import asyncio
 import random
 
 class UtilityCog(commands.Cog):
@@ -56,12 +55,19 @@ class UtilityCog(commands.Cog):
         if seconds is None:
             await ctx.send("❌ Invalid time format! Use s/m/h/d (e.g., 10m, 2h, 1d)")
             return
+        await self.bot.scheduler.schedule('remindme', seconds, {
+            'user_id': ctx.author.id, 'channel_id': ctx.channel.id, 'message': message
+        })
         await ctx.send(f"⏰ Reminder set! I'll remind you in {time}.")
-        await asyncio.sleep(seconds)
+
+    async def remindme_job(self, reminder):
+        """Deliver a scheduled !remindme, by DM or in the original channel"""
+        user = self.bot.get_user(reminder['user_id']) or await self.bot.fetch_user(reminder['user_id'])
         try:
-            await ctx.author.send(f"⏰ Reminder: {message}")
+            await user.send(f"⏰ Reminder: {reminder['message']}")
         except Exception:
-            await ctx.send(f"⏰ {ctx.author.mention} Reminder: {message}")
+            channel = self.bot.get_channel(reminder['channel_id']) or await self.bot.fetch_channel(reminder['channel_id'])
+            await channel.send(f"⏰ {user.mention} Reminder: {reminder['message']}")
 
     def parse_time(self, time_str):
         match = re.match(r"(\d+)([smhd])", time_str)
@@ -374,20 +380,26 @@ class UtilityCog(commands.Cog):
         else:
             await ctx.send("❌ Word not found in banned list.")
 
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        if message.author.bot:
-            return
-        guild_id = str(message.guild.id) if message.guild else None
+    async def cog_load(self):
+        # Runs inside the bot's message pipeline; the bot already handles commands
+        self.bot.pipeline.register('banned_words', 'moderation', self.banned_words_stage, guild_only=True)
+        self.bot.scheduler.register('remindme', self.remindme_job)
+
+    async def cog_unload(self):
+        self.bot.pipeline.unregister('banned_words')
+        self.bot.scheduler.unregister('remindme')
+
+    async def banned_words_stage(self, message, context):
+        """Delete messages containing a guild's banned words"""
         banned = getattr(self.bot, 'banned_words', {})
-        words = banned.get(guild_id, set())
-        if words and any(word in message.content.lower() for word in words):
+        words = banned.get(str(message.guild.id), set())
+        if words and context.contains_any(words):
             try:
                 await message.delete()
                 await message.channel.send(f"🚫 Message deleted: banned word used.", delete_after=3)
             except Exception:
                 pass
-        await self.bot.process_commands(message)
+            return True
 
     # --- User Profile, Avatar, Stats, Invite ---
     @commands.command(name='profile')
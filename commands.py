@@ -5,6 +5,7 @@ import logging
 import random
 from datetime import datetime, timedelta, timezone
 import json
+from streaming_reply import StreamingReply
 
 logger = logging.getLogger(__name__)
 
@@ -187,8 +188,9 @@ class BalanceView(discord.ui.View):
     async def claim_daily(self, interaction: discord.Interaction, button: discord.ui.Button):
         user_id = str(interaction.user.id)
         
-        if self.bot.db.can_claim_daily(user_id):
-            new_balance = self.bot.db.claim_daily(user_id)
+        # Eligibility is checked inside the claim itself, so repeated clicks pay out once
+        claimed, _, new_balance = await self.bot.async_db.claim_daily(user_id)
+        if claimed:
             
             embed = discord.Embed(
                 title="🎁 Daily Reward Claimed!",
@@ -206,7 +208,7 @@ class BalanceView(discord.ui.View):
             await interaction.message.add_reaction('🎉')
         else:
             # Calculate time until next daily
-            user_data = self.bot.db.get_user(user_id)
+            user_data = await self.bot.async_db.get_user(user_id)
             if user_data.get('last_daily'):
                 last_daily = datetime.fromisoformat(user_data['last_daily'])
                 next_daily = last_daily + timedelta(days=1)
@@ -263,11 +265,11 @@ class BalanceView(discord.ui.View):
     async def back_to_balance(self, interaction: discord.Interaction, button: discord.ui.Button):
         # Refresh user data
         user_id = str(interaction.user.id)
-        user_data = self.bot.db.get_user(user_id)
+        user_data = await self.bot.async_db.get_user(user_id)
         self.user_data = user_data
         
         # Get recent transaction history
-        transactions = self.bot.db.get_transaction_history(user_id, 3)
+        transactions = await self.bot.async_db.get_transaction_history(user_id, 3)
         
         embed = discord.Embed(
             title="💰 Your Balance",
@@ -624,10 +626,10 @@ class BotCommands(commands.Cog):
     async def balance(self, ctx):
         """Check user's coin balance with interactive buttons"""
         user_id = str(ctx.author.id)
-        user_data = self.bot.db.get_user(user_id)
+        user_data = await self.bot.async_db.get_user(user_id)
         
         # Get recent transaction history
-        transactions = self.bot.db.get_transaction_history(user_id, 3)
+        transactions = await self.bot.async_db.get_transaction_history(user_id, 3)
         
         embed = discord.Embed(
             title="💰 Your Balance",
@@ -671,8 +673,9 @@ class BotCommands(commands.Cog):
         """Claim daily coin reward"""
         user_id = str(ctx.author.id)
         
-        if self.bot.db.can_claim_daily(user_id):
-            new_balance = self.bot.db.claim_daily(user_id)
+        # Eligibility is checked inside the claim itself, so repeated clicks pay out once
+        claimed, _, new_balance = await self.bot.async_db.claim_daily(user_id)
+        if claimed:
             
             embed = discord.Embed(
                 title="🎁 Daily Reward Claimed!",
@@ -690,7 +693,7 @@ class BotCommands(commands.Cog):
             await ctx.message.add_reaction('🎉')
         else:
             # Calculate time until next daily
-            user_data = self.bot.db.get_user(user_id)
+            user_data = await self.bot.async_db.get_user(user_id)
             if user_data.get('last_daily'):
                 last_daily = datetime.fromisoformat(user_data['last_daily'])
                 next_daily = last_daily + timedelta(days=1)
@@ -755,7 +758,7 @@ class BotCommands(commands.Cog):
         receiver_id = str(user.id)
         
         # Check if sender has enough coins
-        sender_data = self.bot.db.get_user(sender_id)
+        sender_data = await self.bot.async_db.get_user(sender_id)
         if sender_data['coins'] < amount:
             embed = discord.Embed(
                 title="❌ Insufficient Coins",
@@ -765,9 +768,9 @@ class BotCommands(commands.Cog):
             await ctx.send(embed=embed)
             return
         
-        if self.bot.db.transfer_coins(sender_id, receiver_id, amount):
-            sender_balance = self.bot.db.get_user(sender_id)['coins']
-            receiver_balance = self.bot.db.get_user(receiver_id)['coins']
+        if await self.bot.async_db.transfer_coins(sender_id, receiver_id, amount):
+            sender_balance = (await self.bot.async_db.get_user(sender_id))['coins']
+            receiver_balance = (await self.bot.async_db.get_user(receiver_id))['coins']
             
             embed = discord.Embed(
                 title="🎁 Coins Gifted!",
@@ -792,7 +795,7 @@ class BotCommands(commands.Cog):
     async def transactions(self, ctx):
         """Show recent transaction history"""
         user_id = str(ctx.author.id)
-        transactions = self.bot.db.get_transaction_history(user_id, 10)
+        transactions = await self.bot.async_db.get_transaction_history(user_id, 10)
         
         if not transactions:
             embed = discord.Embed(
@@ -868,40 +871,58 @@ class BotCommands(commands.Cog):
         user_id = str(ctx.author.id)
         
         # Check rate limits
-        if not self.bot.rate_limiter.check_limit(user_id, 'api_calls'):
+        guild_id = str(ctx.guild.id) if ctx.guild else None
+        if not self.bot.rate_limiter.check_limit(user_id, 'api_calls', guild_id):
             await ctx.send("⏰ You've hit your hourly API limit! Try again later.")
             return
             
         # Check and spend coins
-        if not self.bot.db.spend_coins(user_id, 10):
+        if not await self.bot.async_db.spend_coins(user_id, 10):
             await ctx.send("❌ You need 10 coins to use this command! Use `!daily` to get more.")
             return
             
         async with ctx.typing():
-            # Get conversation history
-            history = self.bot.db.get_conversation_history(user_id)
-            user_data = self.bot.db.get_user(user_id)
-            
-            # Generate response
-            response = self.bot.personality.generate_response(
-                message,
-                ctx.author.display_name,
-                user_data.get('personality_mode', 'default'),
-                history,
-                self.bot.api_client
-            )
+            # Get user data and conversation history in one query
+            context = await self.bot.async_db.get_conversation_context(user_id)
+            history = context['history']
+            user_data = context['user']
+            
+            footer = "\n\n💬 *Chat response • 10 coins spent*"
+            
+            if self.bot.settings.get('streaming_enabled', True):
+                # Stream the reply into the message as it is generated
+                response, _ = await StreamingReply(suffix=footer).send(
+                    ctx.send,
+                    self.bot.personality.stream_response(
+                        message,
+                        ctx.author.display_name,
+                        user_data.get('personality_mode', 'default'),
+                        history,
+                        self.bot.api_client,
+                        user_id
+                    )
+                )
+            else:
+                # Generate response
+                response = await self.bot.personality.generate_response(
+                    message,
+                    ctx.author.display_name,
+                    user_data.get('personality_mode', 'default'),
+                    history,
+                    self.bot.api_client,
+                    user_id
+                )
+                if response:
+                    # Send as plain text with a simple indicator
+                    await ctx.send(f"{response}{footer}")
             
             if response:
-                # Update usage
-                self.bot.db.update_usage(user_id, 'api_call')
-                self.bot.db.add_conversation(user_id, message, response)
-                
-                # Send as plain text with a simple indicator
-                await ctx.send(f"{response}\n\n💬 *Chat response • 10 coins spent*")
+                # Save conversation and usage in one write
+                await self.bot.async_db.record_exchange(user_id, message, response)
             else:
                 await ctx.send("❌ Sorry, I couldn't generate a response right now!")
                 # Refund coins on failure
-                self.bot.db.add_coins(user_id, 10)
+                await self.bot.async_db.add_coins(user_id, 10)
                 
     @commands.command(name='roleplay')
     async def roleplay(self, ctx, *, character: str = None):
@@ -966,7 +987,7 @@ class BotCommands(commands.Cog):
             return
         
         # Set personality mode in database
-        self.bot.db.set_personality_mode(user_id, character_lower)
+        await self.bot.async_db.set_personality_mode(user_id, character_lower)
         
         # Get personality description
         description = self.bot.personality.get_personality_description(character_lower)
@@ -1114,7 +1135,70 @@ class BotCommands(commands.Cog):
                 )
             except ImportError:
                 pass
-            
+
+            # LLM response cache
+            if hasattr(self.bot, 'response_cache'):
+                cache_stats = self.bot.response_cache.get_stats()
+                embed.add_field(
+                    name="🧠 Response Cache",
+                    value=f"**Hits:** {cache_stats['hits']} • **Misses:** {cache_stats['misses']}\n**Hit rate:** {cache_stats['hit_rate'] * 100:.0f}% • **Entries:** {cache_stats['entries']}",
+                    inline=True
+                )
+
+            # Event loop responsiveness
+            if hasattr(self.bot, 'loop_monitor'):
+                loop_stats = self.bot.loop_monitor.get_stats()
+                embed.add_field(
+                    name="⚡ Event Loop Lag",
+                    value=f"**p50:** {loop_stats['p50_ms']:.0f}ms • **p99:** {loop_stats['p99_ms']:.0f}ms\n**Max:** {loop_stats['max_ms']:.0f}ms over {loop_stats['samples']} samples",
+                    inline=True
+                )
+
+            if hasattr(self.bot, 'pipeline'):
+                pipeline_stats = self.bot.pipeline.get_stats()
+                stage_lines = [
+                    f"**{stage['name']}:** {stage['avg_ms']:.1f}ms avg"
+                    for stage in pipeline_stats['stages'] if stage['calls']
+                ]
+                embed.add_field(
+                    name="🧵 Message Pipeline",
+                    value=f"**Messages:** {pipeline_stats['messages']:,}\n" + ("\n".join(stage_lines[:5]) or "No messages yet"),
+                    inline=True
+                )
+
+            if hasattr(self.bot, 'compactor'):
+                compaction = self.bot.compactor.get_stats()
+                storage = await self.bot.async_db.get_storage_stats()
+                embed.add_field(
+                    name="🗜️ History Storage",
+                    value=f"**DB size:** {storage.get('file_bytes', 0) / 1048576:.1f} MB • **Rows:** {storage.get('conversations', 0):,}\n**Trimmed:** {compaction['rows_deleted']:,} • **Archived:** {storage.get('archived_turns', 0):,}\n**Reclaimed:** {compaction['bytes_reclaimed'] / 1024:.0f} KB" + ("" if storage.get('incremental_vacuum', True) else " (run `!vacuum` once to enable)"),
+                    inline=True
+                )
+
+            if hasattr(self.bot, 'message_history'):
+                trackers = self.bot.message_history.get_stats()
+                embed.add_field(
+                    name="🧠 Anti-Spam Tracker",
+                    value=f"**Users:** {trackers['keys']:,} (peak {trackers['peak_keys']:,})\n**Memory:** ~{trackers['approx_bytes'] / 1024:.0f} KB\n**Evicted:** {trackers['idle_evictions'] + trackers['capacity_evictions']:,}",
+                    inline=True
+                )
+
+            if hasattr(self.bot, 'db'):
+                ledger = self.bot.db.ledger.get_stats()
+                embed.add_field(
+                    name="🧾 Ledger",
+                    value=f"**Written:** {ledger['entries_written']:,} in {ledger['batches']:,} batches • **Queued:** {ledger['queued']:,}\n**Commit:** {ledger['avg_commit_ms']:.1f} ms avg, {ledger['max_commit_ms']:.1f} ms max",
+                    inline=True
+                )
+
+            if hasattr(self.bot, 'scheduler'):
+                timers = await self.bot.scheduler.get_stats()
+                embed.add_field(
+                    name="⏰ Timers",
+                    value=f"**Pending:** {timers['pending']:,} ({timers['in_memory']:,} in memory)\n**Fired:** {timers['fired']:,} • **Failed:** {timers['failed']:,}",
+                    inline=True
+                )
+
             # Version Info
             embed.add_field(
                 name="📋 Version Info",
@@ -1138,9 +1222,9 @@ class BotCommands(commands.Cog):
         """Show user statistics and usage information"""
         try:
             user_id = str(ctx.author.id)
-            user_data = self.bot.db.get_user(user_id)
+            user_data = await self.bot.async_db.get_user(user_id)
             usage_info = self.bot.rate_limiter.get_usage_info(user_id)
-            transactions = self.bot.db.get_transaction_history(user_id, 5)
+            transactions = await self.bot.async_db.get_transaction_history(user_id, 5)
             
             embed = discord.Embed(
                 title="📊 Your Statistics",
@@ -1238,7 +1322,7 @@ class BotCommands(commands.Cog):
             user_id = str(ctx.author.id)
             
             # Reset user data in database
-            self.bot.db.reset_user_data(user_id)
+            await self.bot.async_db.reset_user_data(user_id)
             
             embed = discord.Embed(
                 title="✅ Data Reset Complete",
@@ -1267,9 +1351,9 @@ class BotCommands(commands.Cog):
         """Create a backup of your data"""
         try:
             user_id = str(ctx.author.id)
-            user_data = self.bot.db.get_user(user_id)
-            transactions = self.bot.db.get_transaction_history(user_id, 50)
-            conversations = self.bot.db.get_conversation_history(user_id, 20)
+            user_data = await self.bot.async_db.get_user(user_id)
+            transactions = await self.bot.async_db.get_transaction_history(user_id, 50)
+            conversations = await self.bot.async_db.get_conversation_history(user_id, 20)
             
             backup_data = {
                 'user_data': user_data,
@@ -1313,12 +1397,34 @@ class BotCommands(commands.Cog):
             )
             await ctx.send(embed=embed)
     
+    @commands.command(name='vacuum', hidden=True)
+    @commands.is_owner()
+    async def vacuum(self, ctx):
+        """Rewrite the database once so freed history pages can be reclaimed"""
+        await ctx.send("🗜️ Vacuuming the database; writes pause until it finishes...")
+        result = await self.bot.async_db.enable_incremental_vacuum()
+        if not result:
+            await ctx.send("❌ Vacuum failed, check the logs.")
+            return
+        await ctx.send(
+            f"✅ Vacuum complete: {result['bytes_before'] / 1048576:.1f} MB → {result['bytes_after'] / 1048576:.1f} MB. "
+            "Freed pages are now reclaimed incrementally."
+        )
+    
     @commands.command(name='leaderboard')
-    async def leaderboard(self, ctx):
-        """Show top users by coin balance"""
+    async def leaderboard(self, ctx, scope: str = 'global'):
+        """Show top users by coin balance (`!leaderboard server` for this server only)"""
         try:
-            # Get top users from database
-            top_users = self.bot.db.get_top_users(10)
+            guild_id = None
+            if scope.lower() == 'server' and ctx.guild:
+                guild_id = ctx.guild.id
+                # Re-sync only when the cached member list changed size. Compare with the cache,
+                # not member_count: without a full member cache the two never agree
+                if self.bot.async_db.leaderboards.guild_size(guild_id) != len(ctx.guild.members):
+                    await self.bot.async_db.sync_guild_members(guild_id, [m.id for m in ctx.guild.members])
+
+            # Get top users from the rank index
+            top_users = await self.bot.async_db.get_top_users_by_coins(10, guild_id=guild_id)
             
             if not top_users:
                 embed = discord.Embed(
@@ -1331,30 +1437,26 @@ class BotCommands(commands.Cog):
             
             embed = discord.Embed(
                 title="🏆 Coin Leaderboard",
-                description="Top users by coin balance",
+                description="Top users by coin balance" + (" in this server" if guild_id else ""),
                 color=discord.Color.gold()
             )
             
-            for i, user_data in enumerate(top_users, 1):
-                user_id = user_data['user_id']
-                coins = user_data['coins']
-                
-                # Try to get user mention
-                try:
-                    user = await self.bot.fetch_user(int(user_id))
-                    user_display = user.display_name
-                except:
-                    user_display = f"User {user_id}"
-                
+            names = await self.bot.name_resolver.resolve([u['user_id'] for u in top_users], ctx.guild)
+            for user_data in top_users:
+                i = user_data['rank']
                 medal = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"{i}."
                 
                 embed.add_field(
-                    name=f"{medal} {user_display}",
-                    value=f"**{coins:,}** coins",
+                    name=f"{medal} {names[user_data['user_id']]}",
+                    value=f"**{user_data['coins']:,}** coins",
                     inline=True
                 )
             
-            embed.set_footer(text="Updated in real-time")
+            position = await self.bot.async_db.get_user_rank(str(ctx.author.id), 'coins', guild_id)
+            if position:
+                embed.set_footer(text=f"Your rank: #{position['rank']:,} of {position['out_of']:,} • Updated in real-time")
+            else:
+                embed.set_footer(text="Updated in real-time")
             await ctx.send(embed=embed)
             
         except Exception as e:
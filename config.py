@@ -20,14 +20,17 @@ class Config:
             'typing_timeout': 30,
             'rate_limit_window': 3600,
             'max_conversations_per_user': 100,
+            'conversation_archive_enabled': True,
             'chat_frequency': 0.1,
             'personality_mode': 'friendly',
             'reactions_enabled': True,
             'random_chat_enabled': True,
             'mention_only': False,
             'custom_prompt_enabled': True,
+            'streaming_enabled': True,
             'anti_spam_enabled': True,
             'max_conversation_history': 10,
+            'context_token_budget': 1500,
             'max_requests_per_minute': 30
         }
         self.load_config()
@@ -83,14 +86,17 @@ class Config:
             'typing_timeout': 30,
             'rate_limit_window': 3600,
             'max_conversations_per_user': 100,
+            'conversation_archive_enabled': True,
             'chat_frequency': 0.1,
             'personality_mode': 'friendly',
             'reactions_enabled': True,
             'random_chat_enabled': True,
             'mention_only': False,
             'custom_prompt_enabled': True,
+            'streaming_enabled': True,
             'anti_spam_enabled': True,
             'max_conversation_history': 10,
+            'context_token_budget': 1500,
             'max_requests_per_minute': 30
         }
         self.config = default_config
@@ -105,14 +111,16 @@ class Config:
             'reactions_enabled': self.config.get('reactions_enabled', True),
             'random_chat_enabled': self.config.get('random_chat_enabled', True),
             'mention_only': self.config.get('mention_only', False),
-            'custom_prompt_enabled': self.config.get('custom_prompt_enabled', True)
+            'custom_prompt_enabled': self.config.get('custom_prompt_enabled', True),
+            'streaming_enabled': self.config.get('streaming_enabled', True)
         }
     
     def update_bot_settings(self, settings: Dict[str, Any]):
         """Update bot-specific settings"""
         for key, value in settings.items():
             if key in ['chat_frequency', 'personality_mode', 'reactions_enabled', 
-                      'random_chat_enabled', 'mention_only', 'custom_prompt_enabled']:
+                      'random_chat_enabled', 'mention_only', 'custom_prompt_enabled',
+                      'streaming_enabled']:
                 self.config[key] = value
         
         self.save_config()
@@ -125,14 +133,15 @@ class Config:
             'max_message_length': self.config.get('max_message_length', 2000),
             'max_conversation_history': self.config.get('max_conversation_history', 10),
             'rate_limit_window': self.config.get('rate_limit_window', 60),
-            'max_requests_per_minute': self.config.get('max_requests_per_minute', 30)
+            'max_requests_per_minute': self.config.get('max_requests_per_minute', 30),
+            'blocked_words': self.config.get('blocked_words', ['token', 'password', 'api_key', 'secret'])
         }
     
     def update_security_settings(self, settings: Dict[str, Any]):
         """Update security-specific settings"""
         for key, value in settings.items():
             if key in ['anti_spam_enabled', 'max_message_length', 'max_conversation_history',
-                      'rate_limit_window', 'max_requests_per_minute']:
+                      'rate_limit_window', 'max_requests_per_minute', 'blocked_words']:
                 self.config[key] = value
         
         self.save_config()
@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import math
+import re
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PROMPT = (
+    "You maintain a short running summary of a Discord chat between a user and a bot. "
+    "Merge the new exchanges into the existing summary. Keep names, facts, preferences and "
+    "open questions; drop greetings and filler. Reply with the summary only, in plain sentences."
+)
+
+class ContextBuilder:
+    """Packs recent turns into a token budget and folds older ones into a rolling summary"""
+
+    # Words, numbers and single punctuation marks are roughly one BPE token each;
+    # long words split into about one token per four characters
+    _TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+    MESSAGE_OVERHEAD = 4  # Role and separator tokens the chat template adds per message
+
+    def __init__(self, api_client=None, budget_tokens: int = 1500, max_turn_tokens: int = 300,
+                 summary_tokens: int = 200, max_summaries: int = 1000):
+        self.api_client = api_client  # Needed for summaries; without it older turns are just dropped
+        self.budget_tokens = budget_tokens
+        self.max_turn_tokens = max_turn_tokens
+        self.summary_tokens = summary_tokens
+        self.max_summaries = max_summaries
+
+        # summary key -> (id of the newest turn folded in, summary text)
+        self._summaries: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+        self.builds = 0
+        self.turns_included = 0
+        self.turns_summarized = 0
+        self.prompt_tokens = 0
+        self.summaries_generated = 0
+
+    @classmethod
+    def count_tokens(cls, text: str) -> int:
+        """Approximate the model's token count without loading its tokenizer"""
+        if not text:
+            return 0
+        return sum(math.ceil(len(piece) / 4) for piece in cls._TOKEN_PATTERN.findall(text))
+
+    @classmethod
+    def truncate(cls, text: str, max_tokens: int) -> str:
+        """Cut text to roughly max_tokens, keeping the start"""
+        if cls.count_tokens(text) <= max_tokens:
+            return text
+        used = 0
+        for match in cls._TOKEN_PATTERN.finditer(text):
+            used += math.ceil(len(match.group()) / 4)
+            if used > max_tokens:
+                return text[:match.start()].rstrip() + "…"
+        return text
+
+    def _turn_tokens(self, turn: Dict) -> int:
+        return (min(self.count_tokens(turn['user_message']), self.max_turn_tokens)
+                + min(self.count_tokens(turn['bot_response']), self.max_turn_tokens)
+                + 2 * self.MESSAGE_OVERHEAD)
+
+    def build(self, personality_prompt: str, conversation_history: List[Dict], message: str,
+              user_name: str, summary_key: Optional[str] = None) -> List[Dict]:
+        """Build the chat messages for the model within the token budget.
+
+        conversation_history is oldest first. The newest turns that fit are
+        sent verbatim; turns that don't fit are covered by the cached summary
+        for summary_key, and a refresh is scheduled when new turns fall out of
+        the window.
+        """
+        current = {"role": "user", "content": f"{user_name} says: {message}"}
+        used = (self.count_tokens(personality_prompt) + self.count_tokens(current['content'])
+                + 2 * self.MESSAGE_OVERHEAD)
+
+        summary = self._summaries.get(summary_key) if summary_key else None
+        if summary:
+            used += self.count_tokens(summary[1]) + self.MESSAGE_OVERHEAD
+
+        # Walk back from the newest turn until the budget runs out
+        included = 0
+        for turn in reversed(conversation_history):
+            cost = self._turn_tokens(turn)
+            if used + cost > self.budget_tokens:
+                break
+            used += cost
+            included += 1
+
+        recent = conversation_history[len(conversation_history) - included:]
+        older = conversation_history[:len(conversation_history) - included]
+
+        messages = [{"role": "system", "content": personality_prompt}]
+        if summary_key and older:
+            self._maybe_refresh(summary_key, older)
+            if summary:
+                self._summaries.move_to_end(summary_key)
+                messages.append({
+                    "role": "system",
+                    "content": f"Summary of earlier conversation with {user_name}: {summary[1]}"
+                })
+
+        for turn in recent:
+            messages.append({"role": "user", "content": self.truncate(turn['user_message'], self.max_turn_tokens)})
+            messages.append({"role": "assistant", "content": self.truncate(turn['bot_response'], self.max_turn_tokens)})
+        messages.append(current)
+
+        self.builds += 1
+        self.turns_included += included
+        self.turns_summarized += len(older)
+        self.prompt_tokens += used
+        return messages
+
+    def _maybe_refresh(self, summary_key: str, older: List[Dict]):
+        """Schedule a summary update if turns newer than the summary have left the window"""
+        if not self.api_client or summary_key in self._refreshing:
+            return
+
+        covered_id = self._summaries[summary_key][0] if summary_key in self._summaries else 0
+        new_turns = [turn for turn in older if turn.get('id', 0) > covered_id]
+        if not new_turns:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        task = loop.create_task(self._refresh(summary_key, new_turns))
+        self._refreshing[summary_key] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(summary_key, None))
+
+    async def _refresh(self, summary_key: str, new_turns: List[Dict]):
+        """Fold new_turns into the stored summary with one short LLM call"""
+        previous = self._summaries.get(summary_key, (0, ""))[1]
+        exchanges = "\n".join(
+            f"User: {self.truncate(turn['user_message'], self.max_turn_tokens)}\n"
+            f"Bot: {self.truncate(turn['bot_response'], self.max_turn_tokens)}"
+            for turn in new_turns
+        )
+        prompt = f"Existing summary:\n{previous or '(none)'}\n\nNew exchanges:\n{exchanges}"
+
+        try:
+            summary = await self.api_client.chat_with_groq(
+                [{"role": "user", "content": prompt}],
+                personality_prompt=SUMMARY_PROMPT,
+                max_tokens=self.summary_tokens,
+                temperature=0.2
+            )
+        except Exception as e:
+            logger.error(f"Error generating conversation summary: {e}")
+            return
+
+        if not summary:
+            return  # Keep the old summary; the next build will retry
+
+        covered_id = max(turn.get('id', 0) for turn in new_turns)
+        self._summaries[summary_key] = (covered_id, self.truncate(summary.strip(), self.summary_tokens))
+        self._summaries.move_to_end(summary_key)
+        while len(self._summaries) > self.max_summaries:
+            self._summaries.popitem(last=False)
+        self.summaries_generated += 1
+
+    def get_stats(self) -> Dict:
+        """Get context builder statistics"""
+        return {
+            'builds': self.builds,
+            'avg_prompt_tokens': self.prompt_tokens / self.builds if self.builds else 0.0,
+            'turns_included': self.turns_included,
+            'turns_summarized': self.turns_summarized,
+            'summaries_cached': len(self._summaries),
+            'summaries_generated': self.summaries_generated
+        }
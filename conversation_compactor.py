@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class ConversationCompactor:
+    """Background job that enforces max_conversations_per_user, prunes expired cached replies and reclaims the space"""
+
+    def __init__(self, async_db, config, interval: float = 3600, initial_delay: float = 60,
+                 vacuum_pages: int = 2000, response_cache_ttl: Optional[float] = None):
+        self.async_db = async_db
+        self.config = config
+        self.response_cache_ttl = response_cache_ttl
+        self.interval = interval
+        self.initial_delay = initial_delay
+        self.vacuum_pages = vacuum_pages
+        self._task: Optional[asyncio.Task] = None
+
+        # Cumulative metrics since startup
+        self.runs = 0
+        self.rows_deleted = 0
+        self.rows_archived = 0
+        self.raw_bytes = 0
+        self.archived_bytes = 0
+        self.bytes_reclaimed = 0
+        self.cache_pruned = 0
+        self.last_run: Optional[float] = None
+        self.last_duration = 0.0
+
+    def start(self):
+        """Schedule periodic compaction on the running loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stop the periodic job"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        await asyncio.sleep(self.initial_delay)
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Conversation compaction failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def run_once(self) -> Dict:
+        """Trim, archive, prune the reply cache and vacuum once; returns this run's figures"""
+        started = time.perf_counter()
+        result = {'users': 0, 'rows_deleted': 0, 'rows_archived': 0, 'raw_bytes': 0, 'archived_bytes': 0}
+        # Persisted replies past the cache's TTL can never be served again
+        result['cache_pruned'] = (await self.async_db.prune_response_cache(self.response_cache_ttl)
+                                  if self.response_cache_ttl else 0)
+
+        keep = self.config.get('max_conversations_per_user', 100)
+        if keep and keep > 0:
+            archive = self.config.get('conversation_archive_enabled', True)
+            # The scan runs on a reader; each user is then its own writer call, so chat
+            # writes queued behind the compactor wait for one user, not the whole run
+            for user_id in await self.async_db.get_compaction_candidates(keep):
+                compacted = await self.async_db.compact_user_conversations(user_id, keep, archive)
+                for name, value in compacted.items():
+                    result[name] += value
+        # Only bother vacuuming when something was actually deleted
+        deleted = result['rows_deleted'] or result['cache_pruned']
+        result['bytes_reclaimed'] = await self.async_db.incremental_vacuum(self.vacuum_pages) if deleted else 0
+
+        self.runs += 1
+        self.rows_deleted += result['rows_deleted']
+        self.rows_archived += result['rows_archived']
+        self.raw_bytes += result['raw_bytes']
+        self.archived_bytes += result['archived_bytes']
+        self.bytes_reclaimed += result['bytes_reclaimed']
+        self.cache_pruned += result['cache_pruned']
+        self.last_run = time.time()
+        self.last_duration = time.perf_counter() - started
+
+        if result['rows_deleted']:
+            logger.info(
+                f"Compacted {result['rows_deleted']} conversation rows for {result['users']} users "
+                f"({result['raw_bytes']} bytes -> {result['archived_bytes']} archived, "
+                f"{result['bytes_reclaimed']} bytes reclaimed) in {self.last_duration:.2f}s"
+            )
+        return result
+
+    def get_stats(self) -> Dict:
+        """Get compaction statistics"""
+        return {
+            'runs': self.runs,
+            'rows_deleted': self.rows_deleted,
+            'rows_archived': self.rows_archived,
+            'raw_bytes': self.raw_bytes,
+            'archived_bytes': self.archived_bytes,
+            'compression_ratio': self.raw_bytes / self.archived_bytes if self.archived_bytes else 0.0,
+            'bytes_reclaimed': self.bytes_reclaimed,
+            'cache_pruned': self.cache_pruned,
+            'last_run': self.last_run,
+            'last_duration': self.last_duration
+        }
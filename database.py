@@ -1,386 +1,552 @@
-import sqlite3
 import json
 import logging
+import random
+import time
+import zlib
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+from db_connection import ConnectionManager
+from ledger_writer import LedgerWriter
+from rank_index import Leaderboards
+from user_attributes import UserAttributeStore
+from migrations import run_migrations
 
 logger = logging.getLogger(__name__)
 
 class Database:
     """Simple SQLite database for user data and conversations"""
-    
-    def __init__(self):
-        self.db_path = "bot_data.db"
+
+    def __init__(self, db_path: str = "bot_data.db"):
+        self.db_path = db_path
+        self.connections = ConnectionManager(self.db_path)
         self.init_database()
-    
+        self.ledger = LedgerWriter(self.connections)
+        self.ledger.start()
+        self.leaderboards = Leaderboards(self.connections)
+        self.attributes = UserAttributeStore(self.connections)
+        self.attributes.start()
+
+    def close(self):
+        """Commit queued ledger entries and attributes, and close all pooled connections"""
+        self.attributes.stop()
+        self.ledger.stop()
+        self.connections.close_all()
+
     def init_database(self):
-        """Initialize database tables"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Users table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id TEXT PRIMARY KEY,
-                    coins INTEGER DEFAULT 1000,
-                    personality_mode TEXT DEFAULT 'friendly',
-                    total_commands INTEGER DEFAULT 0,
-                    last_daily TEXT,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Conversations table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS conversations (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT,
-                    user_message TEXT,
-                    bot_response TEXT,
-                    timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            # Usage tracking table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS usage (
-                    user_id TEXT,
-                    date TEXT,
-                    hourly_calls INTEGER DEFAULT 0,
-                    images_today INTEGER DEFAULT 0,
-                    PRIMARY KEY (user_id, date)
-                )
-            ''')
-            
-            # Economy transactions table for better tracking
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS transactions (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id TEXT,
-                    transaction_type TEXT,
-                    amount INTEGER,
-                    balance_after INTEGER,
-                    timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (user_id)
-                )
-            ''')
-            
-            conn.commit()
-            conn.close()
-            logger.info("Database initialized successfully")
-            
+        """Initialize database tables by applying pending schema migrations"""
+        try:
+            version = run_migrations(self.connections)
+            logger.info(f"Database initialized successfully (schema v{version})")
+
         except Exception as e:
             logger.error(f"Database initialization error: {e}")
-    
+
+    USER_COLUMNS = ('user_id', 'coins', 'personality_mode', 'total_commands', 'last_daily', 'created_at',
+                    'work_streak', 'last_work', 'total_work_sessions', 'xp', 'trivia_wins')
+
+    # Columns update_user may set; coins only change through the ledgered economy operations
+    WRITABLE_COLUMNS = ('personality_mode', 'total_commands', 'last_daily', 'work_streak', 'last_work',
+                        'total_work_sessions', 'xp', 'trivia_wins')
+    COUNTER_COLUMNS = ('total_commands', 'work_streak', 'total_work_sessions', 'xp', 'trivia_wins')
+
     def get_user(self, user_id: str) -> Dict:
-        """Get or create user data"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT * FROM users WHERE user_id = ?
-            ''', (user_id,))
-            
-            result = cursor.fetchone()
-            
-            if result:
-                return {
-                    'user_id': result[0],
-                    'coins': result[1],
-                    'personality_mode': result[2],
-                    'total_commands': result[3],
-                    'last_daily': result[4],
-                    'created_at': result[5]
-                }
-            else:
+        """Get or create user data, including the user's sparse attributes"""
+        try:
+            with self.connections.cursor() as cursor:
+                cursor.execute(f'''
+                    SELECT {', '.join(self.USER_COLUMNS)} FROM users WHERE user_id = ?
+                ''', (user_id,))
+
+                result = cursor.fetchone()
+
+                if result:
+                    user = self.attributes.get_all(user_id)
+                    user.update(zip(self.USER_COLUMNS, result))
+                    return user
+
                 # Create new user
                 cursor.execute('''
-                    INSERT INTO users (user_id, coins, personality_mode)
+                    INSERT OR IGNORE INTO users (user_id, coins, personality_mode)
                     VALUES (?, 1000, 'friendly')
                 ''', (user_id,))
-                conn.commit()
-                
+                if cursor.rowcount:
+                    self._rank(user_id, coins=1000, work=0, streak=0)
+
                 return {
                     'user_id': user_id,
                     'coins': 1000,
                     'personality_mode': 'friendly',
                     'total_commands': 0,
                     'last_daily': None,
-                    'created_at': datetime.now().isoformat()
+                    'created_at': datetime.now().isoformat(),
+                    'work_streak': 0,
+                    'last_work': None,
+                    'total_work_sessions': 0,
+                    'xp': 0,
+                    'trivia_wins': 0
                 }
-                
+
         except Exception as e:
             logger.error(f"Error getting user: {e}")
             return {'user_id': user_id, 'coins': 1000, 'personality_mode': 'friendly'}
-        finally:
-            conn.close()
-    
+
+    # Per-user fields: hot counters are typed users columns, everything else is a sparse
+    # attribute in user_data. Updates write only the fields given, never the whole row.
+
+    def get_user_data(self, user_id: str, key: str, default=None):
+        """Get one per-user field, from its users column or the sparse attributes"""
+        try:
+            if key in self.USER_COLUMNS:
+                with self.connections.cursor() as cursor:
+                    cursor.execute(f"SELECT {key} FROM users WHERE user_id = ?", (user_id,))
+                    row = cursor.fetchone()
+                return default if row is None or row[0] is None else row[0]
+            return self.attributes.get(user_id, key, default)
+
+        except Exception as e:
+            logger.error(f"Error getting user data {key}: {e}")
+            return default
+
+    def set_user_data(self, user_id: str, key: str, value) -> bool:
+        """Set one per-user field; None removes a sparse attribute"""
+        return self.update_user(user_id, {key: value})
+
+    def update_user_data(self, user_id: str, fields: Dict) -> bool:
+        """Set several per-user fields, leaving the rest untouched"""
+        return self.update_user(user_id, fields)
+
+    def update_user(self, user_id: str, fields: Dict) -> bool:
+        """Partial update: typed columns in one upsert, other keys as sparse attributes"""
+        try:
+            columns = {key: value for key, value in fields.items() if key in self.WRITABLE_COLUMNS}
+            attributes = {key: value for key, value in fields.items() if key not in self.USER_COLUMNS}
+            if 'coins' in fields:
+                logger.warning(f"update_user ignores coins for {user_id}; use add_coins/spend_coins")
+
+            if columns:
+                row = {'coins': 1000, 'personality_mode': 'friendly', **columns}
+                with self.connections.transaction(immediate=True) as cursor:
+                    cursor.execute(f'''
+                        INSERT INTO users (user_id, {', '.join(row)}) VALUES (?, {', '.join('?' * len(row))})
+                        ON CONFLICT (user_id) DO UPDATE SET {', '.join(f"{key} = excluded.{key}" for key in columns)}
+                    ''', (user_id, *row.values()))
+                self.leaderboards.update_columns(user_id, columns)
+
+            if attributes:
+                self.attributes.set_many(user_id, attributes)
+            return True
+
+        except Exception as e:
+            logger.error(f"Error updating user {user_id}: {e}")
+            return False
+
+    def increment_user_field(self, user_id: str, field: str, delta: int = 1) -> Optional[int]:
+        """Add to a counter column in one statement and return its new value"""
+        try:
+            if field not in self.COUNTER_COLUMNS:
+                raise ValueError(f"{field} is not a counter column")
+            with self.connections.transaction(immediate=True) as cursor:
+                cursor.execute(f'''
+                    INSERT INTO users (user_id, coins, personality_mode, {field}) VALUES (?, 1000, 'friendly', ?)
+                    ON CONFLICT (user_id) DO UPDATE SET {field} = COALESCE({field}, 0) + excluded.{field}
+                    RETURNING {field}
+                ''', (user_id, delta))
+                value = cursor.fetchone()[0]
+            self.leaderboards.update_columns(user_id, {field: value})
+            return value
+
+        except Exception as e:
+            logger.error(f"Error incrementing {field}: {e}")
+            return None
+
     def add_conversation(self, user_id: str, user_message: str, bot_response: str):
         """Add conversation to history"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO conversations (user_id, user_message, bot_response)
-                VALUES (?, ?, ?)
-            ''', (user_id, user_message, bot_response))
-            
-            conn.commit()
-            
+            with self.connections.cursor() as cursor:
+                cursor.execute('''
+                    INSERT INTO conversations (user_id, user_message, bot_response, created_ts)
+                    VALUES (?, ?, ?, ?)
+                ''', (user_id, user_message, bot_response, int(time.time())))
+
         except Exception as e:
             logger.error(f"Error adding conversation: {e}")
-        finally:
-            conn.close()
-    
+
     def get_conversation_history(self, user_id: str, limit: int = 10) -> List[Dict]:
         """Get recent conversation history"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT user_message, bot_response FROM conversations
-                WHERE user_id = ?
-                ORDER BY timestamp DESC
-                LIMIT ?
-            ''', (user_id, limit))
-            
-            results = cursor.fetchall()
-            return [{'user_message': row[0], 'bot_response': row[1]} for row in results]
-            
+            with self.connections.cursor() as cursor:
+                cursor.execute('''
+                    SELECT id, user_message, bot_response FROM conversations
+                    WHERE user_id = ?
+                    ORDER BY id DESC
+                    LIMIT ?
+                ''', (user_id, limit))
+
+                results = cursor.fetchall()
+                return [{'id': row[0], 'user_message': row[1], 'bot_response': row[2]} for row in results]
+
         except Exception as e:
             logger.error(f"Error getting conversation history: {e}")
             return []
-        finally:
-            conn.close()
-    
+
+    def get_conversation_context(self, user_id: str, limit: int = 10) -> Dict:
+        """Load the user row, personality mode and last N turns (oldest first) in one query"""
+        default_user = {
+            'user_id': user_id,
+            'coins': 1000,
+            'personality_mode': 'friendly',
+            'total_commands': 0,
+            'last_daily': None,
+            'created_at': None
+        }
+        try:
+            with self.connections.cursor() as cursor:
+                # The one-row key table keeps a row even for unknown users
+                cursor.execute('''
+                    SELECT u.user_id, u.coins, u.personality_mode, u.total_commands,
+                           u.last_daily, u.created_at, c.user_message, c.bot_response, c.id
+                    FROM (SELECT ? AS uid) AS k
+                    LEFT JOIN users u ON u.user_id = k.uid
+                    LEFT JOIN (
+                        SELECT id, user_message, bot_response FROM conversations
+                        WHERE user_id = ?
+                        ORDER BY id DESC
+                        LIMIT ?
+                    ) c ON 1
+                    ORDER BY c.id ASC
+                ''', (user_id, user_id, limit))
+                rows = cursor.fetchall()
+
+            first = rows[0]
+            if first[0] is not None:
+                user = {
+                    'user_id': first[0],
+                    'coins': first[1],
+                    'personality_mode': first[2],
+                    'total_commands': first[3],
+                    'last_daily': first[4],
+                    'created_at': first[5]
+                }
+            else:
+                user = default_user
+
+            history = [
+                {'id': row[8], 'user_message': row[6], 'bot_response': row[7]}
+                for row in rows if row[8] is not None
+            ]
+            return {
+                'user': user,
+                'personality_mode': user['personality_mode'] or 'friendly',
+                'history': history
+            }
+
+        except Exception as e:
+            logger.error(f"Error loading conversation context: {e}")
+            return {'user': default_user, 'personality_mode': 'friendly', 'history': []}
+
+    def record_exchange(self, user_id: str, user_message: str, bot_response: str, usage_type: Optional[str] = 'api_call'):
+        """Save a conversation turn and bump usage in a single transaction"""
+        try:
+            today = datetime.now().strftime('%Y-%m-%d')
+
+            with self.connections.transaction(immediate=True) as cursor:
+                # First contact creates the user here, keeping the read path write-free
+                cursor.execute('''
+                    INSERT OR IGNORE INTO users (user_id, coins, personality_mode)
+                    VALUES (?, 1000, 'friendly')
+                ''', (user_id,))
+                created = cursor.rowcount > 0
+
+                cursor.execute('''
+                    INSERT INTO conversations (user_id, user_message, bot_response, created_ts)
+                    VALUES (?, ?, ?, ?)
+                ''', (user_id, user_message, bot_response, int(time.time())))
+
+                if usage_type == 'api_call':
+                    cursor.execute('''
+                        INSERT INTO usage (user_id, date, hourly_calls) VALUES (?, ?, 1)
+                        ON CONFLICT (user_id, date) DO UPDATE SET hourly_calls = hourly_calls + 1
+                    ''', (user_id, today))
+                elif usage_type == 'image':
+                    cursor.execute('''
+                        INSERT INTO usage (user_id, date, images_today) VALUES (?, ?, 1)
+                        ON CONFLICT (user_id, date) DO UPDATE SET images_today = images_today + 1
+                    ''', (user_id, today))
+
+            if created:
+                self._rank(user_id, coins=1000, work=0, streak=0)
+
+        except Exception as e:
+            logger.error(f"Error recording conversation exchange: {e}")
+
+    # Economy operations: each balance change is one guarded UPDATE ... RETURNING inside a
+    # BEGIN IMMEDIATE transaction, so concurrent commands can neither overdraw nor lose updates.
+    # Ledger rows are queued once that transaction has committed and written behind in batches.
+
+    def _rank(self, user_id: str, **values: int):
+        """Report committed values to the leaderboards, by category"""
+        for category, value in values.items():
+            self.leaderboards.update(category, user_id, value)
+
+    def _log_transaction(self, user_id: str, transaction_type: str, amount: int, balance_after: int):
+        self.ledger.append(user_id, transaction_type, amount, balance_after)
+        self._rank(user_id, coins=balance_after)
+
+    def _debit(self, cursor, user_id: str, amount: int) -> Optional[int]:
+        """Take amount from the user if they have it; new balance, or None if they don't"""
+        cursor.execute('''
+            UPDATE users SET coins = coins - ?
+            WHERE user_id = ? AND coins >= ?
+            RETURNING coins
+        ''', (amount, user_id, amount))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def _credit(self, cursor, user_id: str, amount: int, starting_balance: int = 1000) -> int:
+        """Add a (possibly negative) amount to the user, never going below zero; creates them with starting_balance"""
+        cursor.execute('''
+            INSERT INTO users (user_id, coins, personality_mode) VALUES (?, MAX(? + ?, 0), 'friendly')
+            ON CONFLICT (user_id) DO UPDATE SET coins = MAX(coins + ?, 0)
+            RETURNING coins
+        ''', (user_id, starting_balance, amount, amount))
+        return cursor.fetchone()[0]
+
     def spend_coins(self, user_id: str, amount: int) -> bool:
         """Spend coins if user has enough"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # First check if user has enough coins
-            cursor.execute('''
-                SELECT coins FROM users WHERE user_id = ?
-            ''', (user_id,))
-            
-            result = cursor.fetchone()
-            if not result or result[0] < amount:
-                conn.close()
-                return False
-            
-            current_balance = result[0]
-            new_balance = current_balance - amount
-            
-            # Update coins
-            cursor.execute('''
-                UPDATE users SET coins = ?
-                WHERE user_id = ?
-            ''', (new_balance, user_id))
-            
-            # Log transaction
-            cursor.execute('''
-                INSERT INTO transactions (user_id, transaction_type, amount, balance_after)
-                VALUES (?, 'spend', ?, ?)
-            ''', (user_id, -amount, new_balance))
-            
-            conn.commit()
-            conn.close()
-            
+            with self.connections.transaction(immediate=True) as cursor:
+                new_balance = self._debit(cursor, user_id, amount)
+                if new_balance is None:
+                    return False
+            self._log_transaction(user_id, 'spend', -amount, new_balance)
+
             logger.info(f"User {user_id} spent {amount} coins. New balance: {new_balance}")
             return True
-            
+
         except Exception as e:
             logger.error(f"Error spending coins: {e}")
             return False
-    
-    def add_coins(self, user_id: str, amount: int):
-        """Add coins to user"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get current balance
-            cursor.execute('''
-                SELECT coins FROM users WHERE user_id = ?
-            ''', (user_id,))
-            
-            result = cursor.fetchone()
-            current_balance = result[0] if result else 0
-            new_balance = current_balance + amount
-            
-            # Update coins
-            cursor.execute('''
-                UPDATE users SET coins = ?
-                WHERE user_id = ?
-            ''', (new_balance, user_id))
-            
-            # Log transaction
-            cursor.execute('''
-                INSERT INTO transactions (user_id, transaction_type, amount, balance_after)
-                VALUES (?, 'add', ?, ?)
-            ''', (user_id, amount, new_balance))
-            
-            conn.commit()
-            conn.close()
-            
+
+    def add_coins(self, user_id: str, amount: int) -> Optional[int]:
+        """Add coins to user and return the new balance"""
+        try:
+            with self.connections.transaction(immediate=True) as cursor:
+                new_balance = self._credit(cursor, user_id, amount)
+            self._log_transaction(user_id, 'add', amount, new_balance)
+
             logger.info(f"User {user_id} received {amount} coins. New balance: {new_balance}")
-            
+            return new_balance
+
         except Exception as e:
             logger.error(f"Error adding coins: {e}")
-    
+            return None
+
+    def update_user_coins(self, user_id: str, delta: int) -> Optional[int]:
+        """Apply a signed change to the user's coins (never below zero) and return the new balance"""
+        try:
+            with self.connections.transaction(immediate=True) as cursor:
+                cursor.execute("SELECT coins FROM users WHERE user_id = ?", (user_id,))
+                row = cursor.fetchone()
+                new_balance = self._credit(cursor, user_id, delta)
+            # A debit past zero is clamped, so the ledger records what was actually taken
+            applied = new_balance - (row[0] if row else 1000)
+            if applied:
+                self._log_transaction(user_id, 'add' if applied > 0 else 'spend', applied, new_balance)
+            return new_balance
+
+        except Exception as e:
+            logger.error(f"Error updating user coins: {e}")
+            return None
+
     def transfer_coins(self, sender_id: str, receiver_id: str, amount: int) -> bool:
         """Transfer coins between users"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Check if sender has enough coins
-            cursor.execute('''
-                SELECT coins FROM users WHERE user_id = ?
-            ''', (sender_id,))
-            
-            sender_result = cursor.fetchone()
-            if not sender_result or sender_result[0] < amount:
-                conn.close()
-                return False
-            
-            # Check if receiver exists, create if not
-            cursor.execute('''
-                SELECT coins FROM users WHERE user_id = ?
-            ''', (receiver_id,))
-            
-            receiver_result = cursor.fetchone()
-            if not receiver_result:
-                # Create receiver user
-                cursor.execute('''
-                    INSERT INTO users (user_id, coins, personality_mode)
-                    VALUES (?, 0, 'friendly')
-                ''', (receiver_id,))
-                receiver_balance = 0
-            else:
-                receiver_balance = receiver_result[0]
-            
-            sender_balance = sender_result[0]
-            
-            # Transfer coins
-            cursor.execute('''
-                UPDATE users SET coins = ? WHERE user_id = ?
-            ''', (sender_balance - amount, sender_id))
-            
-            cursor.execute('''
-                UPDATE users SET coins = ? WHERE user_id = ?
-            ''', (receiver_balance + amount, receiver_id))
-            
-            # Log transactions
-            cursor.execute('''
-                INSERT INTO transactions (user_id, transaction_type, amount, balance_after)
-                VALUES (?, 'transfer_sent', ?, ?)
-            ''', (sender_id, -amount, sender_balance - amount))
-            
-            cursor.execute('''
-                INSERT INTO transactions (user_id, transaction_type, amount, balance_after)
-                VALUES (?, 'transfer_received', ?, ?)
-            ''', (receiver_id, amount, receiver_balance + amount))
-            
-            conn.commit()
-            conn.close()
-            
+            with self.connections.transaction(immediate=True) as cursor:
+                sender_balance = self._debit(cursor, sender_id, amount)
+                if sender_balance is None:
+                    return False
+
+                # A receiver seen for the first time starts from zero
+                receiver_balance = self._credit(cursor, receiver_id, amount, starting_balance=0)
+
+            self._log_transaction(sender_id, 'transfer_sent', -amount, sender_balance)
+            self._log_transaction(receiver_id, 'transfer_received', amount, receiver_balance)
+
             logger.info(f"Transfer: {sender_id} -> {receiver_id}: {amount} coins")
             return True
-            
+
         except Exception as e:
             logger.error(f"Error transferring coins: {e}")
             return False
-    
+
+    def atomic_gamble(self, user_id: str, bet: int, win_chance: float) -> Tuple[bool, str, int]:
+        """Settle a bet in one guarded statement; returns (success, message, new_balance)"""
+        try:
+            won = random.random() < win_chance
+            delta = bet if won else -bet
+
+            with self.connections.transaction(immediate=True) as cursor:
+                # The stake must be covered even when the bet is won
+                cursor.execute('''
+                    UPDATE users SET coins = coins + ?
+                    WHERE user_id = ? AND coins >= ?
+                    RETURNING coins
+                ''', (delta, user_id, bet))
+                row = cursor.fetchone()
+                if row is None:
+                    balance = self._balance(cursor, user_id)
+                    return False, f"Not enough coins to bet {bet:,} (you have {balance:,})", balance
+
+                new_balance = row[0]
+            self._log_transaction(user_id, 'gamble_win' if won else 'gamble_loss', delta, new_balance)
+
+            return True, (f"You won {bet:,} coins" if won else f"You lost {bet:,} coins"), new_balance
+
+        except Exception as e:
+            logger.error(f"Error settling gamble: {e}")
+            return False, "Gambling failed due to a database error", 0
+
+    def atomic_work_update(self, user_id: str, payment: int, work_streak: int) -> Tuple[bool, int]:
+        """Pay for a work shift and record the streak in one statement; returns (success, new_balance)"""
+        try:
+            with self.connections.transaction(immediate=True) as cursor:
+                cursor.execute('''
+                    INSERT INTO users (user_id, coins, personality_mode, work_streak, last_work, total_work_sessions)
+                    VALUES (?, 1000 + ?, 'friendly', ?, ?, 1)
+                    ON CONFLICT (user_id) DO UPDATE SET
+                        coins = coins + ?,
+                        work_streak = excluded.work_streak,
+                        last_work = excluded.last_work,
+                        total_work_sessions = COALESCE(total_work_sessions, 0) + 1
+                    RETURNING coins, total_work_sessions
+                ''', (user_id, payment, work_streak, datetime.now().isoformat(), payment))
+                new_balance, sessions = cursor.fetchone()
+            self._log_transaction(user_id, 'work', payment, new_balance)
+            self._rank(user_id, work=sessions, streak=work_streak)
+
+            return True, new_balance
+
+        except Exception as e:
+            logger.error(f"Error recording work: {e}")
+            return False, 0
+
+    def check_command_cooldown(self, user_id: str, command_name: str, cooldown_seconds: int) -> Tuple[bool, str, int]:
+        """Claim a use of a command if its cooldown has passed; returns (allowed, reason, seconds_left)"""
+        try:
+            now = datetime.now(timezone.utc).isoformat()
+            with self.connections.transaction(immediate=True) as cursor:
+                # Stamps the new use only if the previous one is old enough
+                cursor.execute('''
+                    INSERT INTO command_cooldowns (user_id, command_name, last_used, cooldown_seconds, uses_today)
+                    VALUES (?, ?, ?, ?, 1)
+                    ON CONFLICT (user_id, command_name) DO UPDATE SET
+                        last_used = excluded.last_used,
+                        cooldown_seconds = excluded.cooldown_seconds,
+                        uses_today = uses_today + 1
+                    WHERE (julianday(excluded.last_used) - julianday(last_used)) * 86400 >= excluded.cooldown_seconds
+                    RETURNING last_used
+                ''', (user_id, command_name, now, cooldown_seconds))
+                if cursor.fetchone():
+                    return True, "OK", 0
+
+                cursor.execute('''
+                    SELECT ? - (julianday(?) - julianday(last_used)) * 86400
+                    FROM command_cooldowns WHERE user_id = ? AND command_name = ?
+                ''', (cooldown_seconds, now, user_id, command_name))
+                row = cursor.fetchone()
+
+            time_left = max(1, int(row[0] + 0.999)) if row and row[0] is not None else cooldown_seconds
+            return False, "Command is on cooldown", time_left
+
+        except Exception as e:
+            logger.error(f"Error checking command cooldown: {e}")
+            return True, "OK", 0
+
+    def _balance(self, cursor, user_id: str) -> int:
+        cursor.execute("SELECT coins FROM users WHERE user_id = ?", (user_id,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
     def can_claim_daily(self, user_id: str) -> bool:
         """Check if user can claim daily reward"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT last_daily FROM users WHERE user_id = ?
-            ''', (user_id,))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
+            with self.connections.cursor() as cursor:
+                cursor.execute('''
+                    SELECT last_daily FROM users WHERE user_id = ?
+                ''', (user_id,))
+
+                result = cursor.fetchone()
+
             if not result or not result[0]:
                 return True
-            
+
             # Parse the last daily time and check if 24 hours have passed
             last_daily = datetime.fromisoformat(result[0])
             now = datetime.now(timezone.utc)
-            
+
             # Check if it's been more than 24 hours since last claim
             time_diff = now - last_daily.replace(tzinfo=timezone.utc)
             return time_diff.total_seconds() >= 86400  # 24 hours in seconds
-            
+
         except Exception as e:
             logger.error(f"Error checking daily claim: {e}")
             return True
-    
-    def claim_daily(self, user_id: str) -> int:
-        """Claim daily reward and return new balance"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get current balance
-            cursor.execute('''
-                SELECT coins FROM users WHERE user_id = ?
-            ''', (user_id,))
-            
-            result = cursor.fetchone()
-            current_balance = result[0] if result else 0
-            new_balance = current_balance + 100
-            
-            # Update coins and last daily time
-            cursor.execute('''
-                UPDATE users 
-                SET coins = ?, last_daily = ?
-                WHERE user_id = ?
-            ''', (new_balance, datetime.now(timezone.utc).isoformat(), user_id))
-            
-            # Log transaction
-            cursor.execute('''
-                INSERT INTO transactions (user_id, transaction_type, amount, balance_after)
-                VALUES (?, 'daily_reward', ?, ?)
-            ''', (user_id, 100, new_balance))
-            
-            conn.commit()
-            conn.close()
-            
+
+    def claim_daily(self, user_id: str) -> Tuple[bool, str, int]:
+        """Claim the daily reward if 24 hours have passed; returns (success, message, new_balance)"""
+        try:
+            now = datetime.now(timezone.utc)
+            with self.connections.transaction(immediate=True) as cursor:
+                cursor.execute('''
+                    INSERT OR IGNORE INTO users (user_id, coins, personality_mode)
+                    VALUES (?, 1000, 'friendly')
+                ''', (user_id,))
+
+                # Eligibility check and payout in one statement, so a double click pays once
+                cursor.execute('''
+                    UPDATE users SET coins = coins + 100, last_daily = ?
+                    WHERE user_id = ?
+                      AND (last_daily IS NULL OR julianday(?) - julianday(last_daily) >= 1)
+                    RETURNING coins
+                ''', (now.isoformat(), user_id, now.isoformat()))
+                row = cursor.fetchone()
+
+                if row is None:
+                    cursor.execute('''
+                        SELECT coins, 86400 - (julianday(?) - julianday(last_daily)) * 86400
+                        FROM users WHERE user_id = ?
+                    ''', (now.isoformat(), user_id))
+                    balance, seconds_left = cursor.fetchone()
+                    hours, minutes = int(seconds_left // 3600), int((seconds_left % 3600) // 60)
+                    return False, f"You already claimed your daily reward! Come back in {hours}h {minutes}m.", balance
+
+                new_balance = row[0]
+            self._log_transaction(user_id, 'daily_reward', 100, new_balance)
+
             logger.info(f"User {user_id} claimed daily reward. New balance: {new_balance}")
-            return new_balance
-            
+            return True, "Daily reward claimed", new_balance
+
         except Exception as e:
             logger.error(f"Error claiming daily: {e}")
-            return 1000
-    
+            return False, "Daily claim failed due to a database error", 0
+
     def get_transaction_history(self, user_id: str, limit: int = 10) -> List[Dict]:
         """Get user's recent transaction history"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT transaction_type, amount, balance_after, timestamp 
-                FROM transactions 
-                WHERE user_id = ?
-                ORDER BY timestamp DESC
-                LIMIT ?
-            ''', (user_id, limit))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
+            # Include entries still waiting in the write-behind queue
+            self.ledger.flush()
+            with self.connections.cursor() as cursor:
+                cursor.execute('''
+                    SELECT transaction_type, amount, balance_after,
+                           COALESCE(datetime(created_ts, 'unixepoch'), timestamp)
+                    FROM transactions
+                    WHERE user_id = ?
+                    ORDER BY id DESC
+                    LIMIT ?
+                ''', (user_id, limit))
+
+                results = cursor.fetchall()
+
             return [
                 {
                     'type': row[0],
@@ -390,44 +556,36 @@ class Database:
                 }
                 for row in results
             ]
-            
+
         except Exception as e:
             logger.error(f"Error getting transaction history: {e}")
             return []
-    
+
     def set_personality_mode(self, user_id: str, mode: str):
         """Set user's personality mode"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                UPDATE users SET personality_mode = ?
-                WHERE user_id = ?
-            ''', (mode, user_id))
-            
-            conn.commit()
-            conn.close()
-            
+            with self.connections.cursor() as cursor:
+                cursor.execute('''
+                    UPDATE users SET personality_mode = ?
+                    WHERE user_id = ?
+                ''', (mode, user_id))
+
         except Exception as e:
             logger.error(f"Error setting personality mode: {e}")
-    
+
     def get_usage_data(self, user_id: str) -> Dict:
         """Get user's usage data"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             today = datetime.now().strftime('%Y-%m-%d')
-            
-            cursor.execute('''
-                SELECT hourly_calls, images_today FROM usage
-                WHERE user_id = ? AND date = ?
-            ''', (user_id, today))
-            
-            result = cursor.fetchone()
-            conn.close()
-            
+
+            with self.connections.cursor() as cursor:
+                cursor.execute('''
+                    SELECT hourly_calls, images_today FROM usage
+                    WHERE user_id = ? AND date = ?
+                ''', (user_id, today))
+
+                result = cursor.fetchone()
+
             if result:
                 return {
                     'hourly_calls': result[0],
@@ -435,110 +593,134 @@ class Database:
                 }
             else:
                 return {'hourly_calls': 0, 'images_today': 0}
-                
+
         except Exception as e:
             logger.error(f"Error getting usage data: {e}")
             return {'hourly_calls': 0, 'images_today': 0}
-    
+
     def update_usage(self, user_id: str, usage_type: str):
         """Update usage tracking"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             today = datetime.now().strftime('%Y-%m-%d')
-            
-            if usage_type == 'api_call':
-                cursor.execute('''
-                    INSERT OR REPLACE INTO usage (user_id, date, hourly_calls)
-                    VALUES (?, ?, COALESCE(
-                        (SELECT hourly_calls FROM usage WHERE user_id = ? AND date = ?), 0
-                    ) + 1)
-                ''', (user_id, today, user_id, today))
-            elif usage_type == 'image':
-                cursor.execute('''
-                    INSERT OR REPLACE INTO usage (user_id, date, images_today)
-                    VALUES (?, ?, COALESCE(
-                        (SELECT images_today FROM usage WHERE user_id = ? AND date = ?), 0
-                    ) + 1)
-                ''', (user_id, today, user_id, today))
-            
-            conn.commit()
-            conn.close()
-            
+
+            with self.connections.cursor() as cursor:
+                if usage_type == 'api_call':
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO usage (user_id, date, hourly_calls)
+                        VALUES (?, ?, COALESCE(
+                            (SELECT hourly_calls FROM usage WHERE user_id = ? AND date = ?), 0
+                        ) + 1)
+                    ''', (user_id, today, user_id, today))
+                elif usage_type == 'image':
+                    cursor.execute('''
+                        INSERT OR REPLACE INTO usage (user_id, date, images_today)
+                        VALUES (?, ?, COALESCE(
+                            (SELECT images_today FROM usage WHERE user_id = ? AND date = ?), 0
+                        ) + 1)
+                    ''', (user_id, today, user_id, today))
+
         except Exception as e:
             logger.error(f"Error updating usage: {e}")
-    
+
     def reset_user_data(self, user_id: str):
         """Reset user data to defaults"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Reset user data to defaults
-            cursor.execute('''
-                UPDATE users 
-                SET coins = 1000, personality_mode = 'friendly', total_commands = 0, last_daily = NULL
-                WHERE user_id = ?
-            ''', (user_id,))
-            
-            # Clear conversation history
-            cursor.execute('''
-                DELETE FROM conversations WHERE user_id = ?
-            ''', (user_id,))
-            
-            # Clear usage data
-            cursor.execute('''
-                DELETE FROM usage WHERE user_id = ?
-            ''', (user_id,))
-            
-            conn.commit()
-            conn.close()
-            
+            with self.connections.transaction() as cursor:
+                # Reset user data to defaults
+                cursor.execute('''
+                    UPDATE users
+                    SET coins = 1000, personality_mode = 'friendly', total_commands = 0, last_daily = NULL
+                    WHERE user_id = ?
+                ''', (user_id,))
+
+                # Clear conversation history
+                cursor.execute('''
+                    DELETE FROM conversations WHERE user_id = ?
+                ''', (user_id,))
+
+                # Clear usage data
+                cursor.execute('''
+                    DELETE FROM usage WHERE user_id = ?
+                ''', (user_id,))
+
+            self._rank(user_id, coins=1000)
             logger.info(f"User data reset for {user_id}")
-            
+
         except Exception as e:
             logger.error(f"Error resetting user data: {e}")
-    
+
+    def _top_rows(self, category: str, columns: Tuple[str, ...], limit: int, offset: int, guild_id) -> List[Dict]:
+        """Leading users of a category from the rank index, with their columns fetched in one query"""
+        leaders = self.leaderboards.top(category, limit, offset, guild_id)
+        if not leaders:
+            return []
+        user_ids = [user_id for user_id, _, _ in leaders]
+        with self.connections.cursor() as cursor:
+            cursor.execute(f'''
+                SELECT user_id, {', '.join(columns)} FROM users
+                WHERE user_id IN ({', '.join('?' * len(user_ids))})
+            ''', user_ids)
+            rows = {row[0]: dict(zip(('user_id',) + columns, row)) for row in cursor.fetchall()}
+        return [dict(rows.get(user_id, {'user_id': user_id}), rank=rank) for user_id, _, rank in leaders]
+
     def get_top_users(self, limit: int = 10) -> List[Dict]:
         """Get top users by coin balance"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                SELECT user_id, coins, total_commands 
-                FROM users 
-                ORDER BY coins DESC 
-                LIMIT ?
-            ''', (limit,))
-            
-            results = cursor.fetchall()
-            conn.close()
-            
-            return [
-                {
-                    'user_id': row[0],
-                    'coins': row[1],
-                    'total_commands': row[2]
-                }
-                for row in results
-            ]
-            
+            return self._top_rows('coins', ('coins', 'total_commands'), limit, 0, None)
+
         except Exception as e:
             logger.error(f"Error getting top users: {e}")
             return []
 
+    def get_top_users_by_coins(self, limit: int = 10, offset: int = 0, guild_id=None) -> List[Dict]:
+        """Get the richest users, globally or among a synced guild's members"""
+        try:
+            return self._top_rows('coins', ('coins',), limit, offset, guild_id)
+
+        except Exception as e:
+            logger.error(f"Error getting top users by coins: {e}")
+            return []
+
+    def get_top_users_by_work(self, limit: int = 10, offset: int = 0, guild_id=None) -> List[Dict]:
+        """Get the users with the most work sessions, globally or among a synced guild's members"""
+        try:
+            return self._top_rows('work', ('total_work_sessions', 'work_streak'), limit, offset, guild_id)
+
+        except Exception as e:
+            logger.error(f"Error getting top users by work: {e}")
+            return []
+
+    def get_user_rank(self, user_id: str, category: str = 'coins', guild_id=None) -> Optional[Dict]:
+        """Get a user's leaderboard position: rank, out_of and value"""
+        try:
+            result = self.leaderboards.rank(category, user_id, guild_id)
+            if result is None:
+                return None
+            rank, out_of, value = result
+            return {'rank': rank, 'out_of': out_of, 'value': value}
+
+        except Exception as e:
+            logger.error(f"Error getting user rank: {e}")
+            return None
+
+    def sync_guild_members(self, guild_id, member_ids) -> bool:
+        """Set the members a guild's leaderboards rank; cheap when nothing changed"""
+        try:
+            self.leaderboards.sync_guild(guild_id, member_ids)
+            return True
+
+        except Exception as e:
+            logger.error(f"Error syncing guild members: {e}")
+            return False
+
     def get_personality_mode(self, user_id: str) -> str:
         """Get user's personality mode, defaulting to 'friendly' if not set"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT personality_mode FROM users WHERE user_id = ?
-            ''', (user_id,))
-            result = cursor.fetchone()
-            conn.close()
+            with self.connections.cursor() as cursor:
+                cursor.execute('''
+                    SELECT personality_mode FROM users WHERE user_id = ?
+                ''', (user_id,))
+                result = cursor.fetchone()
             if result and result[0]:
                 return result[0]
             else:
@@ -546,3 +728,198 @@ class Database:
         except Exception as e:
             logger.error(f"Error getting personality mode: {e}")
             return 'friendly'
+
+    def get_cached_response(self, cache_key: str, max_age: float) -> Optional[tuple]:
+        """Get a persisted (response, user_name) pair if it is younger than max_age seconds"""
+        try:
+            with self.connections.cursor() as cursor:
+                cursor.execute('''
+                    SELECT response, user_name FROM response_cache
+                    WHERE cache_key = ? AND created_at >= ?
+                ''', (cache_key, time.time() - max_age))
+                result = cursor.fetchone()
+            return (result[0], result[1]) if result else None
+        except Exception as e:
+            logger.error(f"Error reading cached response: {e}")
+            return None
+
+    def store_cached_response(self, cache_key: str, response: str, user_name: str = ""):
+        """Persist a cached response"""
+        try:
+            with self.connections.cursor() as cursor:
+                cursor.execute('''
+                    INSERT OR REPLACE INTO response_cache (cache_key, response, user_name, created_at)
+                    VALUES (?, ?, ?, ?)
+                ''', (cache_key, response, user_name, time.time()))
+        except Exception as e:
+            logger.error(f"Error storing cached response: {e}")
+
+    def prune_response_cache(self, max_age: float) -> int:
+        """Delete persisted responses older than max_age seconds"""
+        try:
+            with self.connections.cursor() as cursor:
+                cursor.execute('''
+                    DELETE FROM response_cache WHERE created_at < ?
+                ''', (time.time() - max_age,))
+                return cursor.rowcount
+        except Exception as e:
+            logger.error(f"Error pruning response cache: {e}")
+            return 0
+
+    def get_compaction_candidates(self, keep_per_user: int) -> List[str]:
+        """Users with more than keep_per_user conversation turns"""
+        try:
+            with self.connections.cursor() as cursor:
+                cursor.execute('''
+                    SELECT user_id FROM conversations
+                    GROUP BY user_id HAVING COUNT(*) > ?
+                ''', (keep_per_user,))
+                return [row[0] for row in cursor.fetchall()]
+        except Exception as e:
+            logger.error(f"Error finding users to compact: {e}")
+            return []
+
+    def compact_user_conversations(self, user_id: str, keep_per_user: int, archive: bool = True) -> Dict:
+        """Trim one user's history to the newest keep_per_user turns in one short transaction.
+
+        Older turns are moved into conversation_archive as one compressed
+        blob (or dropped when archive is False).
+        """
+        stats = {'users': 0, 'rows_deleted': 0, 'rows_archived': 0, 'raw_bytes': 0, 'archived_bytes': 0}
+        try:
+            with self.connections.transaction(immediate=True) as cursor:
+                # Oldest id still inside the window; everything below it goes
+                cursor.execute('''
+                    SELECT id FROM conversations WHERE user_id = ?
+                    ORDER BY id DESC LIMIT 1 OFFSET ?
+                ''', (user_id, max(keep_per_user - 1, 0)))
+                row = cursor.fetchone()
+                if row is None:
+                    return stats
+                cutoff = row[0] if keep_per_user > 0 else row[0] + 1
+
+                cursor.execute('''
+                    SELECT id, user_message, bot_response, COALESCE(created_ts, 0)
+                    FROM conversations WHERE user_id = ? AND id < ?
+                    ORDER BY id ASC
+                ''', (user_id, cutoff))
+                old_turns = cursor.fetchall()
+                if not old_turns:
+                    return stats
+
+                raw_bytes = sum(len(turn[1] or '') + len(turn[2] or '') for turn in old_turns)
+                if archive:
+                    payload = zlib.compress(json.dumps(
+                        [{'id': t[0], 'user_message': t[1], 'bot_response': t[2], 'created_ts': t[3]}
+                         for t in old_turns],
+                        separators=(',', ':')
+                    ).encode('utf-8'), 6)
+                    cursor.execute('''
+                        INSERT INTO conversation_archive
+                            (user_id, first_conversation_id, last_conversation_id, turns,
+                             raw_bytes, payload, created_ts)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', (user_id, old_turns[0][0], old_turns[-1][0], len(old_turns),
+                          raw_bytes, payload, int(time.time())))
+                    stats['rows_archived'] = len(old_turns)
+                    stats['archived_bytes'] = len(payload)
+
+                cursor.execute('''
+                    DELETE FROM conversations WHERE user_id = ? AND id < ?
+                ''', (user_id, cutoff))
+                stats['rows_deleted'] = cursor.rowcount
+                stats['raw_bytes'] = raw_bytes
+                stats['users'] = 1
+
+        except Exception as e:
+            logger.error(f"Error compacting conversations for {user_id}: {e}")
+            stats = dict.fromkeys(stats, 0)
+        return stats
+
+    def get_archived_conversations(self, user_id: str, limit: int = 1) -> List[Dict]:
+        """Decompress the newest limit archive batches for a user (oldest turn first)"""
+        try:
+            with self.connections.cursor() as cursor:
+                cursor.execute('''
+                    SELECT payload FROM conversation_archive
+                    WHERE user_id = ? ORDER BY id DESC LIMIT ?
+                ''', (user_id, limit))
+                payloads = [row[0] for row in cursor.fetchall()]
+
+            turns = []
+            for payload in reversed(payloads):
+                turns.extend(json.loads(zlib.decompress(payload).decode('utf-8')))
+            return turns
+        except Exception as e:
+            logger.error(f"Error reading conversation archive: {e}")
+            return []
+
+    def incremental_vacuum(self, max_pages: int = 2000) -> int:
+        """Return up to max_pages free pages to the OS; returns bytes reclaimed"""
+        try:
+            with self.connections.cursor() as cursor:
+                cursor.execute("PRAGMA page_size")
+                page_size = cursor.fetchone()[0]
+                cursor.execute("PRAGMA freelist_count")
+                free_before = cursor.fetchone()[0]
+
+                # The pragma frees one page per step and returns no rows, so execute()
+                # would stop after the first page; executescript steps it to completion
+                cursor.executescript(f"PRAGMA incremental_vacuum({int(max_pages)})")
+
+                cursor.execute("PRAGMA freelist_count")
+                free_after = cursor.fetchone()[0]
+            return max(free_before - free_after, 0) * page_size
+        except Exception as e:
+            logger.error(f"Error running incremental vacuum: {e}")
+            return 0
+
+    def enable_incremental_vacuum(self) -> Dict:
+        """Switch the file to incremental auto-vacuum with a one-off full VACUUM.
+
+        This rewrites the whole database and blocks writers while it runs,
+        so it is only started by hand; afterwards the compactor returns
+        freed pages a few at a time.
+        """
+        try:
+            with self.connections.cursor() as cursor:
+                cursor.execute("PRAGMA page_size")
+                page_size = cursor.fetchone()[0]
+                cursor.execute("PRAGMA page_count")
+                bytes_before = cursor.fetchone()[0] * page_size
+                cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                cursor.execute("VACUUM")
+                cursor.execute("PRAGMA page_count")
+                bytes_after = cursor.fetchone()[0] * page_size
+            return {'bytes_before': bytes_before, 'bytes_after': bytes_after}
+        except Exception as e:
+            logger.error(f"Error vacuuming database: {e}")
+            return {}
+
+    def get_storage_stats(self) -> Dict:
+        """Database file size and free-page figures"""
+        try:
+            with self.connections.cursor() as cursor:
+                cursor.execute("PRAGMA page_size")
+                page_size = cursor.fetchone()[0]
+                cursor.execute("PRAGMA page_count")
+                page_count = cursor.fetchone()[0]
+                cursor.execute("PRAGMA freelist_count")
+                freelist_count = cursor.fetchone()[0]
+                cursor.execute("PRAGMA auto_vacuum")
+                incremental = cursor.fetchone()[0] == 2
+                cursor.execute("SELECT COUNT(*) FROM conversations")
+                conversations = cursor.fetchone()[0]
+                cursor.execute("SELECT COALESCE(SUM(turns), 0), COALESCE(SUM(LENGTH(payload)), 0) FROM conversation_archive")
+                archived_turns, archive_bytes = cursor.fetchone()
+            return {
+                'file_bytes': page_size * page_count,
+                'free_bytes': page_size * freelist_count,
+                'incremental_vacuum': incremental,
+                'conversations': conversations,
+                'archived_turns': archived_turns,
+                'archive_bytes': archive_bytes
+            }
+        except Exception as e:
+            logger.error(f"Error getting storage stats: {e}")
+            return {}
@@ -0,0 +1,120 @@
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+logger = logging.getLogger(__name__)
+
+class ConnectionManager:
+    """Long-lived per-thread SQLite connections tuned for a chat bot workload"""
+
+    # Applied once to every new connection
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",        # Readers never block the writer
+        "PRAGMA synchronous=NORMAL",      # fsync on checkpoint only (safe with WAL)
+        "PRAGMA cache_size=-16000",       # ~16 MB page cache per connection
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA mmap_size=134217728",     # 128 MB memory-mapped reads
+        "PRAGMA busy_timeout=5000",
+    )
+
+    def __init__(self, db_path: str, max_connections: int = 8, statement_cache_size: int = 256):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.statement_cache_size = statement_cache_size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: Dict[int, sqlite3.Connection] = {}
+        self.connections_opened = 0
+
+    def _open(self) -> sqlite3.Connection:
+        """Open and configure a new connection"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=5.0,
+            isolation_level=None,  # Transactions are managed explicitly
+            check_same_thread=False,  # Only used by its owner thread; closed from any
+            cached_statements=self.statement_cache_size
+        )
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    def _prune_dead_threads(self):
+        """Close connections owned by threads that no longer exist"""
+        alive = {thread.ident for thread in threading.enumerate()}
+        for ident in [ident for ident in self._connections if ident not in alive]:
+            try:
+                self._connections.pop(ident).close()
+            except Exception as e:
+                logger.error(f"Error closing stale connection: {e}")
+
+    def get_connection(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            return conn
+
+        with self._lock:
+            if len(self._connections) >= self.max_connections:
+                self._prune_dead_threads()
+            if len(self._connections) >= self.max_connections:
+                logger.warning(f"Connection pool above limit ({len(self._connections)} open)")
+
+            # Thread idents can be reused once a thread exits
+            stale = self._connections.pop(threading.get_ident(), None)
+            if stale is not None:
+                stale.close()
+
+            conn = self._open()
+            self._connections[threading.get_ident()] = conn
+            self.connections_opened += 1
+
+        self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def cursor(self) -> Iterator[sqlite3.Cursor]:
+        """Cursor for reads and single autocommitted statements"""
+        cursor = self.get_connection().cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    @contextmanager
+    def transaction(self, immediate: bool = False) -> Iterator[sqlite3.Cursor]:
+        """Cursor inside a transaction that commits on success and rolls back on error"""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+        try:
+            yield cursor
+            cursor.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:
+                cursor.execute("ROLLBACK")
+            raise
+        finally:
+            cursor.close()
+
+    def close_all(self):
+        """Close every pooled connection (call on shutdown)"""
+        with self._lock:
+            for conn in self._connections.values():
+                try:
+                    conn.close()
+                except Exception as e:
+                    logger.error(f"Error closing connection: {e}")
+            self._connections.clear()
+        self._local = threading.local()
+
+    def get_stats(self) -> Dict:
+        """Get pool statistics"""
+        return {
+            'open_connections': len(self._connections),
+            'connections_opened': self.connections_opened,
+            'max_connections': self.max_connections,
+            'statement_cache_size': self.statement_cache_size
+        }
@@ -0,0 +1,178 @@
+import threading
+import time
+import logging
+from typing import Dict, List, Optional, Tuple
+from db_connection import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+# (user_id, transaction_type, amount, balance_after, created_ts)
+LedgerEntry = Tuple[str, str, int, int, int]
+
+class LedgerWriter:
+    """Write-behind queue for `transactions` rows, committed in group batches.
+
+    Balance changes still commit immediately; only their ledger rows are
+    queued. A background thread commits the queue in one executemany
+    transaction once max_batch entries are waiting or the oldest has waited
+    max_delay seconds, so a burst of game payouts costs one commit instead
+    of one per payout. With durable=True each append blocks until its
+    batch is committed with synchronous=FULL; concurrent callers still
+    share one commit.
+    """
+
+    def __init__(self, connections: ConnectionManager, max_batch: int = 500, max_delay: float = 0.05,
+                 durable: bool = False):
+        self.connections = connections
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.durable = durable
+
+        self._cond = threading.Condition()
+        self._queue: List[LedgerEntry] = []
+        self._first_queued = 0.0
+        self._enqueued = 0   # Sequence number of the last appended entry
+        self._committed = 0  # Sequence number of the last committed entry
+        self._flush_requested = False
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.entries_written = 0
+        self.batches = 0
+        self.failures = 0
+        self.max_batch_seen = 0
+        self.total_commit_ms = 0.0
+        self.max_commit_ms = 0.0
+        self.last_commit_ms = 0.0
+
+    def start(self):
+        """Start the background commit thread"""
+        with self._cond:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="ledger-writer", daemon=True)
+            self._thread.start()
+
+    def append(self, user_id: str, transaction_type: str, amount: int, balance_after: int,
+               created_ts: Optional[int] = None):
+        """Queue one ledger entry; waits for its commit only in durable mode"""
+        entry = (user_id, transaction_type, amount, balance_after,
+                 int(time.time()) if created_ts is None else created_ts)
+        with self._cond:
+            if not self._queue:
+                self._first_queued = time.monotonic()
+            self._queue.append(entry)
+            self._enqueued += 1
+            sequence = self._enqueued
+            if len(self._queue) >= self.max_batch or self.durable:
+                self._cond.notify_all()
+        if self.durable:
+            self._wait_for(sequence, timeout=10.0)
+
+    def flush(self, timeout: Optional[float] = 10.0) -> bool:
+        """Block until everything appended so far is committed; False on timeout"""
+        with self._cond:
+            sequence = self._enqueued
+            if self._committed >= sequence:
+                return True
+            self._flush_requested = True
+            self._cond.notify_all()
+        if self._thread is None or not self._thread.is_alive():
+            # No writer thread (e.g. during shutdown); commit on the caller's thread
+            self._drain()
+            return self._committed >= sequence
+        return self._wait_for(sequence, timeout)
+
+    def _wait_for(self, sequence: int, timeout: Optional[float] = None) -> bool:
+        with self._cond:
+            return self._cond.wait_for(lambda: self._committed >= sequence or self._stopping, timeout)
+
+    def stop(self):
+        """Commit everything queued and stop the thread"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self._drain()
+
+    def _drain(self):
+        failures = self.failures
+        while self._queue and self.failures == failures:
+            self._commit_pending()
+
+    def _run(self):
+        if self.durable:
+            self.connections.get_connection().execute("PRAGMA synchronous=FULL")
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    if self._queue:
+                        waited = time.monotonic() - self._first_queued
+                        if (len(self._queue) >= self.max_batch or waited >= self.max_delay
+                                or self.durable or self._flush_requested):
+                            break
+                        self._cond.wait(self.max_delay - waited)
+                    else:
+                        self._cond.wait()
+                if self._stopping and not self._queue:
+                    return
+            self._commit_pending()
+            if self._stopping:
+                return
+
+    def _commit_pending(self):
+        with self._cond:
+            batch, self._queue = self._queue[:self.max_batch], self._queue[self.max_batch:]
+            last_sequence = self._enqueued - len(self._queue)
+            if not self._queue:
+                self._flush_requested = False
+        if not batch:
+            return
+
+        started = time.perf_counter()
+        try:
+            with self.connections.transaction(immediate=True) as cursor:
+                cursor.executemany('''
+                    INSERT INTO transactions (user_id, transaction_type, amount, balance_after, created_ts)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', batch)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"Error writing {len(batch)} ledger entries: {e}")
+            # Requeue ahead of anything appended meanwhile; retried on the next batch
+            with self._cond:
+                self._queue[:0] = batch
+                self._first_queued = time.monotonic()
+            if not self._stopping:
+                time.sleep(self.max_delay)
+            return
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._cond:
+            self._committed = max(self._committed, last_sequence)
+            self.entries_written += len(batch)
+            self.batches += 1
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.total_commit_ms += elapsed_ms
+            self.max_commit_ms = max(self.max_commit_ms, elapsed_ms)
+            self.last_commit_ms = elapsed_ms
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict:
+        """Get ledger writer statistics"""
+        with self._cond:
+            return {
+                'queued': len(self._queue),
+                'entries_written': self.entries_written,
+                'batches': self.batches,
+                'avg_batch': self.entries_written / self.batches if self.batches else 0.0,
+                'max_batch': self.max_batch_seen,
+                'avg_commit_ms': self.total_commit_ms / self.batches if self.batches else 0.0,
+                'max_commit_ms': self.max_commit_ms,
+                'last_commit_ms': self.last_commit_ms,
+                'failures': self.failures,
+                'durable': self.durable
+            }
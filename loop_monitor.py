@@ -0,0 +1,83 @@
+import asyncio
+import time
+import logging
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class EventLoopMonitor:
+    """Measures event loop stalls by timing how late a periodic wake-up fires"""
+
+    # Upper bounds (ms) of the histogram buckets; the last bucket is open-ended
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+    def __init__(self, interval: float = 0.25, warn_threshold_ms: float = 250):
+        self.interval = interval
+        self.warn_threshold_ms = warn_threshold_ms
+        self.counts: List[int] = [0] * (len(self.BUCKETS_MS) + 1)
+        self.samples = 0
+        self.max_lag_ms = 0.0
+        self.total_lag_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start sampling on the running loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stop sampling"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            self.record((time.perf_counter() - expected) * 1000)
+
+    def record(self, lag_ms: float):
+        """Add one lag sample to the histogram"""
+        lag_ms = max(0.0, lag_ms)
+        for index, bound in enumerate(self.BUCKETS_MS):
+            if lag_ms <= bound:
+                break
+        else:
+            index = len(self.BUCKETS_MS)
+
+        self.counts[index] += 1
+        self.samples += 1
+        self.total_lag_ms += lag_ms
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+
+        if lag_ms >= self.warn_threshold_ms:
+            logger.warning(f"Event loop blocked for {lag_ms:.0f}ms")
+
+    def percentile(self, pct: float) -> float:
+        """Approximate lag percentile (bucket upper bound) in ms"""
+        if not self.samples:
+            return 0.0
+        target = self.samples * pct / 100
+        running = 0
+        for index, count in enumerate(self.counts):
+            running += count
+            if running >= target:
+                return float(self.BUCKETS_MS[index]) if index < len(self.BUCKETS_MS) else self.max_lag_ms
+        return self.max_lag_ms
+
+    def get_histogram(self) -> Dict[str, int]:
+        """Get bucket label -> sample count"""
+        labels = [f"<={bound}ms" for bound in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        return dict(zip(labels, self.counts))
+
+    def get_stats(self) -> Dict:
+        """Get summary statistics"""
+        return {
+            'samples': self.samples,
+            'avg_ms': self.total_lag_ms / self.samples if self.samples else 0.0,
+            'p50_ms': self.percentile(50),
+            'p99_ms': self.percentile(99),
+            'max_ms': self.max_lag_ms,
+            'histogram': self.get_histogram()
+        }
@@ -0,0 +1,146 @@
+import hashlib
+import re
+from collections import OrderedDict
+from functools import cached_property
+from typing import List, NamedTuple, Union
+from urllib.parse import urlsplit
+
+class CharCounts(NamedTuple):
+    upper: int
+    lower: int
+    digit: int
+    space: int
+    special: int  # Neither alphanumeric nor whitespace
+
+class MessageContext:
+    """Features derived from one message's text, each computed once on first use.
+
+    The bot's security checks, name detection and cog listeners all look at
+    the same message; MessageContext.of() hands every one of them the same
+    instance, so lowercasing, tokenizing, URL/mention extraction and hashing
+    happen at most once per message.
+    """
+
+    _WORDS = re.compile(r"\w+")
+    # Up to whitespace or the <> Discord uses to suppress embeds; hosts may be non-ASCII
+    _URLS = re.compile(r"https?://[^\s<>]+", re.IGNORECASE)
+    _MENTIONS = re.compile(r"<@!?(\d+)>")
+    # Sentence punctuation that ends up glued to a link, as in "see https://x.com, then"
+    _TRAILING = ".,;:!?'\""
+    _CLOSERS = {')': '(', ']': '[', '}': '{'}
+
+    # Recently built contexts, keyed by content; also collapses identical spam
+    _cache: "OrderedDict[str, MessageContext]" = OrderedDict()
+    cache_size = 512
+
+    def __init__(self, content: str):
+        self.content = content or ""
+
+    @classmethod
+    def of(cls, message: Union[str, object]) -> "MessageContext":
+        """Shared context for a discord.Message or raw message text"""
+        content = message if isinstance(message, str) else (getattr(message, 'content', None) or "")
+        context = cls._cache.get(content)
+        if context is None:
+            context = cls(content)
+            cls._cache[content] = context
+            if len(cls._cache) > cls.cache_size:
+                cls._cache.popitem(last=False)
+        else:
+            cls._cache.move_to_end(content)
+        return context
+
+    @cached_property
+    def lower(self) -> str:
+        return self.content.lower()
+
+    @cached_property
+    def stripped_lower(self) -> str:
+        return self.lower.strip()
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        """Lowercased word tokens"""
+        return self._WORDS.findall(self.lower)
+
+    @cached_property
+    def words(self) -> List[str]:
+        """Whitespace-separated words, original case"""
+        return self.content.split()
+
+    @cached_property
+    def unique_word_ratio(self) -> float:
+        return len(set(self.words)) / len(self.words) if self.words else 1.0
+
+    @classmethod
+    def _trim_url(cls, url: str) -> str:
+        """Drop trailing punctuation; a closing bracket stays only if it closes one in the URL"""
+        while url:
+            last = url[-1]
+            if last in cls._TRAILING:
+                url = url[:-1]
+            elif last in cls._CLOSERS and url.count(cls._CLOSERS[last]) < url.count(last):
+                url = url[:-1]
+            else:
+                break
+        return url
+
+    @cached_property
+    def urls(self) -> List[str]:
+        if '://' not in self.content:
+            return []
+        return [self._trim_url(url) for url in self._URLS.findall(self.content)]
+
+    @cached_property
+    def domains(self) -> List[str]:
+        """Lowercased host of each URL"""
+        hosts = []
+        for url in self.urls:
+            try:
+                host = urlsplit(url).hostname  # Drops credentials and port, lowercases
+            except ValueError:
+                continue
+            if host:
+                hosts.append(host)
+        return hosts
+
+    @cached_property
+    def mention_ids(self) -> List[int]:
+        return [int(user_id) for user_id in self._MENTIONS.findall(self.content)] if '<@' in self.content else []
+
+    @cached_property
+    def content_hash(self) -> str:
+        return hashlib.md5(self.content.encode()).hexdigest()
+
+    @cached_property
+    def char_counts(self) -> CharCounts:
+        """Character classes, counted in a single pass"""
+        upper = lower = digit = space = special = 0
+        for char in self.content:
+            if char.isalpha():
+                if char.isupper():
+                    upper += 1
+                else:
+                    lower += 1
+            elif char.isdigit():
+                digit += 1
+            elif char.isspace():
+                space += 1
+            elif not char.isalnum():
+                special += 1
+        return CharCounts(upper, lower, digit, space, special)
+
+    @cached_property
+    def caps_ratio(self) -> float:
+        counts = self.char_counts
+        letters = counts.upper + counts.lower
+        return counts.upper / letters if letters else 0.0
+
+    @cached_property
+    def is_all_caps(self) -> bool:
+        return self.content.isupper()
+
+    def contains_any(self, terms) -> bool:
+        """Whether any of the (lowercase) terms occurs in the lowercased text"""
+        lower = self.lower
+        return any(term in lower for term in terms)
@@ -0,0 +1,104 @@
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from message_context import MessageContext
+
+logger = logging.getLogger(__name__)
+
+# A stage gets the message and its shared context; returning True stops the pipeline
+StageHandler = Callable[[object, MessageContext], Awaitable[Optional[bool]]]
+
+class Stage:
+    __slots__ = ('name', 'phase', 'handler', 'skip_bots', 'guild_only', 'calls', 'stops', 'errors',
+                 'total_ms', 'max_ms')
+
+    def __init__(self, name: str, phase: str, handler: StageHandler, skip_bots: bool, guild_only: bool):
+        self.name = name
+        self.phase = phase
+        self.handler = handler
+        self.skip_bots = skip_bots
+        self.guild_only = guild_only
+        self.calls = 0
+        self.stops = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+class MessagePipeline:
+    """Runs every incoming message through one ordered list of stages.
+
+    Replaces independent on_message listeners: the bot and cogs register
+    stages into fixed phases, each message is processed exactly once, a
+    stage can stop later ones from running (e.g. a consumed game move never
+    reaches natural chat), and each stage's cost is measured.
+    """
+
+    PHASES = ('security', 'moderation', 'games', 'commands', 'xp', 'auto_response', 'chat')
+
+    def __init__(self):
+        self._stages: Dict[str, Stage] = {}
+        self._ordered: List[Stage] = []
+        self.messages = 0
+
+    def register(self, name: str, phase: str, handler: StageHandler,
+                 skip_bots: bool = True, guild_only: bool = False):
+        """Add (or replace) a stage; stages in the same phase run in registration order"""
+        if phase not in self.PHASES:
+            raise ValueError(f"Unknown pipeline phase: {phase}")
+        self._stages.pop(name, None)
+        self._stages[name] = Stage(name, phase, handler, skip_bots, guild_only)
+        self._reorder()
+
+    def unregister(self, name: str):
+        """Remove a stage, e.g. when its cog unloads"""
+        if self._stages.pop(name, None):
+            self._reorder()
+
+    def _reorder(self):
+        rank = {phase: index for index, phase in enumerate(self.PHASES)}
+        self._ordered = sorted(self._stages.values(), key=lambda stage: rank[stage.phase])
+
+    async def process(self, message):
+        """Run the message through each applicable stage until one stops it"""
+        self.messages += 1
+        context = MessageContext.of(message)
+        is_bot = message.author.bot
+        in_guild = message.guild is not None
+
+        for stage in self._ordered:
+            if (stage.skip_bots and is_bot) or (stage.guild_only and not in_guild):
+                continue
+
+            started = time.perf_counter()
+            try:
+                stop = await stage.handler(message, context)
+            except Exception as e:
+                stage.errors += 1
+                stop = False
+                logger.error(f"Pipeline stage '{stage.name}' failed: {e}")
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            stage.calls += 1
+            stage.total_ms += elapsed_ms
+            stage.max_ms = max(stage.max_ms, elapsed_ms)
+            if stop:
+                stage.stops += 1
+                return
+
+    def get_stats(self) -> Dict:
+        """Per-stage call counts and timings, in pipeline order"""
+        return {
+            'messages': self.messages,
+            'stages': [
+                {
+                    'name': stage.name,
+                    'phase': stage.phase,
+                    'calls': stage.calls,
+                    'stops': stage.stops,
+                    'errors': stage.errors,
+                    'avg_ms': stage.total_ms / stage.calls if stage.calls else 0.0,
+                    'max_ms': stage.max_ms
+                }
+                for stage in self._ordered
+            ]
+        }
@@ -0,0 +1,236 @@
+import logging
+import time
+from typing import Callable, List, Tuple
+from db_connection import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+# Rows updated per transaction when backfilling, so the writer lock is only held briefly
+BACKFILL_BATCH_SIZE = 5000
+
+def _column_exists(cursor, table: str, column: str) -> bool:
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+def _baseline_schema(connections: ConnectionManager):
+    """Tables that existed before versioned migrations"""
+    with connections.transaction() as cursor:
+        # Users table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                user_id TEXT PRIMARY KEY,
+                coins INTEGER DEFAULT 1000,
+                personality_mode TEXT DEFAULT 'friendly',
+                total_commands INTEGER DEFAULT 0,
+                last_daily TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+
+        # Conversations table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS conversations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT,
+                user_message TEXT,
+                bot_response TEXT,
+                timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+        ''')
+
+        # Usage tracking table
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS usage (
+                user_id TEXT,
+                date TEXT,
+                hourly_calls INTEGER DEFAULT 0,
+                images_today INTEGER DEFAULT 0,
+                PRIMARY KEY (user_id, date)
+            )
+        ''')
+
+        # Economy transactions table for better tracking
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS transactions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT,
+                transaction_type TEXT,
+                amount INTEGER,
+                balance_after INTEGER,
+                timestamp TEXT DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users (user_id)
+            )
+        ''')
+
+        # Persistent tier of the LLM response cache
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS response_cache (
+                cache_key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                user_name TEXT,
+                created_at REAL NOT NULL
+            )
+        ''')
+
+def _history_indexes(connections: ConnectionManager):
+    """Serve 'latest N rows for a user' straight from an index"""
+    with connections.transaction() as cursor:
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_conversations_user_recent
+            ON conversations (user_id, id DESC)
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_transactions_user_recent
+            ON transactions (user_id, id DESC)
+        ''')
+
+        # Older databases carry single-column indexes the composite ones make redundant
+        for index in ('idx_conversations_user_id', 'idx_conversations_timestamp',
+                      'idx_transactions_user_id', 'idx_transactions_timestamp'):
+            cursor.execute(f"DROP INDEX IF EXISTS {index}")
+
+def _epoch_timestamps(connections: ConnectionManager):
+    """Add integer epoch columns and backfill them from the text timestamps"""
+    for table in ('conversations', 'transactions'):
+        with connections.transaction() as cursor:
+            if not _column_exists(cursor, table, 'created_ts'):
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN created_ts INTEGER")
+
+        # Backfill in short batches so the bot can keep writing while this runs. Each
+        # batch is the next id range, so no batch rescans rows an earlier one filled
+        backfilled = 0
+        last_id = 0
+        while True:
+            with connections.transaction() as cursor:
+                cursor.execute(f'''
+                    SELECT MAX(id), COUNT(*) FROM (
+                        SELECT id FROM {table} WHERE id > ? ORDER BY id LIMIT ?
+                    )
+                ''', (last_id, BACKFILL_BATCH_SIZE))
+                upper_id, batch = cursor.fetchone()
+                if not batch:
+                    break
+                cursor.execute(f'''
+                    UPDATE {table}
+                    SET created_ts = COALESCE(CAST(strftime('%s', timestamp) AS INTEGER), 0)
+                    WHERE id > ? AND id <= ? AND created_ts IS NULL
+                ''', (last_id, upper_id))
+                backfilled += cursor.rowcount
+            last_id = upper_id
+            if batch < BACKFILL_BATCH_SIZE:
+                break
+
+        if backfilled:
+            logger.info(f"Backfilled created_ts for {backfilled} {table} rows")
+
+def _conversation_archive(connections: ConnectionManager):
+    """Archive table for compacted history"""
+    with connections.transaction() as cursor:
+        # One row per compaction batch; payload is zlib-compressed JSON of the turns
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS conversation_archive (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                first_conversation_id INTEGER NOT NULL,
+                last_conversation_id INTEGER NOT NULL,
+                turns INTEGER NOT NULL,
+                raw_bytes INTEGER NOT NULL,
+                payload BLOB NOT NULL,
+                created_ts INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_conversation_archive_user
+            ON conversation_archive (user_id, id DESC)
+        ''')
+    # Switching auto_vacuum to INCREMENTAL needs a full VACUUM, which rewrites the
+    # whole file; that is left to the owner's !vacuum rather than run at startup
+
+def _economy_state(connections: ConnectionManager):
+    """Work tracking columns and the per-command cooldown table used by the economy cogs"""
+    with connections.transaction() as cursor:
+        for column, definition in (('work_streak', 'INTEGER DEFAULT 0'), ('last_work', 'TEXT'),
+                                   ('total_work_sessions', 'INTEGER DEFAULT 0')):
+            if not _column_exists(cursor, 'users', column):
+                cursor.execute(f"ALTER TABLE users ADD COLUMN {column} {definition}")
+
+        # Same shape as the table older builds created ad hoc, so existing rows are kept
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS command_cooldowns (
+                user_id TEXT,
+                command_name TEXT,
+                last_used TEXT NOT NULL,
+                cooldown_seconds INTEGER NOT NULL,
+                uses_today INTEGER DEFAULT 0,
+                PRIMARY KEY (user_id, command_name),
+                FOREIGN KEY (user_id) REFERENCES users(user_id)
+            )
+        ''')
+
+def _user_attributes(connections: ConnectionManager):
+    """Typed columns for hot per-user counters and the side table for sparse attributes"""
+    with connections.transaction() as cursor:
+        for column in ('xp', 'trivia_wins'):
+            if not _column_exists(cursor, 'users', column):
+                cursor.execute(f"ALTER TABLE users ADD COLUMN {column} INTEGER DEFAULT 0")
+
+        # Same shape as the table older builds created ad hoc, so existing rows are kept
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS user_data (
+                user_id TEXT,
+                key TEXT,
+                data TEXT,
+                PRIMARY KEY (user_id, key)
+            )
+        ''')
+
+# Ordered list of (version, description, migration); append only, never renumber
+MIGRATIONS: List[Tuple[int, str, Callable[[ConnectionManager], None]]] = [
+    (1, "baseline schema", _baseline_schema),
+    (2, "composite (user_id, id DESC) history indexes", _history_indexes),
+    (3, "integer epoch timestamps", _epoch_timestamps),
+    (4, "conversation archive", _conversation_archive),
+    (5, "work tracking columns and command cooldowns", _economy_state),
+    (6, "typed xp/trivia columns and sparse user attributes", _user_attributes),
+]
+
+def get_schema_version(connections: ConnectionManager) -> int:
+    """Highest applied migration version (0 for a fresh database)"""
+    with connections.cursor() as cursor:
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                description TEXT NOT NULL,
+                applied_at INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+        return cursor.fetchone()[0]
+
+def run_migrations(connections: ConnectionManager) -> int:
+    """Apply pending migrations in order and return the resulting schema version.
+
+    Each migration is idempotent, so one interrupted part-way (e.g. during
+    a backfill) is simply re-run on the next start.
+    """
+    current = get_schema_version(connections)
+
+    for version, description, migration in MIGRATIONS:
+        if version <= current:
+            continue
+
+        started = time.perf_counter()
+        logger.info(f"Applying migration {version}: {description}")
+        migration(connections)
+
+        with connections.cursor() as cursor:
+            cursor.execute('''
+                INSERT OR REPLACE INTO schema_version (version, description, applied_at)
+                VALUES (?, ?, ?)
+            ''', (version, description, int(time.time())))
+
+        current = version
+        logger.info(f"Migration {version} applied in {time.perf_counter() - started:.2f}s")
+
+    return current
@@ -0,0 +1,97 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class UserNameResolver:
+    """Batched, cached user id -> display name lookups for leaderboards and rankings.
+
+    Names come from the guild's member cache or the client's user cache
+    when possible; only ids missing from both are fetched from the API,
+    concurrently and capped at max_concurrent requests, instead of one
+    awaited fetch_user per row. Results (including failures, shown as
+    "User <id>") are kept for ttl seconds in an LRU of max_entries.
+    """
+
+    def __init__(self, bot, ttl: float = 3600, max_entries: int = 5000, max_concurrent: int = 5):
+        self.bot = bot
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._cache: "OrderedDict[Tuple[Optional[int], str], Tuple[str, float]]" = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self.fetch_failures = 0
+
+    def _cached(self, key: Tuple[Optional[int], str], now: float) -> Optional[str]:
+        entry = self._cache.get(key)
+        if entry is None or entry[1] < now:
+            return None
+        self._cache.move_to_end(key)
+        return entry[0]
+
+    def _store(self, key: Tuple[Optional[int], str], name: str, now: float):
+        self._cache[key] = (name, now + self.ttl)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    async def _fetch(self, user_id: str) -> Optional[str]:
+        async with self._semaphore:
+            self.fetches += 1
+            try:
+                user = await self.bot.fetch_user(int(user_id))
+                return user.display_name
+            except Exception as e:
+                self.fetch_failures += 1
+                logger.debug(f"Could not fetch user {user_id}: {e}")
+                return None
+
+    async def resolve(self, user_ids: Iterable, guild=None) -> Dict[str, str]:
+        """Display names for a batch of user ids, keyed by str(user_id)"""
+        now = time.monotonic()
+        scope = guild.id if guild is not None else None
+        names: Dict[str, str] = {}
+        missing = []
+
+        for user_id in dict.fromkeys(str(user_id) for user_id in user_ids):
+            cached = self._cached((scope, user_id), now)
+            if cached is not None:
+                self.hits += 1
+                names[user_id] = cached
+                continue
+            self.misses += 1
+            member = guild.get_member(int(user_id)) if guild is not None else None
+            user = member or self.bot.get_user(int(user_id))
+            if user is not None:
+                names[user_id] = user.display_name
+                self._store((scope, user_id), names[user_id], now)
+            else:
+                missing.append(user_id)
+
+        if missing:
+            fetched = await asyncio.gather(*(self._fetch(user_id) for user_id in missing))
+            for user_id, name in zip(missing, fetched):
+                names[user_id] = name or f"User {user_id}"
+                self._store((scope, user_id), names[user_id], now)
+
+        return names
+
+    async def name(self, user_id, guild=None) -> str:
+        """Display name for a single user id"""
+        return (await self.resolve([user_id], guild))[str(user_id)]
+
+    def get_stats(self) -> Dict:
+        """Get name resolver statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'cached': len(self._cache),
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'fetches': self.fetches,
+            'fetch_failures': self.fetch_failures
+        }
@@ -1,7 +1,8 @@
 import logging
 import json
 import os
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional
+from context_builder import ContextBuilder
 
 logger = logging.getLogger(__name__)
 
@@ -81,7 +82,9 @@ PERSONALITY_PROMPTS = {
 class PersonalityManager:
     """Human-like, flexible Discord chatbot with personality modes and custom prompts."""
     
-    def __init__(self):
+    def __init__(self, response_cache=None, context_builder: Optional[ContextBuilder] = None):
+        self.response_cache = response_cache  # Optional ResponseCache for repeated prompts
+        self.context_builder = context_builder or ContextBuilder()
         self.custom_prompts = {}  # Store custom prompts per user/guild
         self.default_custom_prompt = None  # Global custom prompt
         self.personality_file = "personality_data.json"
@@ -161,49 +164,82 @@ class PersonalityManager:
             return prompt.split('.')[0] + '.'
         return "Custom personality mode"
     
-    def generate_response(self, message: str, user_name: str, personality_mode: str, conversation_history: List[Dict], api_client=None, user_id: str = None, guild_id: str = None) -> Optional[str]:
+    def get_personality_prompt(self, personality_mode: str, user_id: str = None, guild_id: str = None) -> str:
+        """Resolve the system prompt: custom prompt first, then the predefined mode"""
+        custom_prompt = self.get_custom_prompt(user_id, guild_id)
+        if custom_prompt:
+            return custom_prompt
+        return PERSONALITY_PROMPTS.get(personality_mode.lower(), PERSONALITY_PROMPTS['friendly'])
+    
+    def build_context_messages(self, message: str, user_name: str, personality_prompt: str, conversation_history: List[Dict], user_id: str = None) -> List[Dict]:
+        """Build the chat messages sent to the model, packed into the context token budget"""
+        return self.context_builder.build(
+            personality_prompt,
+            conversation_history,
+            message,
+            user_name,
+            summary_key=self._summary_key(user_id, personality_prompt)
+        )
+    
+    @staticmethod
+    def _summary_key(user_id: Optional[str], personality_prompt: str) -> Optional[str]:
+        return f"{user_id}:{personality_prompt[:32]}" if user_id else None
+    
+    async def _lookup_cached(self, message: str, user_name: str, personality_prompt: str, conversation_history: List[Dict], user_id: str = None) -> tuple:
+        """Return (cache_key, cached_response); the key is None when the message isn't cacheable"""
+        if not self.response_cache or not self.response_cache.is_cacheable(message):
+            return None, None
+        # A reply built on this user's history and summary is theirs alone; only first messages are shared
+        scope = self._summary_key(user_id, personality_prompt) if conversation_history else None
+        cache_key = self.response_cache.make_key(message, personality_prompt, conversation_history, scope)
+        return cache_key, await self.response_cache.lookup(cache_key, user_name)
+    
+    async def generate_response(self, message: str, user_name: str, personality_mode: str, conversation_history: List[Dict], api_client=None, user_id: str = None, guild_id: str = None) -> Optional[str]:
         try:
-            # Check for custom prompt first
-            custom_prompt = self.get_custom_prompt(user_id, guild_id)
+            personality_prompt = self.get_personality_prompt(personality_mode, user_id, guild_id)
             
-            if custom_prompt:
-                # Use custom prompt as primary personality
-                personality_prompt = custom_prompt
-            else:
-                # Use predefined personality modes
-                personality_prompt = PERSONALITY_PROMPTS.get(personality_mode.lower(), PERSONALITY_PROMPTS['friendly'])
+            cache_key, cached = await self._lookup_cached(message, user_name, personality_prompt, conversation_history, user_id)
+            if cached:
+                return cached
             
-            context_messages = []
-            
-            # Add personality system prompt
-            context_messages.append({
-                "role": "system",
-                "content": personality_prompt
-            })
-            
-            # Add recent conversation history (last 5 exchanges)
-            for conv in conversation_history[-5:]:
-                context_messages.append({
-                    "role": "user",
-                    "content": conv['user_message']
-                })
-                context_messages.append({
-                    "role": "assistant",
-                    "content": conv['bot_response']
-                })
-            
-            # Add current message
-            context_messages.append({
-                "role": "user",
-                "content": f"{user_name} says: {message}"
-            })
+            context_messages = self.build_context_messages(message, user_name, personality_prompt, conversation_history, user_id)
             
             if api_client:
-                response = api_client.chat_with_groq(context_messages)
+                response = await api_client.chat_with_groq(context_messages)
                 if response:
+                    if cache_key:
+                        await self.response_cache.store(cache_key, response, user_name)
                     return response
                     
             return "Sorry, I'm having trouble connecting right now!"
         except Exception as e:
             logger.error(f"Error generating response with Groq: {e}")
             return "Sorry, something went wrong!"
+    
+    async def stream_response(self, message: str, user_name: str, personality_mode: str, conversation_history: List[Dict], api_client=None, user_id: str = None, guild_id: str = None) -> AsyncIterator[str]:
+        """Like generate_response, but yields the reply in pieces as it is generated"""
+        produced = []
+        try:
+            personality_prompt = self.get_personality_prompt(personality_mode, user_id, guild_id)
+            
+            cache_key, cached = await self._lookup_cached(message, user_name, personality_prompt, conversation_history, user_id)
+            if cached:
+                yield cached
+                return
+            
+            context_messages = self.build_context_messages(message, user_name, personality_prompt, conversation_history, user_id)
+            
+            if api_client:
+                async for delta in api_client.stream_chat_with_groq(context_messages):
+                    produced.append(delta)
+                    yield delta
+        except Exception as e:
+            logger.error(f"Error streaming response with Groq: {e}")
+            if not produced:
+                yield "Sorry, something went wrong!"
+            return
+        
+        if not produced:
+            yield "Sorry, I'm having trouble connecting right now!"
+        elif cache_key:
+            await self.response_cache.store(cache_key, "".join(produced).strip(), user_name)
@@ -0,0 +1,295 @@
+import threading
+import logging
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from db_connection import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+class RankIndex:
+    """Order-statistic set of user scores, highest first.
+
+    Entries are (-score, user_id) keys kept in sorted buckets of a few
+    hundred, with a Fenwick tree over the bucket sizes. Updating a score,
+    asking for a user's rank and seeking to the Nth place each cost a
+    bisect over the bucket maxima, a Fenwick walk and a short list shift,
+    so they stay effectively O(log n) however many users there are.
+    Equal scores share a rank (1 + how many users score strictly higher).
+    """
+
+    BUCKET_SIZE = 256
+
+    def __init__(self, scores: Iterable[Tuple[str, int]] = ()):
+        self._scores: Dict[str, int] = {}
+        self._buckets: List[List[Tuple[int, str]]] = []
+        self._maxes: List[Tuple[int, str]] = []
+        self._tree: List[int] = [0]
+        self.load(scores)
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._scores
+
+    def load(self, scores: Iterable[Tuple[str, int]]):
+        """Replace the contents with (user_id, score) pairs"""
+        self._scores = {user_id: score or 0 for user_id, score in scores}
+        keys = sorted((-score, user_id) for user_id, score in self._scores.items())
+        self._buckets = [keys[i:i + self.BUCKET_SIZE] for i in range(0, len(keys), self.BUCKET_SIZE)]
+        self._rebuild()
+
+    def _rebuild(self):
+        self._maxes = [bucket[-1] for bucket in self._buckets]
+        # Fenwick tree over bucket sizes, built in O(buckets)
+        tree = [0] + [len(bucket) for bucket in self._buckets]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def _tree_add(self, bucket: int, delta: int):
+        i = bucket + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket: int) -> int:
+        """Entries in the buckets before this one"""
+        total, i = 0, bucket
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position: int) -> Tuple[int, int]:
+        """(bucket, offset) of the entry at a 0-based position"""
+        bucket, step = 0, 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = bucket + step
+            if nxt < len(self._tree) and self._tree[nxt] <= position:
+                bucket = nxt
+                position -= self._tree[nxt]
+            step >>= 1
+        return bucket, position
+
+    def _insert(self, key: Tuple[int, str]):
+        if not self._buckets:
+            self._buckets.append([key])
+            self._rebuild()
+            return
+        b = min(bisect_left(self._maxes, key), len(self._buckets) - 1)
+        bucket = self._buckets[b]
+        insort(bucket, key)
+        self._maxes[b] = bucket[-1]
+        if len(bucket) > 2 * self.BUCKET_SIZE:
+            half = len(bucket) // 2
+            self._buckets[b:b + 1] = [bucket[:half], bucket[half:]]
+            self._rebuild()
+        else:
+            self._tree_add(b, 1)
+
+    def _remove(self, key: Tuple[int, str]):
+        b = bisect_left(self._maxes, key)
+        bucket = self._buckets[b]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[b] = bucket[-1]
+            self._tree_add(b, -1)
+        else:
+            del self._buckets[b]
+            self._rebuild()
+
+    def set(self, user_id: str, score: int):
+        """Insert or move a user"""
+        score = score or 0
+        old = self._scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            self._remove((-old, user_id))
+        self._scores[user_id] = score
+        self._insert((-score, user_id))
+
+    def discard(self, user_id: str):
+        """Drop a user if present"""
+        old = self._scores.pop(user_id, None)
+        if old is not None:
+            self._remove((-old, user_id))
+
+    def score(self, user_id: str) -> Optional[int]:
+        """A user's score, or None if not ranked"""
+        return self._scores.get(user_id)
+
+    def count_above(self, score: int) -> int:
+        """How many users score strictly higher"""
+        key = (-score, '')
+        b = bisect_left(self._maxes, key)
+        if b == len(self._buckets):
+            return len(self._scores)
+        return self._prefix(b) + bisect_left(self._buckets[b], key)
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """1-based rank of a user, or None if not ranked"""
+        score = self._scores.get(user_id)
+        return None if score is None else self.count_above(score) + 1
+
+    def top(self, limit: int = 10, offset: int = 0) -> List[Tuple[str, int]]:
+        """(user_id, score) for places offset+1 .. offset+limit"""
+        if limit <= 0 or offset >= len(self._scores):
+            return []
+        b, i = self._locate(max(offset, 0))
+        result = []
+        while b < len(self._buckets) and len(result) < limit:
+            for neg_score, user_id in self._buckets[b][i:i + limit - len(result)]:
+                result.append((user_id, -neg_score))
+            b, i = b + 1, 0
+        return result
+
+class Leaderboards:
+    """Rank indexes over user columns, globally and per guild.
+
+    Each category is loaded from the users table on first use and then
+    kept current by the economy operations, which report every balance or
+    counter they change, so the leaderboard never scans or sorts the table
+    again. Guild leaderboards rank the guild's members only; the member
+    list is synced by the caller (usually when the member count changes)
+    and score updates reach every tracked guild the user belongs to.
+    """
+
+    # Category name -> users column
+    CATEGORIES = {
+        'coins': 'coins',
+        'work': 'total_work_sessions',
+        'streak': 'work_streak',
+        'xp': 'xp',
+        'trivia': 'trivia_wins'
+    }
+
+    def __init__(self, connections: ConnectionManager):
+        self.connections = connections
+        self._lock = threading.RLock()
+        self._global: Dict[str, RankIndex] = {}
+        self._guild: Dict[Tuple[str, str], RankIndex] = {}
+        self._members: Dict[str, Set[str]] = {}
+        self._user_guilds: Dict[str, Set[str]] = {}
+
+        self.loads = 0
+        self.updates = 0
+
+    def _index(self, category: str) -> RankIndex:
+        index = self._global.get(category)
+        if index is None:
+            column = self.CATEGORIES[category]
+            with self.connections.cursor() as cursor:
+                cursor.execute(f"SELECT user_id, {column} FROM users")
+                index = RankIndex(cursor.fetchall())
+            self._global[category] = index
+            self.loads += 1
+        return index
+
+    def _guild_index(self, category: str, guild_id: str) -> RankIndex:
+        index = self._guild.get((category, guild_id))
+        if index is None:
+            scores = self._index(category)
+            index = RankIndex((user_id, scores.score(user_id)) for user_id in self._members[guild_id]
+                              if user_id in scores)
+            self._guild[(category, guild_id)] = index
+        return index
+
+    def _scoped(self, category: str, guild_id) -> RankIndex:
+        if guild_id is not None and str(guild_id) in self._members:
+            return self._guild_index(category, str(guild_id))
+        return self._index(category)
+
+    def update(self, category: str, user_id: str, score: int):
+        """Record a user's new value for a category"""
+        with self._lock:
+            # A category nobody has asked for yet is loaded fresh later
+            index = self._global.get(category)
+            if index is None:
+                return
+            index.set(user_id, score)
+            for guild_id in self._user_guilds.get(user_id, ()):
+                guild_index = self._guild.get((category, guild_id))
+                if guild_index is not None:
+                    guild_index.set(user_id, score)
+            self.updates += 1
+
+    def update_columns(self, user_id: str, values: Dict[str, int]):
+        """Record new users column values; columns that are not ranked are skipped"""
+        for category, column in self.CATEGORIES.items():
+            if column in values:
+                self.update(category, user_id, values[column])
+
+    def forget(self, user_id: str):
+        """Drop a user from every index"""
+        with self._lock:
+            for index in self._global.values():
+                index.discard(user_id)
+            for index in self._guild.values():
+                index.discard(user_id)
+
+    def invalidate(self, category: Optional[str] = None):
+        """Reload a category (or all) from the table on next use"""
+        with self._lock:
+            for name in ([category] if category else list(self._global)):
+                self._global.pop(name, None)
+                for key in [key for key in self._guild if key[0] == name]:
+                    del self._guild[key]
+
+    def guild_size(self, guild_id) -> Optional[int]:
+        """Number of members tracked for a guild, or None if untracked"""
+        members = self._members.get(str(guild_id))
+        return None if members is None else len(members)
+
+    def sync_guild(self, guild_id, member_ids: Iterable):
+        """Set a guild's member list, moving only the members that changed"""
+        guild_id = str(guild_id)
+        members = {str(member_id) for member_id in member_ids}
+        with self._lock:
+            old = self._members.get(guild_id, set())
+            self._members[guild_id] = members
+            for user_id in old - members:
+                self._user_guilds.get(user_id, set()).discard(guild_id)
+                for (category, gid), index in self._guild.items():
+                    if gid == guild_id:
+                        index.discard(user_id)
+            for user_id in members - old:
+                self._user_guilds.setdefault(user_id, set()).add(guild_id)
+                for (category, gid), index in self._guild.items():
+                    if gid == guild_id:
+                        score = self._index(category).score(user_id)
+                        if score is not None:
+                            index.set(user_id, score)
+
+    def top(self, category: str, limit: int = 10, offset: int = 0, guild_id=None) -> List[Tuple[str, int, int]]:
+        """(user_id, value, rank) for the leading users; ties share a rank"""
+        with self._lock:
+            index = self._scoped(category, guild_id)
+            leaders, previous, rank = [], None, 0
+            for user_id, value in index.top(limit, offset):
+                if value != previous:
+                    rank, previous = index.count_above(value) + 1, value
+                leaders.append((user_id, value, rank))
+            return leaders
+
+    def rank(self, category: str, user_id: str, guild_id=None) -> Optional[Tuple[int, int, int]]:
+        """(rank, out_of, value) for a user, or None if they are not ranked"""
+        with self._lock:
+            index = self._scoped(category, guild_id)
+            rank = index.rank(user_id)
+            return None if rank is None else (rank, len(index), index.score(user_id))
+
+    def get_stats(self) -> Dict:
+        """Get leaderboard statistics"""
+        with self._lock:
+            return {
+                'categories': sorted(self._global),
+                'ranked_users': max((len(index) for index in self._global.values()), default=0),
+                'guilds': len(self._members),
+                'guild_indexes': len(self._guild),
+                'loads': self.loads,
+                'updates': self.updates
+            }
@@ -1,194 +1,209 @@
+import asyncio
 import time
 import logging
-from typing import Dict, Tuple, Optional
-from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+class GCRALimiter:
+    """Generic cell rate algorithm: a token bucket stored as one float per key.
+
+    Each key keeps only its theoretical arrival time (TAT). A request is
+    allowed if, after adding one emission interval, the TAT is no more than
+    one window ahead of now; this permits bursts of up to max_calls and
+    then a steady max_calls per window. A key whose TAT is in the past is
+    back at full capacity and can be dropped.
+    """
+
+    def __init__(self):
+        self.tats: Dict[Tuple, float] = {}
+
+    def check(self, buckets: Iterable[Tuple[Tuple, int, float]], now: Optional[float] = None) -> bool:
+        """Consume one call from every (key, max_calls, window) bucket, or from none of them"""
+        now = time.monotonic() if now is None else now
+        updates = []
+        for key, max_calls, window in buckets:
+            interval = window / max_calls
+            new_tat = max(self.tats.get(key, now), now) + interval
+            if new_tat - now > window:
+                return False
+            updates.append((key, new_tat))
+
+        for key, new_tat in updates:
+            self.tats[key] = new_tat
+        return True
+
+    def remaining(self, key: Tuple, max_calls: int, window: float, now: Optional[float] = None) -> int:
+        """Calls still available right now for a bucket"""
+        now = time.monotonic() if now is None else now
+        backlog = max(self.tats.get(key, now) - now, 0.0)
+        return max(0, int((window - backlog) // (window / max_calls)))
+
+    def retry_after(self, key: Tuple, max_calls: int, window: float, now: Optional[float] = None) -> float:
+        """Seconds until the bucket admits another call"""
+        now = time.monotonic() if now is None else now
+        return max(self.tats.get(key, now) + window / max_calls - window - now, 0.0)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop keys that have fully replenished; returns how many were removed"""
+        now = time.monotonic() if now is None else now
+        idle = [key for key, tat in self.tats.items() if tat <= now]
+        for key in idle:
+            del self.tats[key]
+        return len(idle)
+
+    def clear(self, match=None):
+        """Forget every key, or only those for which match(key) is true"""
+        if match is None:
+            self.tats.clear()
+        else:
+            for key in [key for key in self.tats if match(key)]:
+                del self.tats[key]
+
 class RateLimiter:
-    """Enhanced rate limiting for API calls and conversations with database integration"""
-    
-    def __init__(self, database=None):
-        self.db = database
-        self.limits = {
-            'conversation': {'calls': 0, 'last_reset': time.time(), 'max': 50, 'window': 3600},  # 50 per hour
-            'api_calls': {'calls': 0, 'last_reset': time.time(), 'max': 100, 'window': 3600},   # 100 per hour
-            'daily': {'calls': 0, 'last_reset': time.time(), 'max': 1, 'window': 86400},        # 1 per day
-            'images': {'calls': 0, 'last_reset': time.time(), 'max': 10, 'window': 86400}       # 10 per day
-        }
-        self.user_limits = {}
-    
-    def check_limit(self, user_id: str, limit_type: str) -> bool:
-        """Check if user is within rate limits"""
+    """Per-user, per-guild and global rate limiting held in memory"""
+
+    # limit type -> scope -> (max calls, window seconds); every scope must admit the call
+    LIMITS = {
+        'conversation': {'user': (50, 3600), 'guild': (300, 3600), 'global': (1000, 3600)},
+        'api_calls': {'user': (50, 3600), 'guild': (300, 3600), 'global': (1000, 3600)},
+        'daily': {'user': (1, 86400)},
+        'images': {'user': (10, 86400), 'global': (200, 86400)}
+    }
+
+    # Buckets live only in memory; API usage rows are written by Database.record_exchange
+
+    def __init__(self, evict_interval: float = 60):
+        self.evict_interval = evict_interval
+        self.engine = GCRALimiter()
+        self.limits = {limit_type: dict(scopes) for limit_type, scopes in self.LIMITS.items()}
+        self._task: Optional[asyncio.Task] = None
+
+        self.allowed = 0
+        self.denied = 0
+        self.evicted = 0
+
+    def _buckets(self, limit_type: str, user_id: str, guild_id: Optional[str]) -> List[Tuple[Tuple, int, float]]:
+        scopes = self.limits[limit_type]
+        owners = {'user': user_id, 'guild': guild_id, 'global': None}
+        return [
+            ((limit_type, scope, owners[scope]), max_calls, window)
+            for scope, (max_calls, window) in scopes.items()
+            if scope != 'guild' or guild_id is not None
+        ]
+
+    def check_limit(self, user_id: str, limit_type: str, guild_id: Optional[str] = None) -> bool:
+        """Check and consume one call against the user's, guild's and global buckets"""
         try:
             if limit_type not in self.limits:
                 return True
-            
-            current_time = time.time()
-            limit_config = self.limits[limit_type]
-            
-            # Reset counter if window has passed
-            if current_time - limit_config['last_reset'] > limit_config['window']:
-                limit_config['calls'] = 0
-                limit_config['last_reset'] = current_time
-            
-            # Check if user has exceeded limit
-            if limit_config['calls'] >= limit_config['max']:
-                return False
-            
-            # Increment counter
-            limit_config['calls'] += 1
-            return True
-            
+
+            allowed = self.engine.check(self._buckets(limit_type, user_id, guild_id))
+            if allowed:
+                self.allowed += 1
+            else:
+                self.denied += 1
+            return allowed
+
         except Exception as e:
             logger.error(f"Error checking rate limit: {e}")
             return True
-    
+
     def check_user_limit(self, user_id: str, limit_type: str, max_calls: int = 10, window: int = 3600) -> bool:
-        """Check per-user rate limits with database integration"""
+        """Check an ad-hoc per-user limit, e.g. a command cooldown"""
         try:
-            current_time = time.time()
-            
-            # Use database if available for persistent tracking
-            if self.db:
-                usage_data = self.db.get_usage_data(user_id)
-                
-                if limit_type == 'api_calls':
-                    # Check hourly API calls
-                    if usage_data.get('hourly_calls', 0) >= 50:
-                        return False
-                    # Update usage in database
-                    self.db.update_usage(user_id, 'api_call')
-                    return True
-                    
-                elif limit_type == 'images':
-                    # Check daily image generation
-                    if usage_data.get('images_today', 0) >= 10:
-                        return False
-                    # Update usage in database
-                    self.db.update_usage(user_id, 'image')
-                    return True
-                    
-                elif limit_type == 'conversation':
-                    # Check conversation limits (50 per hour)
-                    if usage_data.get('hourly_calls', 0) >= 50:
-                        return False
-                    # Update usage in database
-                    self.db.update_usage(user_id, 'api_call')
-                    return True
-            
-            # Fallback to in-memory tracking
-            if user_id not in self.user_limits:
-                self.user_limits[user_id] = {}
-            
-            if limit_type not in self.user_limits[user_id]:
-                self.user_limits[user_id][limit_type] = {
-                    'calls': 0,
-                    'last_reset': current_time
-                }
-            
-            user_limit = self.user_limits[user_id][limit_type]
-            
-            # Reset counter if window has passed
-            if current_time - user_limit['last_reset'] > window:
-                user_limit['calls'] = 0
-                user_limit['last_reset'] = current_time
-            
-            # Check if user has exceeded limit
-            if user_limit['calls'] >= max_calls:
-                return False
-            
-            # Increment counter
-            user_limit['calls'] += 1
-            return True
-            
+            allowed = self.engine.check([(('custom', limit_type, user_id), max_calls, window)])
+            if allowed:
+                self.allowed += 1
+            else:
+                self.denied += 1
+            return allowed
+
         except Exception as e:
             logger.error(f"Error checking user rate limit: {e}")
             return True
-    
+
+    def _usage(self, limit_type: str, user_id: str) -> Dict:
+        max_calls, window = self.limits[limit_type]['user']
+        remaining = self.engine.remaining((limit_type, 'user', user_id), max_calls, window)
+        return {'used': max_calls - remaining, 'remaining': remaining, 'limit': max_calls}
+
     def get_usage_info(self, user_id: str) -> Dict:
         """Get detailed usage information for a user"""
         try:
-            if self.db:
-                usage_data = self.db.get_usage_data(user_id)
-                
-                # Calculate remaining limits
-                api_calls_remaining = max(0, 50 - usage_data.get('hourly_calls', 0))
-                images_remaining = max(0, 10 - usage_data.get('images_today', 0))
-                
-                return {
-                    'api_calls': {
-                        'used': usage_data.get('hourly_calls', 0),
-                        'remaining': api_calls_remaining,
-                        'limit': 50,
-                        'reset_time': 'Every hour'
-                    },
-                    'images': {
-                        'used': usage_data.get('images_today', 0),
-                        'remaining': images_remaining,
-                        'limit': 10,
-                        'reset_time': 'Daily at midnight'
-                    }
-                }
-            else:
-                # Fallback to in-memory data
-                return {
-                    'api_calls': {
-                        'used': 0,
-                        'remaining': 50,
-                        'limit': 50,
-                        'reset_time': 'Every hour'
-                    },
-                    'images': {
-                        'used': 0,
-                        'remaining': 10,
-                        'limit': 10,
-                        'reset_time': 'Daily at midnight'
-                    }
-                }
-                
+            # Chat replies draw from both buckets; report whichever is closer to its limit
+            api_calls = min(self._usage('conversation', user_id), self._usage('api_calls', user_id),
+                            key=lambda usage: usage['remaining'])
+            api_calls['reset_time'] = 'Rolling hour'
+            images = self._usage('images', user_id)
+            images['reset_time'] = 'Rolling 24 hours'
+            return {'api_calls': api_calls, 'images': images}
+
         except Exception as e:
             logger.error(f"Error getting usage info: {e}")
             return {}
-    
-    def get_time_until_reset(self, limit_type: str) -> Optional[str]:
-        """Get time until next reset for a limit type"""
+
+    def get_time_until_reset(self, limit_type: str, user_id: Optional[str] = None) -> Optional[str]:
+        """Get time until the user's (or global) bucket admits another call"""
         try:
             if limit_type not in self.limits:
                 return None
-            
-            limit_config = self.limits[limit_type]
-            current_time = time.time()
-            time_since_reset = current_time - limit_config['last_reset']
-            time_until_reset = limit_config['window'] - time_since_reset
-            
+
+            scope = 'user' if user_id is not None and 'user' in self.limits[limit_type] else 'global'
+            if scope not in self.limits[limit_type]:
+                return None
+            max_calls, window = self.limits[limit_type][scope]
+            time_until_reset = self.engine.retry_after(
+                (limit_type, scope, user_id if scope == 'user' else None), max_calls, window
+            )
+
             if time_until_reset <= 0:
                 return "Now"
-            
+
             hours = int(time_until_reset // 3600)
             minutes = int((time_until_reset % 3600) // 60)
-            
+
             if hours > 0:
                 return f"{hours}h {minutes}m"
             else:
                 return f"{minutes}m"
-                
+
         except Exception as e:
             logger.error(f"Error getting reset time: {e}")
             return None
-    
+
     def reset_limits(self):
         """Reset all rate limits (useful for testing)"""
-        current_time = time.time()
-        for limit_type in self.limits:
-            self.limits[limit_type]['calls'] = 0
-            self.limits[limit_type]['last_reset'] = current_time
-        
-        self.user_limits = {}
+        self.engine.clear()
         logger.info("Rate limits reset")
-    
+
     def reset_user_limits(self, user_id: str):
         """Reset limits for a specific user"""
-        if user_id in self.user_limits:
-            del self.user_limits[user_id]
-            logger.info(f"Rate limits reset for user {user_id}")
+        self.engine.clear(lambda key: key[1] == 'user' and key[2] == user_id
+                          or key[0] == 'custom' and key[2] == user_id)
+        logger.info(f"Rate limits reset for user {user_id}")
+
+    def start(self):
+        """Start periodic idle-key eviction on the running loop"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the eviction task"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.evict_interval)
+            self.evicted += self.engine.evict_idle()
+
+    def get_stats(self) -> Dict:
+        """Get rate limiter statistics"""
+        return {
+            'tracked_keys': len(self.engine.tats),
+            'allowed': self.allowed,
+            'denied': self.denied,
+            'evicted': self.evicted
+        }
@@ -0,0 +1,143 @@
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class ResponseCache:
+    """Bounded LRU + TTL cache of LLM replies keyed by normalized message, persona and recent history"""
+
+    _NON_WORD = re.compile(r"[^\w\s]+")
+    _SPACES = re.compile(r"\s+")
+    _REPEATS = re.compile(r"(\w)\1{2,}")  # "hiiiii" -> "hi"
+
+    def __init__(self, max_entries: int = 2000, ttl: float = 900, history_turns: int = 3,
+                 max_message_chars: int = 120, async_db=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.history_turns = history_turns
+        self.max_message_chars = max_message_chars
+        self.async_db = async_db  # Optional second tier persisted in SQLite
+
+        # key -> (expires_at, response, user_name the response was written for)
+        self._entries: "OrderedDict[str, Tuple[float, str, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.evictions = 0
+
+    @classmethod
+    def normalize(cls, message: str) -> str:
+        """Reduce a message to a canonical form so trivial variations share an entry"""
+        text = cls._NON_WORD.sub(" ", message.lower())
+        text = cls._REPEATS.sub(r"\1", text)
+        return cls._SPACES.sub(" ", text).strip()
+
+    def is_cacheable(self, message: str) -> bool:
+        """Only short, generic messages are likely to repeat"""
+        normalized = self.normalize(message)
+        return 0 < len(normalized) <= self.max_message_chars
+
+    def make_key(self, message: str, personality_prompt: str, conversation_history: List[Dict],
+                 scope: Optional[str] = None) -> str:
+        """Hash the normalized message with the resolved prompt, trimmed history and scope.
+
+        Replies built on a user's history (and the rolling summary of it)
+        must pass that user's summary key as scope, so they are never
+        served to anyone else.
+        """
+        digest = hashlib.sha256()
+        digest.update(personality_prompt.encode('utf-8'))
+        digest.update(b"\x00")
+        if scope:
+            digest.update(scope.encode('utf-8'))
+            digest.update(b"\x00")
+        if self.history_turns:
+            for conv in conversation_history[-self.history_turns:]:
+                digest.update(self.normalize(conv['user_message']).encode('utf-8'))
+                digest.update(b"\x01")
+                digest.update(self.normalize(conv['bot_response']).encode('utf-8'))
+                digest.update(b"\x00")
+        digest.update(self.normalize(message).encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def _personalize(response: str, original_name: str, user_name: str) -> str:
+        """Swap the name the reply was written for with the current user's"""
+        if original_name and user_name and original_name != user_name:
+            # Whole names only, so "Al" does not turn "also" into "Bobso"
+            pattern = re.compile(rf"(?<!\w){re.escape(original_name)}(?!\w)")
+            return pattern.sub(lambda _: user_name, response)
+        return response
+
+    def get(self, key: str, user_name: str = "") -> Optional[str]:
+        """Look up the in-memory tier"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires_at, response, original_name = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return self._personalize(response, original_name, user_name)
+
+    def put(self, key: str, response: str, user_name: str = ""):
+        """Store in the in-memory tier, evicting the least recently used entries"""
+        self._entries[key] = (time.monotonic() + self.ttl, response, user_name)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def lookup(self, key: str, user_name: str = "") -> Optional[str]:
+        """Check memory, then the persistent tier; counts hits and misses"""
+        response = self.get(key, user_name)
+        if response is not None:
+            self.hits += 1
+            return response
+
+        if self.async_db:
+            try:
+                stored = await self.async_db.get_cached_response(key, self.ttl)
+                if stored:
+                    stored_response, original_name = stored
+                    self.put(key, stored_response, original_name)
+                    self.hits += 1
+                    self.persistent_hits += 1
+                    return self._personalize(stored_response, original_name, user_name)
+            except Exception as e:
+                logger.error(f"Error reading persisted response cache: {e}")
+
+        self.misses += 1
+        return None
+
+    async def store(self, key: str, response: str, user_name: str = ""):
+        """Store in memory and, if configured, the persistent tier"""
+        self.put(key, response, user_name)
+        if self.async_db:
+            try:
+                await self.async_db.store_cached_response(key, response, user_name)
+            except Exception as e:
+                logger.error(f"Error persisting response cache entry: {e}")
+
+    def clear(self):
+        """Drop all in-memory entries"""
+        self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        """Get cache statistics"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'persistent_hits': self.persistent_hits,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
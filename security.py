@@ -2,6 +2,8 @@ import hashlib
 import time
 import logging
 from typing import Dict, List, Optional
+from content_filter import ContentFilter
+from time_window_store import TimeWindowStore
 
 logger = logging.getLogger(__name__)
 
@@ -11,12 +13,14 @@ class SecurityManager:
     def __init__(self):
         self.blocked_users = set()
         self.suspicious_activity = {}
-        self.rate_limits = {}
         self.max_requests_per_minute = 30
+        self.rate_limits = TimeWindowStore(window=60, capacity=self.max_requests_per_minute)
         self.blocked_words = [
             'token', 'password', 'api_key', 'secret', 'private_key',
             'discord_token', 'bot_token', 'client_secret'
         ]
+        self.content_filter = ContentFilter()
+        self.content_filter.set_patterns('blocked', self.blocked_words, boundary='substring')
         
     def check_user_safety(self, user_id: str, message_content: str) -> tuple[bool, str]:
         """Check if user and message are safe"""
@@ -25,11 +29,10 @@ class SecurityManager:
             return False, "User is blocked"
         
         # Check for suspicious content
-        content_lower = message_content.lower()
-        for word in self.blocked_words:
-            if word in content_lower:
-                logger.warning(f"Suspicious content from {user_id}: {word}")
-                return False, f"Contains blocked word: {word}"
+        match = self.content_filter.find(message_content, ('blocked',))
+        if match:
+            logger.warning(f"Suspicious content from {user_id}: {match.pattern}")
+            return False, f"Contains blocked word: {match.pattern}"
         
         # Check rate limiting
         if not self.check_rate_limit(user_id):
@@ -39,24 +42,12 @@ class SecurityManager:
     
     def check_rate_limit(self, user_id: str) -> bool:
         """Check if user has exceeded rate limits"""
-        current_time = time.time()
-        
-        if user_id not in self.rate_limits:
-            self.rate_limits[user_id] = []
-        
-        # Remove old requests (older than 1 minute)
-        self.rate_limits[user_id] = [
-            req_time for req_time in self.rate_limits[user_id]
-            if current_time - req_time < 60
-        ]
-        
-        # Check if too many requests
-        if len(self.rate_limits[user_id]) >= self.max_requests_per_minute:
-            return False
-        
-        # Add current request
-        self.rate_limits[user_id].append(current_time)
-        return True
+        return self.rate_limits.allow(user_id, self.max_requests_per_minute)
+    
+    def set_blocked_words(self, words: List[str]):
+        """Replace the blocked word list"""
+        self.blocked_words = list(words)
+        self.content_filter.set_patterns('blocked', self.blocked_words, boundary='substring')
     
     def block_user(self, user_id: str, reason: str = "Manual block"):
         """Block a user"""
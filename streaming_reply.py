@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Awaitable, Callable, Optional, Tuple
+import discord
+
+logger = logging.getLogger(__name__)
+
+class StreamingReply:
+    """Posts a reply as soon as the first text arrives and edits it while the rest streams in"""
+
+    MAX_LENGTH = 2000
+    CURSOR = " ▌"
+
+    def __init__(self, edit_interval: float = 1.2, first_chunk_chars: int = 24,
+                 first_chunk_delay: float = 0.35, suffix: str = ""):
+        # Discord allows roughly 5 edits per 5 seconds per channel; stay well under it
+        self.edit_interval = edit_interval
+        self.first_chunk_chars = first_chunk_chars
+        self.first_chunk_delay = first_chunk_delay
+        self.suffix = suffix
+
+    def _render(self, text: str, partial: bool) -> str:
+        """Fit the text into one Discord message, with a typing cursor while partial"""
+        tail = self.CURSOR if partial else self.suffix
+        limit = self.MAX_LENGTH - len(tail)
+        text = text.strip()
+        if len(text) > limit:
+            text = text[:limit - 1] + "…"
+        return text + tail
+
+    async def send(self, send_first: Callable[[str], Awaitable[discord.Message]],
+                   chunks: AsyncIterator[str]) -> Tuple[str, Optional[discord.Message]]:
+        """Stream chunks into a message created with send_first; returns (full text, message)"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        last_edit = started
+        text = ""
+        shown = ""
+        sent_message = None
+
+        async for delta in chunks:
+            text += delta
+            now = loop.time()
+
+            if sent_message is None:
+                ready = len(text.strip()) >= self.first_chunk_chars
+                waited = text.strip() and now - started >= self.first_chunk_delay
+                if ready or waited:
+                    sent_message = await send_first(self._render(text, partial=True))
+                    shown, last_edit = text, now
+            elif now - last_edit >= self.edit_interval and text != shown:
+                try:
+                    await sent_message.edit(content=self._render(text, partial=True))
+                    shown, last_edit = text, now
+                except discord.HTTPException as e:
+                    logger.warning(f"Progressive edit failed: {e}")
+
+        final = text.strip()
+        if not final:
+            return "", sent_message
+
+        if sent_message is None:
+            sent_message = await send_first(self._render(final, partial=False))
+        else:
+            await sent_message.edit(content=self._render(final, partial=False))
+
+        return final, sent_message
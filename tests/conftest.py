@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The bot's modules live flat in the repository root; modules only the
+# Better Visual bot has (e.g. link_inspector) are found after them
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.append(os.path.join(ROOT, 'Better Visual'))
@@ -0,0 +1,50 @@
+import pytest
+
+from database import Database
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / "chat.db"))
+    yield database
+    database.close()
+
+def _trace(db):
+    """Statements run on the calling thread's connection from now on"""
+    statements = []
+    db.connections.get_connection().set_trace_callback(statements.append)
+    return statements
+
+def _cycle(db, user_id: str, turn: int):
+    context = db.get_conversation_context(user_id)
+    db.record_exchange(user_id, f"message {turn}", f"reply {turn}")
+    return context
+
+@pytest.mark.parametrize('known_user', [False, True])
+def test_chat_cycle_is_one_read_and_one_write_transaction(db, known_user):
+    """A chat reply costs one SELECT for context and one transaction for the write-back"""
+    if known_user:
+        _cycle(db, 'chatter', 0)
+    statements = _trace(db)
+
+    _cycle(db, 'chatter', 1)
+
+    keywords = [sql.split()[0].upper() for sql in statements]
+    assert keywords == ['SELECT', 'BEGIN', 'INSERT', 'INSERT', 'INSERT', 'COMMIT']
+
+def test_context_returns_recorded_turns_oldest_first(db):
+    for turn in range(12):
+        _cycle(db, 'chatter', turn)
+
+    context = db.get_conversation_context('chatter', limit=3)
+
+    assert [row['user_message'] for row in context['history']] == ['message 9', 'message 10', 'message 11']
+    assert context['user']['user_id'] == 'chatter'
+    assert context['personality_mode'] == 'friendly'
+
+def test_unknown_user_context_needs_no_write(db):
+    statements = _trace(db)
+
+    context = db.get_conversation_context('stranger')
+
+    assert [sql.split()[0].upper() for sql in statements] == ['SELECT']
+    assert context['history'] == [] and context['user']['coins'] == 1000
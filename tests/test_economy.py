@@ -0,0 +1,93 @@
+import random
+import threading
+
+import pytest
+
+from database import Database
+
+USERS = [f"stress-{i}" for i in range(4)]
+START = 1000 * len(USERS)
+
+@pytest.fixture
+def db(tmp_path):
+    database = Database(str(tmp_path / "economy.db"))
+    for user_id in USERS:
+        database.get_user(user_id)
+    yield database
+    database.close()
+
+def _run_threads(worker, workers: int = 6):
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def _totals(db):
+    db.ledger.flush()
+    placeholders = ','.join('?' * len(USERS))
+    with db.connections.cursor() as cursor:
+        cursor.execute(f"SELECT SUM(coins), MIN(coins) FROM users WHERE user_id IN ({placeholders})", USERS)
+        total, lowest = cursor.fetchone()
+        cursor.execute(f"SELECT SUM(amount) FROM transactions WHERE user_id IN ({placeholders})", USERS)
+        ledger = cursor.fetchone()[0] or 0
+    return total, lowest, ledger
+
+def test_concurrent_economy_loses_no_updates(db):
+    """Spends, credits, transfers and gambles from several threads add up exactly"""
+    expected_change = [0]
+    lock = threading.Lock()
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        for _ in range(300):
+            user_id = rng.choice(USERS)
+            amount = rng.randint(1, 50)
+            choice = rng.random()
+            if choice < 0.25:
+                if db.spend_coins(user_id, amount):
+                    with lock:
+                        expected_change[0] -= amount
+            elif choice < 0.45:
+                db.add_coins(user_id, amount)
+                with lock:
+                    expected_change[0] += amount
+            elif choice < 0.6:
+                db.update_user_coins(user_id, amount)
+                with lock:
+                    expected_change[0] += amount
+            elif choice < 0.9:
+                # Transfers move coins around without changing the total
+                db.transfer_coins(user_id, rng.choice(USERS), amount)
+            else:
+                success, message, _ = db.atomic_gamble(user_id, amount, 0.5)
+                if success:
+                    with lock:
+                        expected_change[0] += amount if 'won' in message else -amount
+
+    _run_threads(worker)
+    total, lowest, ledger = _totals(db)
+
+    assert total == START + expected_change[0]
+    assert total == START + ledger
+    assert lowest >= 0
+
+def test_concurrent_debits_never_go_negative(db):
+    """Oversized debits clamp at zero and the ledger records what was actually taken"""
+    def worker(seed: int):
+        rng = random.Random(seed)
+        for _ in range(300):
+            user_id = rng.choice(USERS)
+            choice = rng.random()
+            if choice < 0.4:
+                db.update_user_coins(user_id, -rng.randint(1, 800))
+            elif choice < 0.7:
+                db.update_user_coins(user_id, rng.randint(1, 300))
+            else:
+                db.transfer_coins(user_id, rng.choice(USERS), rng.randint(1, 400))
+
+    _run_threads(worker)
+    total, lowest, ledger = _totals(db)
+
+    assert lowest >= 0
+    assert total == START + ledger
@@ -0,0 +1,38 @@
+from link_inspector import LinkInspector, LinkVerdict, normalize_host
+from message_context import MessageContext
+
+ALLOWED = ['youtube.com', 'discord.com', 'wikipedia.org']
+
+def _inspect(content: str, **kwargs) -> LinkVerdict:
+    return LinkInspector(ALLOWED, **kwargs).inspect(MessageContext(content).urls)
+
+def test_trailing_punctuation_is_not_part_of_the_link():
+    assert MessageContext("check https://www.youtube.com, nice").urls == ["https://www.youtube.com"]
+    assert MessageContext("it's at https://discord.com/channels/1.").urls == ["https://discord.com/channels/1"]
+    assert MessageContext("really?! https://youtube.com/watch?v=x!?").urls == ["https://youtube.com/watch?v=x"]
+    assert _inspect("check https://www.youtube.com, nice").allowed
+    assert _inspect("see https://discord.com.").allowed
+
+def test_links_in_parentheses():
+    assert MessageContext("(see https://www.youtube.com/watch?v=x)").urls == ["https://www.youtube.com/watch?v=x"]
+    assert _inspect("(see https://www.youtube.com)").allowed
+    # A bracket the URL itself opened is kept
+    assert MessageContext("https://en.wikipedia.org/wiki/Python_(language)").urls == [
+        "https://en.wikipedia.org/wiki/Python_(language)"
+    ]
+    assert MessageContext("(https://en.wikipedia.org/wiki/Python_(language))").urls == [
+        "https://en.wikipedia.org/wiki/Python_(language)"
+    ]
+
+def test_unlisted_domain_still_rejected():
+    assert _inspect("look https://evil.io, trust me") == LinkVerdict(False, 'evil.io', "Domain not in allowlist")
+    assert not _inspect("https://youtube.com.evil.io").allowed
+
+def test_invalid_hostname_characters_are_rejected():
+    assert normalize_host("www.youtube.com,") is None
+    assert normalize_host("you_tube.com") is None
+    assert normalize_host("-bad.com") is None
+    assert normalize_host("WWW.YouTube.com.") == "www.youtube.com"
+    assert normalize_host("bücher.de") == "xn--bcher-kva.de"
+    assert normalize_host("192.168.0.1") == "192.168.0.1"
+    assert LinkInspector(ALLOWED).inspect(["https://you*tube.com/"]) == LinkVerdict(False, None, "Unparseable link")
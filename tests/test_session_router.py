@@ -0,0 +1,108 @@
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from session_router import SessionRouter
+
+def _message(channel_id, user_id, content='4'):
+    return SimpleNamespace(channel=SimpleNamespace(id=channel_id), author=SimpleNamespace(id=user_id),
+                           content=content)
+
+def test_reply_reaches_only_its_waiter():
+    async def run():
+        router = SessionRouter()
+        waiting = asyncio.create_task(router.wait_for_message(1, 10, timeout=5))
+        await asyncio.sleep(0)
+        assert router.busy(1, 10) and not router.busy(2, 10)
+
+        assert not await router.dispatch(_message(2, 10), None)   # Other channel
+        assert not await router.dispatch(_message(1, 11), None)   # Other user
+        reply = _message(1, 10, 'paris')
+        assert await router.dispatch(reply, None)
+        assert await waiting is reply
+        assert not router.busy(1, 10)
+
+    asyncio.run(run())
+
+def test_commands_pass_through_mid_game():
+    async def run():
+        router = SessionRouter('!')
+        handled = []
+
+        async def session(message, context):
+            handled.append(message.content)
+            return True
+
+        waiting = asyncio.create_task(router.wait_for_message(1, 10, timeout=5))
+        await asyncio.sleep(0)
+        assert not await router.dispatch(_message(1, 10, '!balance'), None)
+        assert router.busy(1, 10)
+        assert await router.dispatch(_message(1, 10, '3'), None)
+        assert (await waiting).content == '3'
+
+        router.open(1, 10, session)
+        assert not await router.dispatch(_message(1, 10, '!help'), None)
+        assert await router.dispatch(_message(1, 10, 'a'), None)
+        assert handled == ['a']
+
+    asyncio.run(run())
+
+def test_timeout_and_double_wait():
+    async def run():
+        router = SessionRouter()
+        first = asyncio.create_task(router.wait_for_message(1, 10, timeout=0.01))
+        await asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            await router.wait_for_message(1, 10, timeout=1)
+        with pytest.raises(asyncio.TimeoutError):
+            await first
+        assert router.get_stats()['timeouts'] == 1
+        assert not router.busy(1, 10)
+
+    asyncio.run(run())
+
+def test_routing_beats_scanning_every_wait_for_check():
+    """With thousands of games waiting, routing costs a lookup instead of one predicate per game"""
+    rng = random.Random(7)
+    games, messages = 2000, 4000
+    players = list({(rng.randrange(100), 10_000 + i) for i in range(games)})
+    # Half the traffic answers a pending game, half is unrelated chatter
+    traffic = [_message(*rng.choice(players)) if i % 2 else _message(rng.randrange(100), rng.randrange(10_000))
+               for i in range(messages)]
+
+    async def run():
+        router = SessionRouter()
+
+        async def play(channel_id, user_id):
+            while True:
+                try:
+                    await router.wait_for_message(channel_id, user_id, timeout=60)
+                except asyncio.TimeoutError:
+                    return
+
+        tasks = [asyncio.create_task(play(*player)) for player in players]
+        await asyncio.sleep(0)
+        started = time.perf_counter()
+        for message in traffic:
+            await router.dispatch(message, None)
+            await asyncio.sleep(0)  # Let the game that got its reply wait again
+        routed = time.perf_counter() - started
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return routed, router.delivered
+
+    routed, delivered = asyncio.run(run())
+    assert delivered == messages // 2
+
+    # What discord.py does: every pending predicate is called for every message
+    checks = [(lambda m, c=c, u=u: m.author.id == u and m.channel.id == c) for c, u in players]
+    started = time.perf_counter()
+    matched = sum(1 for message in traffic for check in checks if check(message))
+    scanned = time.perf_counter() - started
+
+    assert matched == delivered
+    assert routed < scanned
@@ -0,0 +1,151 @@
+import asyncio
+import json
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from api_client import APIClient
+from streaming_reply import StreamingReply
+
+def _event(content=None, **delta):
+    if content is not None:
+        delta['content'] = content
+    return f"data: {json.dumps({'choices': [{'delta': delta}]})}\n\n"
+
+# What a Groq/OpenAI style server sends, including the noise the parser has to skip
+SSE_BODY = [
+    ": keep-alive\n\n",
+    _event(role='assistant'),
+    _event("Hel"),
+    "\n",
+    "data: {not json\n\n",
+    "data: " + json.dumps({'choices': []}) + "\n\n",
+    "event: ping\n\n",
+    _event("lo "),
+    _event(""),
+    _event("world"),
+    "data: [DONE]\n\n",
+    _event("after done"),
+]
+
+class FakeMessage:
+    def __init__(self, content: str):
+        self.content = content
+        self.edits = []
+
+    async def edit(self, content: str):
+        self.content = content
+        self.edits.append(content)
+
+async def _serve_and_stream(body):
+    requests = []
+
+    async def completions(request):
+        requests.append((dict(request.headers), await request.json()))
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream'})
+        await response.prepare(request)
+        for piece in body:
+            await response.write(piece.encode('utf-8'))
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    app.router.add_post('/openai/v1/chat/completions', completions)
+    async with TestServer(app) as server:
+        client = APIClient()
+        client.GROQ_BASE_URL = str(server.make_url('/openai/v1/'))
+        try:
+            deltas = [delta async for delta in client.stream_chat_with_groq(
+                [{'role': 'user', 'content': 'hi'}], personality_prompt="be nice")]
+        finally:
+            await client.close()
+    return deltas, requests
+
+def test_stream_chat_parses_deltas_until_done(monkeypatch):
+    monkeypatch.setenv('GROQ_API_KEY', 'test-key')
+    deltas, requests = asyncio.run(_serve_and_stream(SSE_BODY))
+
+    # Keep-alives, blank lines, malformed JSON and empty deltas are skipped; nothing after [DONE]
+    assert deltas == ["Hel", "lo ", "world"]
+
+    headers, payload = requests[0]
+    assert headers['Authorization'] == 'Bearer test-key'
+    assert headers['Accept'] == 'text/event-stream'
+    assert payload['stream'] is True
+    assert payload['messages'][0] == {'role': 'system', 'content': 'be nice'}
+
+def test_stream_chat_handles_events_split_across_writes(monkeypatch):
+    monkeypatch.setenv('GROQ_API_KEY', 'test-key')
+    joined = ''.join(SSE_BODY)
+    body = [joined[i:i + 7] for i in range(0, len(joined), 7)]
+    deltas, _ = asyncio.run(_serve_and_stream(body))
+    assert deltas == ["Hel", "lo ", "world"]
+
+def test_stream_chat_without_key_yields_apology(monkeypatch):
+    monkeypatch.delenv('GROQ_API_KEY', raising=False)
+
+    async def collect():
+        client = APIClient()
+        return [delta async for delta in client.stream_chat_with_groq([{'role': 'user', 'content': 'hi'}])]
+
+    assert asyncio.run(collect()) == ["Sorry, I'm not configured to chat right now."]
+
+async def _stream_with_clock(reply, timed_chunks):
+    """Run reply.send over (time, delta) pairs with the loop clock pinned to each pair's time"""
+    loop = asyncio.get_running_loop()
+    clock = [0.0]
+    sent = []
+
+    async def send_first(content):
+        message = FakeMessage(content)
+        sent.append(message)
+        return message
+
+    async def chunks():
+        for at, delta in timed_chunks:
+            clock[0] = at
+            yield delta
+
+    loop.time = lambda: clock[0]
+    try:
+        text, message = await reply.send(send_first, chunks())
+    finally:
+        del loop.time
+    return text, message, sent
+
+def test_streaming_reply_edit_cadence():
+    reply = StreamingReply(edit_interval=1.2, first_chunk_chars=24, first_chunk_delay=0.35, suffix=" ~")
+    text, message, sent = asyncio.run(_stream_with_clock(reply, [
+        (0.1, "Hi"),        # Too short and too early to post
+        (0.4, " there"),    # First-chunk delay passed: post
+        (0.9, " a"),        # Within the edit interval: no edit
+        (1.7, " b"),        # Interval passed: edit
+        (2.0, " c"),
+    ]))
+
+    assert len(sent) == 1 and message is sent[0]
+    assert message.edits == ["Hi there a b ▌", "Hi there a b c ~"]
+    assert text == "Hi there a b c"
+    assert message.content == "Hi there a b c ~"
+
+def test_streaming_reply_posts_long_first_chunk_immediately():
+    reply = StreamingReply(edit_interval=1.2, first_chunk_chars=24, first_chunk_delay=0.35)
+    first = "A first chunk long enough to post"
+    _, message, sent = asyncio.run(_stream_with_clock(reply, [(0.0, first), (0.1, "!")]))
+
+    assert [m.content for m in sent] == [first + "!"]
+    assert message.edits == [first + "!"]
+
+def test_streaming_reply_short_answer_sent_once_and_empty_stream_sends_nothing():
+    reply = StreamingReply()
+    text, message, sent = asyncio.run(_stream_with_clock(reply, [(0.0, "ok")]))
+    assert text == "ok" and message.content == "ok" and message.edits == []
+
+    text, message, sent = asyncio.run(_stream_with_clock(reply, [(0.0, "  ")]))
+    assert (text, message, sent) == ("", None, [])
+
+def test_streaming_reply_truncates_to_discord_limit():
+    reply = StreamingReply(suffix=" ~")
+    _, message, _ = asyncio.run(_stream_with_clock(reply, [(0.0, "x" * 3000)]))
+    assert len(message.content) == StreamingReply.MAX_LENGTH
+    assert message.content.endswith("… ~")
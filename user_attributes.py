@@ -0,0 +1,179 @@
+import copy
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from db_connection import ConnectionManager
+
+logger = logging.getLogger(__name__)
+
+_DELETED = object()  # Dirty marker for an attribute removed since the last flush
+
+class UserAttributeStore:
+    """Sparse per-user attributes (inventory, perks, partner, ...) in the `user_data` side table.
+
+    Values are JSON in (user_id, key, data) rows. Reads go through an LRU
+    of whole users, each loaded with one query. Writes update the cache
+    and a dirty map keyed by (user_id, key), so repeated writes to the same
+    attribute collapse into one; a background thread commits the dirty map
+    as a single batch every flush_interval seconds, or sooner once
+    max_dirty attributes are waiting. Hot numeric fields live in typed
+    users columns instead and never pass through here.
+    """
+
+    def __init__(self, connections: ConnectionManager, max_users: int = 10000, flush_interval: float = 1.0,
+                 max_dirty: int = 1000):
+        self.connections = connections
+        self.max_users = max_users
+        self.flush_interval = flush_interval
+        self.max_dirty = max_dirty
+
+        self._lock = threading.Condition()
+        self._cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._dirty: Dict[Tuple[str, str], Any] = {}
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.rows_flushed = 0
+        self.flushes = 0
+
+    def start(self):
+        """Start the background flush thread"""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="user-attributes", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Flush pending writes and stop the thread"""
+        with self._lock:
+            self._stopping = True
+            self._lock.notify_all()
+        if self._thread:
+            self._thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._lock.wait_for(lambda: self._stopping or len(self._dirty) >= self.max_dirty,
+                                    self.flush_interval)
+                if self._stopping:
+                    return
+            self.flush()
+
+    def _load(self, user_id: str) -> Dict[str, Any]:
+        """The user's attributes, from the cache or one query; call with the lock held"""
+        attributes = self._cache.get(user_id)
+        if attributes is not None:
+            self.hits += 1
+            self._cache.move_to_end(user_id)
+            return attributes
+
+        self.misses += 1
+        with self.connections.cursor() as cursor:
+            cursor.execute("SELECT key, data FROM user_data WHERE user_id = ?", (user_id,))
+            rows = cursor.fetchall()
+        attributes = {}
+        for key, data in rows:
+            try:
+                attributes[key] = json.loads(data)
+            except (TypeError, ValueError):
+                attributes[key] = data
+        # Writes not yet flushed win over what is on disk
+        for (dirty_user, key), value in self._dirty.items():
+            if dirty_user == user_id:
+                if value is _DELETED:
+                    attributes.pop(key, None)
+                else:
+                    attributes[key] = value
+
+        self._cache[user_id] = attributes
+        while len(self._cache) > self.max_users:
+            self._cache.popitem(last=False)
+        return attributes
+
+    def get(self, user_id: str, key: str, default: Any = None) -> Any:
+        """One attribute, or default if unset"""
+        with self._lock:
+            # Copied so callers can modify lists and dicts before writing them back
+            return copy.deepcopy(self._load(user_id).get(key, default))
+
+    def get_all(self, user_id: str) -> Dict[str, Any]:
+        """A copy of every attribute the user has"""
+        with self._lock:
+            return copy.deepcopy(self._load(user_id))
+
+    def set_many(self, user_id: str, values: Dict[str, Any]):
+        """Set attributes; a value of None removes the attribute"""
+        with self._lock:
+            attributes = self._load(user_id)
+            for key, value in values.items():
+                if value is None:
+                    attributes.pop(key, None)
+                    self._dirty[(user_id, key)] = _DELETED
+                else:
+                    value = copy.deepcopy(value)
+                    attributes[key] = value
+                    self._dirty[(user_id, key)] = value
+                self.writes += 1
+            if len(self._dirty) >= self.max_dirty:
+                self._lock.notify_all()
+
+    def clear(self, user_id: str):
+        """Remove every attribute of a user"""
+        with self._lock:
+            keys = list(self._load(user_id))
+        self.set_many(user_id, dict.fromkeys(keys))
+
+    def flush(self) -> int:
+        """Write all dirty attributes in one transaction; returns how many rows changed"""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            dirty, self._dirty = self._dirty, {}
+
+        upserts = [(user_id, key, json.dumps(value, default=str))
+                   for (user_id, key), value in dirty.items() if value is not _DELETED]
+        deletes = [(user_id, key) for (user_id, key), value in dirty.items() if value is _DELETED]
+        try:
+            with self.connections.transaction(immediate=True) as cursor:
+                if upserts:
+                    cursor.executemany('''
+                        INSERT INTO user_data (user_id, key, data) VALUES (?, ?, ?)
+                        ON CONFLICT (user_id, key) DO UPDATE SET data = excluded.data
+                    ''', upserts)
+                if deletes:
+                    cursor.executemany("DELETE FROM user_data WHERE user_id = ? AND key = ?", deletes)
+        except Exception as e:
+            logger.error(f"Error flushing {len(dirty)} user attributes: {e}")
+            with self._lock:
+                # Keep anything written since, and retry the rest next time
+                for item, value in dirty.items():
+                    self._dirty.setdefault(item, value)
+            return 0
+
+        with self._lock:
+            self.rows_flushed += len(dirty)
+            self.flushes += 1
+        return len(dirty)
+
+    def get_stats(self) -> Dict:
+        """Get attribute store statistics"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'cached_users': len(self._cache),
+                'dirty': len(self._dirty),
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'writes': self.writes,
+                'rows_flushed': self.rows_flushed,
+                'flushes': self.flushes
+            }
@@ -3,6 +3,7 @@ import random
 import time
 import logging
 from typing import Dict, List
+from time_window_store import TimeWindowStore
 
 logger = logging.getLogger(__name__)
 
@@ -13,7 +14,8 @@ class WickProtection:
         self.message_patterns = []
         self.response_delays = []
         self.typing_patterns = []
-        self.last_message_time = {}
+        # One response per channel per 30 seconds
+        self.last_message_time = TimeWindowStore(window=30, capacity=1)
         
     def add_human_delay(self, channel_id: str) -> float:
         """Add random human-like delay before responding"""
@@ -70,16 +72,8 @@ class WickProtection:
     
     def is_safe_to_respond(self, channel_id: str, user_id: str) -> bool:
         """Check if it's safe to respond without triggering Wick"""
-        current_time = time.time()
-        
-        # Don't respond too frequently
-        if channel_id in self.last_message_time:
-            time_since_last = current_time - self.last_message_time[channel_id]
-            if time_since_last < 30:  # Minimum 30 seconds between responses
-                return False
-        
-        self.last_message_time[channel_id] = current_time
-        return True
+        # Don't respond too frequently (minimum 30 seconds between responses)
+        return self.last_message_time.allow(channel_id)
 
 class HumanLikeResponder:
     """Makes bot responses more human-like to avoid detection"""